@@ -0,0 +1,627 @@
+"""
+Batched LCA calculations sharing a single technosphere factorization.
+
+Instead of building a new ``bw2calc.LCA`` object and factorizing the technosphere matrix for
+every activity and every method, the technosphere matrix of a database is factorized once. All
+activities are then solved together as blocks of demand vectors, and every impact assessment
+method is applied to the shared inventory through its characterization vector.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import bw2data as bd
+from bw2calc import __version__ as bc_version
+import bw2calc as bc
+from scipy.sparse.linalg import splu
+
+try:
+    from bw2data.backends import Activity, ActivityDataset
+except ImportError:
+    # bw2data 3
+    from bw2data.backends.peewee import Activity, ActivityDataset
+
+if isinstance(bc_version, str):
+    bc_version = tuple(map(int, bc_version.split(".")))
+
+# Number of demand vectors solved at once. Bounds the size of the dense supply block.
+CHUNK_SIZE = 256
+
+# Number of elementary flows kept per activity and method by `flow_contributions`
+TOP_FLOWS = 10
+
+# Number of datasets read by one query
+QUERY_CHUNK_SIZE = 500
+
+# Number of engines an `EngineCache` keeps
+MAX_ENGINES = 4
+
+# Seconds after which an unused engine is dropped
+ENGINE_IDLE_TIMEOUT = 30 * 60
+
+# Estimated memory, in bytes, the engines of an `EngineCache` may use together
+ENGINE_MEMORY_LIMIT = 2 * 1024 ** 3
+
+# Estimated memory, in bytes, of one object kept by an engine: an activity, a row label or the
+# inputs of an activity
+CACHED_OBJECT_BYTES = 1024
+
+
+class BatchedLCA:
+    """
+    LCA engine solving many activities against one factorized technosphere matrix.
+
+    The matrices are built from a demand containing all the given activities, so that every
+    database they depend on is loaded. The technosphere matrix is factorized once, and the
+    factorization is reused for every demand and every method.
+
+    Attributes
+    ----------
+    lca : bw2calc.LCA
+        The underlying LCA object holding the technosphere, biosphere and characterization
+        matrices.
+    methods : list
+        The impact assessment methods the engine characterizes inventories with.
+    labels : RowLabels
+        Labels of the rows of the technosphere and biosphere matrices.
+    method_states : dict
+        State of the characterization factors of each method when it was loaded, see
+        `method_state`. Set by `EngineCache`.
+
+    Methods
+    -------
+    scores(activities, methods=None, amounts=None)
+        Returns the LCA scores of each activity for each method, as a (method x activity) array.
+    flow_contributions(activities, methods=None, amounts=None, top_k=TOP_FLOWS)
+        Returns the largest characterized elementary flows of each activity for each method.
+    unit_scores(method)
+        Returns the total and direct scores of one unit of the product of every activity.
+    inputs(column)
+        Returns the inputs of one unit of the product of the activity of a matrix column.
+    activities(columns)
+        Returns the activities of matrix columns.
+    supply(activities, amounts=None)
+        Yields blocks of supply vectors for the given activities.
+    use_method(method)
+        Makes `method` the method of the underlying LCA object.
+    calculate(demand)
+        Redoes the LCI and LCIA of the underlying LCA object for a new demand.
+    """
+
+    def __init__(self, activities: list, methods: list, chunk_size: int = CHUNK_SIZE):
+        """
+        Builds the LCA matrices and factorizes the technosphere matrix.
+
+        :param activities: A list of activities to be solved by the engine.
+        :type activities: list
+        :param methods: A list of method tuples to characterize inventories with.
+        :type methods: list
+        :param chunk_size: Number of demand vectors solved at once.
+        :type chunk_size: int, optional
+        """
+        activities = list(activities)
+        self.methods = list(methods)
+
+        if not activities:
+            raise ValueError("At least one activity is required to build the LCA matrices.")
+        if not self.methods:
+            raise ValueError("At least one method is required to build the LCA matrices.")
+
+        self.chunk_size = chunk_size
+        self.lca = bc.LCA({act: 1 for act in activities}, self.methods[0])
+        self.lca.load_lci_data()
+
+        # The one and only factorization of the technosphere matrix, also used by the LCA object
+        self._lu = splu(self.lca.technosphere_matrix.tocsc())
+        self.lca.solver = self._lu.solve
+        self._characterization = {}
+        self._calculated = False
+        self._labels = None
+        self._graph = None
+        self._unit_scores = {}
+        self._inputs = {}
+        self._activities = {}
+        self._reverse = None
+        self._cached_bytes = 0  # memory of the arrays kept by `unit_scores` and `inputs`
+        self.method_states = {}
+        self.use_method(self.methods[0])
+
+    @property
+    def labels(self):
+        """
+        Labels of the matrix rows, kept with the engine so that warm engines skip their queries.
+        """
+        if self._labels is None:
+            self._labels = RowLabels(self.lca)
+        return self._labels
+
+    def product_index(self, activity) -> int:
+        """
+        Returns the row of the technosphere matrix for the reference product of `activity`.
+        """
+        if bc_version >= (2, 0, 0):
+            return self.lca.dicts.product[activity.id]
+        return self.lca.product_dict[activity.key]
+
+    def activity_index(self, activity) -> int:
+        """
+        Returns the column of the technosphere and biosphere matrices for `activity`.
+        """
+        if bc_version >= (2, 0, 0):
+            return self.lca.dicts.activity[activity.id]
+        return self.lca.activity_dict[activity.key]
+
+    def _method_matrix(self, method: tuple):
+        """
+        Returns the characterization matrix of `method`. Matrices are loaded once per method.
+        """
+        if method not in self._characterization:
+            current = getattr(self.lca, "characterization_matrix", None), self.lca.method
+            self.lca.switch_method(method)
+            self._characterization[method] = self.lca.characterization_matrix
+            self.lca.characterization_matrix, self.lca.method = current
+        return self._characterization[method]
+
+    def characterization_vector(self, method: tuple) -> np.ndarray:
+        """
+        Returns the characterization factors of `method`, aligned with the biosphere matrix rows.
+        """
+        return np.asarray(self._method_matrix(method).diagonal()).ravel()
+
+    def use_method(self, method: tuple):
+        """
+        Makes `method` the method of the underlying LCA object, without reloading the matrix of a
+        method used before.
+
+        :return: The underlying LCA object.
+        :rtype: bw2calc.LCA
+        """
+        self.lca.characterization_matrix = self._method_matrix(method)
+        self.lca.method = method
+        return self.lca
+
+    def calculate(self, demand: dict):
+        """
+        Redoes the LCI and LCIA of the underlying LCA object for `demand` and its current method,
+        reusing the factorization of the technosphere matrix.
+
+        :param demand: A demand dictionary of activities and amounts.
+        :type demand: dict
+        :return: The underlying LCA object, holding the score of `demand`.
+        :rtype: bw2calc.LCA
+        """
+        if bc_version >= (2, 0, 0):
+            self.lca.lcia({getattr(act, "id", act): amount for act, amount in demand.items()})
+        elif self._calculated:
+            self.lca.redo_lcia(demand)
+        else:
+            self.lca.build_demand_array(demand)
+            self.lca.demand = demand
+            self.lca.lci_calculation()
+            self.lca.lcia_calculation()
+            self._calculated = True
+        return self.lca
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Estimated memory used by the matrices, the factorization, the characterization matrices,
+        and what the engine keeps for later calls: the supply graph, unit scores, inputs,
+        activities and row labels.
+        """
+        matrices = [self.lca.technosphere_matrix, self.lca.biosphere_matrix, self._lu.L, self._lu.U]
+        matrices += list(self._characterization.values())
+        if self._graph is not None:
+            matrices.append(self._graph[0])
+        # values (float64) and indices (int32) of the sparse matrices
+        nbytes = sum(12 * m.nnz for m in matrices)
+        if self._graph is not None:
+            nbytes += sum(array.nbytes for array in self._graph[1:])
+
+        objects = len(self._activities) + len(self._inputs)
+        if self._labels is not None:
+            objects += len(self._labels._labels)
+        return nbytes + self._cached_bytes + CACHED_OBJECT_BYTES * objects
+
+    def characterization_matrix(self, methods: list = None) -> np.ndarray:
+        """
+        Returns the stacked characterization vectors of `methods`, as a (method x flow) array.
+        """
+        methods = methods or self.methods
+        return np.vstack([self.characterization_vector(m) for m in methods])
+
+    def solve(self, demand: np.ndarray) -> np.ndarray:
+        """
+        Solves the technosphere for one or several demand vectors, reusing the factorization.
+
+        :param demand: A (product,) or (product x n) array of demand vectors.
+        :type demand: np.ndarray
+        :return: The supply vectors, in the same shape as `demand`.
+        :rtype: np.ndarray
+        """
+        return self._lu.solve(np.asarray(demand, dtype=np.float64))
+
+    def supply(self, activities: list, amounts: list = None):
+        """
+        Yields blocks of supply vectors for `activities`.
+
+        :param activities: A list of activities to solve.
+        :type activities: list
+        :param amounts: Demanded amount for each activity. Defaults to one unit each.
+        :type amounts: list, optional
+        :return: Generator of ``(start, supply)`` tuples, where `supply` is a
+            (product x chunk) array whose first column belongs to ``activities[start]``.
+        """
+        activities = list(activities)
+        if amounts is None:
+            amounts = np.ones(len(activities))
+        amounts = np.asarray(amounts, dtype=np.float64)
+        rows = np.array([self.product_index(act) for act in activities], dtype=np.int64)
+        size = self.lca.technosphere_matrix.shape[0]
+
+        for start in range(0, len(activities), self.chunk_size):
+            stop = min(start + self.chunk_size, len(activities))
+            demand = np.zeros((size, stop - start))
+            demand[rows[start:stop], np.arange(stop - start)] = amounts[start:stop]
+            yield start, self.solve(demand)
+
+    def scores(self, activities: list, methods: list = None, amounts: list = None) -> np.ndarray:
+        """
+        Computes the LCA score of each activity for each method.
+
+        The inventory of each block of activities is computed once and characterized with all
+        methods at the same time.
+
+        :param activities: A list of activities to compute scores for.
+        :type activities: list
+        :param methods: A list of methods. Defaults to the engine's methods.
+        :type methods: list, optional
+        :param amounts: Demanded amount for each activity. Defaults to one unit each.
+        :type amounts: list, optional
+        :return: A (method x activity) array of scores.
+        :rtype: np.ndarray
+        """
+        activities = list(activities)
+        characterization = self.characterization_matrix(methods)
+        results = np.zeros((characterization.shape[0], len(activities)))
+
+        for start, supply in self.supply(activities, amounts):
+            inventory = self.lca.biosphere_matrix @ supply
+            results[:, start:start + supply.shape[1]] = characterization @ inventory
+
+        return results
+
+    def flow_contributions(self, activities: list, methods: list = None, amounts: list = None,
+                           top_k: int = TOP_FLOWS):
+        """
+        Computes the characterized elementary flows of each activity for each method, and keeps
+        the `top_k` largest in absolute value.
+
+        The inventory of each block of activities is one sparse product of the biosphere matrix
+        and the supply block, characterized with all methods in turn.
+
+        :param activities: A list of activities.
+        :type activities: list
+        :param methods: A list of methods. Defaults to the engine's methods.
+        :type methods: list, optional
+        :param amounts: Demanded amount for each activity. Defaults to one unit each.
+        :type amounts: list, optional
+        :param top_k: Number of flows kept per activity and method.
+        :type top_k: int, optional
+        :return: A tuple ``(flows, contributions, scores)``, where `flows` holds the biosphere
+            matrix rows of the kept flows and `contributions` their characterized amounts, both
+            (method x activity x k) arrays sorted by decreasing absolute contribution, and
+            `scores` is the (method x activity) array of total scores.
+        :rtype: tuple
+        """
+        activities = list(activities)
+        characterization = self.characterization_matrix(methods)
+        n_methods, n_flows = characterization.shape
+        k = max(min(top_k, n_flows), 0)
+
+        flows = np.zeros((n_methods, len(activities), k), dtype=np.int64)
+        contributions = np.zeros((n_methods, len(activities), k))
+        scores = np.zeros((n_methods, len(activities)))
+
+        for start, supply in self.supply(activities, amounts):
+            stop = start + supply.shape[1]
+            inventory = self.lca.biosphere_matrix @ supply
+            for i, factors in enumerate(characterization):
+                characterized = factors[:, None] * inventory
+                scores[i, start:stop] = characterized.sum(axis=0)
+                if not k:
+                    continue
+
+                # Largest flows of each column, then sorted
+                top = np.argpartition(-np.abs(characterized), k - 1, axis=0)[:k]
+                values = np.take_along_axis(characterized, top, axis=0)
+                order = np.argsort(-np.abs(values), axis=0, kind="stable")
+                flows[i, start:stop] = np.take_along_axis(top, order, axis=0).T
+                contributions[i, start:stop] = np.take_along_axis(values, order, axis=0).T
+
+        return flows, contributions, scores
+
+    def _supply_graph(self):
+        """
+        Returns the technosphere matrix in CSC format, the product row of every activity column,
+        the producing column of every product row (-1 if none), and the production amount of
+        every activity. Built once per engine.
+        """
+        if self._graph is None:
+            technosphere = self.lca.technosphere_matrix.tocsc()
+            if bc_version >= (2, 0, 0):
+                columns, rows = self.lca.dicts.activity, self.lca.dicts.product
+            else:
+                columns, rows = self.lca.activity_dict, self.lca.product_dict
+
+            product_of = np.full(technosphere.shape[1], -1, dtype=np.int64)
+            producer_of = np.full(technosphere.shape[0], -1, dtype=np.int64)
+            for identifier, column in columns.items():
+                row = rows.get(identifier)
+                if row is not None:
+                    product_of[column] = row
+                    producer_of[row] = column
+
+            produced = product_of >= 0
+            production = np.ones(technosphere.shape[1])
+            production[produced] = np.asarray(
+                technosphere[product_of[produced], np.flatnonzero(produced)]
+            ).ravel()
+            self._graph = technosphere, product_of, producer_of, production
+        return self._graph
+
+    def unit_scores(self, method: tuple):
+        """
+        Returns the scores of one unit of the reference product of every activity for `method`.
+
+        All scores come from one solve of the transposed technosphere system with the existing
+        factorization, and are kept for later calls.
+
+        :return: A tuple ``(total, direct)`` of arrays indexed by activity column: the life cycle
+            score of one unit of product, and the score of the direct emissions of producing it.
+        :rtype: tuple
+        """
+        if method not in self._unit_scores:
+            _, product_of, _, production = self._supply_graph()
+            direct = self.lca.biosphere_matrix.T @ self.characterization_vector(method)
+            total = self._lu.solve(np.asarray(direct, dtype=np.float64), trans="T")
+            self._unit_scores[method] = (
+                np.where(product_of >= 0, total[product_of], 0.0),
+                direct / production,
+            )
+            self._cached_bytes += sum(array.nbytes for array in self._unit_scores[method])
+        return self._unit_scores[method]
+
+    def inputs(self, column: int):
+        """
+        Returns the inputs of one unit of the reference product of the activity of `column`.
+
+        :return: A tuple ``(columns, amounts)`` of the supplying activity columns and the amounts
+            of their products, read from the technosphere matrix and kept for later calls.
+        :rtype: tuple
+        """
+        if column not in self._inputs:
+            technosphere, product_of, producer_of, production = self._supply_graph()
+            start, stop = technosphere.indptr[column], technosphere.indptr[column + 1]
+            rows = technosphere.indices[start:stop]
+            amounts = -technosphere.data[start:stop] / production[column]
+
+            keep = rows != product_of[column]
+            columns = producer_of[rows[keep]]
+            amounts = amounts[keep]
+            self._inputs[column] = columns[columns >= 0], amounts[columns >= 0]
+            self._cached_bytes += sum(array.nbytes for array in self._inputs[column])
+        return self._inputs[column]
+
+    def activities(self, columns) -> dict:
+        """
+        Returns the activities of matrix `columns`, read with bulk queries and kept for later calls.
+
+        :return: A dictionary of activity column to ``Activity``.
+        :rtype: dict
+        """
+        if self._reverse is None:
+            if bc_version >= (2, 0, 0):
+                self._reverse = self.lca.dicts.activity.reversed
+            else:
+                self._reverse, _, _ = self.lca.reverse_dict()
+        reverse = self._reverse
+
+        missing = {reverse[column]: column for column in set(columns) if column not in self._activities}
+        identifiers = list(missing)
+        for start in range(0, len(identifiers), QUERY_CHUNK_SIZE):
+            chunk = identifiers[start:start + QUERY_CHUNK_SIZE]
+            if bc_version >= (2, 0, 0):
+                query = ActivityDataset.select().where(ActivityDataset.id.in_(chunk))
+            else:
+                # Keys are (database, code)
+                query = ActivityDataset.select().where(
+                    ActivityDataset.code.in_([code for _, code in chunk])
+                )
+            for ds in query:
+                identifier = ds.id if bc_version >= (2, 0, 0) else (ds.database, ds.code)
+                if identifier in missing:
+                    self._activities[missing[identifier]] = Activity(ds)
+        return {column: self._activities[column] for column in columns}
+
+
+class RowLabels:
+    """
+    Group labels of the rows of the technosphere and biosphere matrices, read on demand with
+    bulk queries and kept for later calls.
+
+    Technosphere rows are labelled by the CPC class of the supplying activity, or its reference
+    product if it has none, and biosphere rows by flow name and compartment.
+    """
+
+    def __init__(self, lca):
+        if bc_version >= (2, 0, 0):
+            self._products = lca.dicts.product.reversed
+            self._flows = lca.dicts.biosphere.reversed
+        else:
+            _, self._products, self._flows = lca.reverse_dict()
+        self._labels = {}  # dataset id or key -> label
+
+    def technosphere(self, rows: np.ndarray) -> np.ndarray:
+        return self._rows(rows, self._products, _technosphere_label)
+
+    def biosphere(self, rows: np.ndarray) -> np.ndarray:
+        return self._rows(rows, self._flows, _biosphere_label)
+
+    def _rows(self, rows, reverse, label) -> np.ndarray:
+        unique, inverse = np.unique(rows, return_inverse=True)
+        identifiers = [reverse[row] for row in unique]
+        self._load([i for i in identifiers if i not in self._labels], label)
+        labels = np.array([self._labels.get(i, str(i)) for i in identifiers], dtype=object)
+        return labels[inverse.reshape(np.shape(rows))]
+
+    def _load(self, identifiers: list, label):
+        if bc_version >= (2, 0, 0):
+            for start in range(0, len(identifiers), QUERY_CHUNK_SIZE):
+                chunk = identifiers[start:start + QUERY_CHUNK_SIZE]
+                for ds in ActivityDataset.select().where(ActivityDataset.id.in_(chunk)):
+                    self._labels[ds.id] = label(ds)
+            return
+
+        # Keys are (database, code)
+        codes = defaultdict(list)
+        for database, code in identifiers:
+            codes[database].append(code)
+        for database, database_codes in codes.items():
+            for start in range(0, len(database_codes), QUERY_CHUNK_SIZE):
+                chunk = database_codes[start:start + QUERY_CHUNK_SIZE]
+                query = ActivityDataset.select().where(
+                    (ActivityDataset.database == database) & ActivityDataset.code.in_(chunk)
+                )
+                for ds in query:
+                    self._labels[(ds.database, ds.code)] = label(ds)
+
+
+def _technosphere_label(ds) -> str:
+    for system, value in ds.data.get("classifications", []):
+        if system == "CPC":
+            return value
+    return ds.product or ds.name
+
+
+def _biosphere_label(ds) -> str:
+    categories = ds.data.get("categories")
+    return f"{ds.name} ({'::'.join(categories)})" if categories else ds.name
+
+
+class EngineCache:
+    """
+    Keeps `BatchedLCA` engines between analyses, keyed by the databases they are built from.
+
+    An engine is reused for any analysis whose activities belong to the same databases, as long
+    as none of these databases, or the databases they depend on, was modified since. Engines
+    unused for `idle_timeout` seconds are dropped, and the least recently used engines are
+    dropped when the cache holds more than `max_engines` engines or more than `memory_limit`
+    bytes (estimated).
+
+    Methods
+    -------
+    get(activities, methods)
+        Returns a warm engine for the activities, building it if needed.
+    clear()
+        Drops all engines.
+    """
+
+    def __init__(self, max_engines: int = MAX_ENGINES, idle_timeout: float = ENGINE_IDLE_TIMEOUT,
+                 memory_limit: int = ENGINE_MEMORY_LIMIT):
+        self.max_engines = max_engines
+        self.idle_timeout = idle_timeout
+        self.memory_limit = memory_limit
+        self._engines = {}  # key -> (engine, last use)
+        self._lock = threading.Lock()
+
+    def get(self, activities: list, methods: list) -> BatchedLCA:
+        """
+        Returns an engine whose matrices include all of `activities`.
+
+        :param activities: A list of activities to be solved by the engine.
+        :type activities: list
+        :param methods: A list of method tuples, used when a new engine is built. An engine
+            holding characterization factors of these methods that were written again since is
+            built again.
+        :type methods: list
+        :rtype: BatchedLCA
+        """
+        activities = list(activities)
+        key = _engine_key(activities)
+        states = {method: method_state(method) for method in methods}
+
+        with self._lock:
+            self._evict_idle()
+            # Characterization matrices of methods written again since are stale
+            if key in self._engines and any(
+                self._engines[key][0].method_states.get(method, state) != state
+                for method, state in states.items()
+            ):
+                del self._engines[key]
+            if key in self._engines:
+                engine = self._engines[key][0]
+                engine.method_states.update(states)
+                self._engines[key] = (engine, time.monotonic())
+                # The engine may have grown since, with what it keeps for later calls
+                self._evict_lru()
+                return engine
+
+        engine = BatchedLCA(activities, methods)
+        engine.method_states.update(states)
+
+        with self._lock:
+            self._engines[key] = (engine, time.monotonic())
+            self._evict_lru()
+        return engine
+
+    def clear(self):
+        with self._lock:
+            self._engines.clear()
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        for key, (_, last_use) in list(self._engines.items()):
+            if now - last_use > self.idle_timeout:
+                del self._engines[key]
+
+    def _evict_lru(self):
+        def total():
+            return sum(engine.nbytes for engine, _ in self._engines.values())
+
+        while len(self._engines) > 1 and (
+            len(self._engines) > self.max_engines or total() > self.memory_limit
+        ):
+            oldest = min(self._engines, key=lambda k: self._engines[k][1])
+            del self._engines[oldest]
+
+
+def method_state(method: tuple):
+    """
+    Modification time of the characterization factors of `method`, to detect factors written
+    again under the same name. Written factors are processed again, so the processed file
+    changes too.
+    """
+    if method not in bd.methods:
+        return None
+    try:
+        processed = os.path.getmtime(bd.Method(method).filepath_processed())
+    except OSError:
+        processed = None
+    return bd.methods[method].get("modified"), processed
+
+
+def _engine_key(activities: list) -> frozenset:
+    """
+    The databases the matrices of `activities` are built from, with their modification times.
+    """
+    names = set()
+    for db in {act["database"] for act in activities}:
+        names.update(bd.Database(db).find_graph_dependents())
+    return frozenset((name, bd.databases.get(name, {}).get("modified")) for name in names)
+
+
+engine_cache = EngineCache()
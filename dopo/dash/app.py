@@ -1,18 +1,47 @@
+import os
+import time
+from collections import defaultdict
 from typing import List, Tuple, Union
-from dash import Dash, html, dcc, callback_context, no_update, ctx
+from dash import Dash, html, dcc, callback_context, no_update, ctx, ClientsideFunction, Patch
 from dash.dependencies import Output, Input, State
 import dash_bootstrap_components as dbc
+import pandas as pd
 import plotly.graph_objects as go
 
-from .components.sidebar import sidebar_layout
+from .components.sidebar import PICKERS, sidebar_layout
 from .components.main_content import main_content_layout
 from .calculations.calculation import (
     get_projects, get_methods, get_databases,
-    activate_project, analyze, get_classifications_from_database, get_datasets
+    analyze, analysis_key, search_classifications, search_dataset_names
 )
 from dopo.dopo import SECTORS
-from .utils.conversion import convert_dataframe_to_dict
-from .plot.plot import contribution_plot, prepare_dataframe, scores_plot
+from .calculations.projects import project_catalog
+from .calculations.search import PAGE_SIZE, SearchIndex
+from .calculations.jobs import job_manager, DONE, FAILED
+from .components.top_bar import progress_bar_style
+from .utils.cache import figure_cache, result_cache
+from .utils.result_frame import ResultFrame
+from .utils.payload import view_payload
+from .plot.plot import contribution_plot, scores_plot
+
+# Render sector, method and plot changes in the browser (see utils/payload.py and assets/views.js)
+CLIENTSIDE_VIEWS = os.environ.get("DOPO_CLIENTSIDE_VIEWS", "").lower() in ("1", "true", "yes")
+
+# Dropdowns selecting the view of the results
+VIEW_DROPDOWNS = ["dropdown-1", "dropdown-2", "dropdown-3"]
+
+# Minimum seconds between two partial result sets of a running analysis
+PARTIAL_INTERVAL = 1.0
+
+# Prefix of the handles of partial results, followed by the job id and revision
+PARTIAL_HANDLE = "partial:"
+
+# Seconds input contributions are refined for by a quick analysis, and by each refinement
+QUICK_DEADLINE = 5.0
+REFINE_DEADLINE = 30.0
+
+# Search index of the predefined sectors
+SECTOR_INDEX = SearchIndex(sorted(SECTORS))
 
 # Initialize Dash app
 app = Dash(__name__, external_stylesheets=[dbc.themes.YETI, dbc.icons.FONT_AWESOME])
@@ -21,6 +50,9 @@ app = Dash(__name__, external_stylesheets=[dbc.themes.YETI, dbc.icons.FONT_AWESO
 app.layout = html.Div([
     dcc.Interval(id="initial-load", interval=1, n_intervals=0, max_intervals=1),
     dcc.Store(id="analyze-data-store"),
+    dcc.Store(id="job-store"),
+    dcc.Store(id="view-payload-store"),
+    dcc.Interval(id="job-poll", interval=500, disabled=True),
     html.Div([
         sidebar_layout,
         main_content_layout
@@ -47,8 +79,7 @@ def populate_projects_on_load(n_intervals: int) -> Tuple[List[dict], str]:
 )
 def update_databases(selected_project: str) -> List[dict]:
     """Update the database list based on selected project."""
-    activate_project(selected_project)
-    databases = get_databases()
+    databases = get_databases(selected_project)
     return [{"label": db[:30], "value": db} for db in databases]
 
 
@@ -73,45 +104,99 @@ def toggle_dataset_checklists(selected_types: List[str]) -> Tuple[dict, dict, di
 
 
 @app.callback(
-    [Output("sectors-checklist", "options"),
-     Output("cpc-checklist", "options"),
-     Output("isic-checklist", "options"),
-     Output("dataset-checklist", "options"),
-     ],
+    [Output(f"{picker}-checklist", "options") for picker in PICKERS] +
+    [Output(f"{picker}-status", "children") for picker in PICKERS] +
+    [Output(f"{picker}-load-more", "style") for picker in PICKERS] +
+    [Output("picker-limits", "data")],
     [Input("dataset-type-checklist", "value"),
      Input("databases-checklist", "value"),
-     Input("dataset-search", "value")],
+     Input("dataset-search", "value")] +
+    [Input(f"{picker}-load-more", "n_clicks") for picker in PICKERS],
+    [State("projects-radioitems", "value"),
+     State("picker-limits", "data")] +
+    [State(f"{picker}-checklist", "value") for picker in PICKERS],
     prevent_initial_call=True
 )
 def update_filtered_dataset_options(
     selected_types: List[str],
     selected_databases: List[str],
-    search_term: Union[str, None]
-) -> Tuple[List[dict], List[dict], List[dict], List[dict]]:
-    """Update checklist options for sectors, CPC, and ISIC based on selection and search."""
-    if not selected_databases:
-        return [], [], [], []
-
-    selected_db = selected_databases[0]
-    search_term = (search_term or "").lower()
+    search_term: Union[str, None],
+    sectors_clicks: Union[int, None] = None,
+    cpc_clicks: Union[int, None] = None,
+    isic_clicks: Union[int, None] = None,
+    dataset_clicks: Union[int, None] = None,
+    project: Union[str, None] = None,
+    limits: Union[dict, None] = None,
+    selected_sectors: Union[List[str], None] = None,
+    selected_cpc: Union[List[str], None] = None,
+    selected_isic: Union[List[str], None] = None,
+    selected_datasets: Union[List[str], None] = None,
+) -> Tuple:
+    """
+    Update checklist options for sectors, CPC, ISIC and datasets based on selection and search.
 
-    def filter_items(items: List[str]) -> List[str]:
-        return [item for item in items if search_term in item.lower()]
+    Each picker sends its first `PAGE_SIZE` matches only; its "load more" button fetches the next
+    page of that picker alone and appends it to its options with a `Patch`, the others being left
+    unchanged. Selected items stay listed.
+    """
+    limits = dict(limits or {})
+    selected = dict(zip(PICKERS, [selected_sectors, selected_cpc, selected_isic, selected_datasets]))
 
-    sectors_options, cpc_options, isic_options, dataset_options = [], [], [], []
+    hidden = {"display": "none"}
+    if not selected_databases:
+        return [[]] * len(PICKERS) + [""] * len(PICKERS) + [hidden] * len(PICKERS) + [{}]
 
-    if "sectors" in selected_types:
-        sectors_options = [{"label": s, "value": s} for s in filter_items(sorted(SECTORS))]
-    if "cpc" in selected_types:
-        cpc_data = get_classifications_from_database(selected_db, "cpc")
-        cpc_options = [{"label": item, "value": item} for item in filter_items(cpc_data)]
-    if "isic" in selected_types:
-        isic_data = get_classifications_from_database(selected_db, "isic")
-        isic_options = [{"label": item, "value": item} for item in filter_items(isic_data)]
-    if "dataset" in selected_types:
-        dataset_options = [{"label": item, "value": item} for item in filter_items(list(set([ds["name"] for ds in get_datasets(selected_db)])))]
+    selected_db = selected_databases[0]
+    search_term = search_term or ""
+    searches = {
+        "sectors": SECTOR_INDEX.search,
+        "cpc": lambda *args: search_classifications(selected_db, "cpc", *args, project=project),
+        "isic": lambda *args: search_classifications(selected_db, "isic", *args, project=project),
+        "dataset": lambda *args: search_dataset_names(selected_db, *args, project=project),
+    }
+
+    # A "load more" click pages its own picker only; anything else starts all pickers over
+    loading = next((picker for picker in PICKERS if ctx.triggered_id == f"{picker}-load-more"), None)
+    if loading is not None:
+        pickers = [loading]
+        limits[loading] = limits.get(loading, PAGE_SIZE) + PAGE_SIZE
+    else:
+        pickers = PICKERS
+        limits = {picker: PAGE_SIZE for picker in PICKERS}
+
+    options = {picker: no_update for picker in PICKERS}
+    status = {picker: no_update for picker in PICKERS}
+    load_more = {picker: no_update for picker in PICKERS}
+    for picker in pickers:
+        if picker not in (selected_types or []):
+            options[picker], status[picker], load_more[picker] = [], "", hidden
+            continue
+        if picker == loading:
+            # Send the new page only, appended to the options the browser already has
+            offset = limits[picker] - PAGE_SIZE
+            items, total = searches[picker](search_term, offset, PAGE_SIZE)
+            listed = set(selected[picker] or [])
+            options[picker] = Patch()
+            options[picker].extend(
+                [{"label": item, "value": item} for item in items if item not in listed]
+            )
+        else:
+            offset = 0
+            items, total = searches[picker](search_term, 0, limits[picker])
+            # Keep selected items visible, whatever the search term
+            page = set(items)
+            listed = [item for item in selected[picker] or [] if item not in page] + items
+            options[picker] = [{"label": item, "value": item} for item in listed]
+        shown = offset + len(items)
+        status[picker] = f"{shown} of {total}" if total else ""
+        load_more[picker] = {"display": "block"} if shown < total else hidden
 
-    return sectors_options, cpc_options, isic_options, dataset_options
+    return (
+        [options[picker] for picker in PICKERS] +
+        [status[picker] for picker in PICKERS] +
+        [load_more[picker] for picker in PICKERS] +
+        [limits]
+    )
 
 
 @app.callback(
@@ -154,8 +239,7 @@ def update_impact_assessment_list(
     if not selected_project:
         return []
 
-    activate_project(selected_project)
-    all_methods = get_methods()
+    all_methods = get_methods(selected_project)
 
     if trigger == "impact-search" and search_term:
         search_term = search_term.lower()
@@ -165,6 +249,143 @@ def update_impact_assessment_list(
 
     return [{"label": "-".join(method), "value": str(method)} for method in filtered]
 
+def _run_analysis(progress=None, **params) -> str:
+    """
+    Runs an analysis in a background job and returns the handle of its cached results.
+
+    While it runs, the (sector, method) views completed so far are reported as `partial` results,
+    at most every PARTIAL_INTERVAL seconds. They are kept on the job, see `_results`; only the
+    finished results are put in the result cache.
+    """
+    views = defaultdict(dict)  # sector -> method -> scores
+    frames = {}  # sector -> concatenated scores of its views
+    changed, published = set(), 0.0
+
+    def report(done, total, message="", view=None):
+        nonlocal published
+        if view is not None:
+            sector, method, scores = view
+            views[sector][method] = scores
+            changed.add(sector)
+
+        partial = None
+        if changed and time.monotonic() - published >= PARTIAL_INTERVAL:
+            # Only sectors with new views are concatenated again
+            for sector in changed:
+                frames[sector] = pd.concat(list(views[sector].values()))
+            partial = ResultFrame(dict(frames))
+            changed.clear()
+            published = time.monotonic()
+
+        if progress is not None:
+            progress(done, total, message, partial=partial)
+
+    result_data = analyze(**params, progress=report)
+    # Keep the results on the server, indexed for the plots; the browser only stores the handle
+    return result_cache.put(ResultFrame(result_data or {}))
+
+
+def _partial_handle(job) -> str:
+    """Handle of the last partial results of a running job, changed by every new partial result."""
+    return f"{PARTIAL_HANDLE}{job.id}/{job.revision}"
+
+
+def _results(handle: str):
+    """
+    Results behind a handle kept by the browser: finished results from the result cache, or the
+    last partial results of a job (its results once it is done). None if they expired.
+    """
+    if not handle:
+        return None
+    if handle.startswith(PARTIAL_HANDLE):
+        job = job_manager.get(handle[len(PARTIAL_HANDLE):].split("/")[0])
+        if job is None:
+            return None
+        if job.status == DONE:
+            return result_cache.get(job.result)
+        return job.partial
+    return result_cache.get(handle)
+
+
+def _figure(results: ResultFrame, sector: str, method: str, plot: str) -> go.Figure:
+    """Plot of one (sector, method) slice of the results."""
+    if plot == "total":
+        scores = results.scores(sector, method)
+        if scores.empty:
+            return go.Figure()
+        return scores_plot(df=scores, sector=sector, impact_assessment=method,
+                           statistics=results.statistics(sector, method))
+
+    contributions = results.contributions(sector, method)
+    if contributions.empty:
+        return go.Figure()
+    return contribution_plot(df=contributions, sector=sector, impact_assessment=method,
+                             legend_title="Elementary flow" if plot == "flows" else "Input")
+
+
+def _view_figure(handle: str, sector: str, method: str, plot: str):
+    """Figure of a view of the results, rendered once per result set and view. None if the results expired."""
+
+    def render():
+        result_data = _results(handle)
+        if not isinstance(result_data, ResultFrame) or sector not in result_data:
+            return None
+        return _figure(result_data, sector, method, plot)
+
+    return figure_cache.get_or_render((handle, sector, method, plot), render)
+
+
+def _render_results(handle: str, params: dict, sector: str = None, method: str = None,
+                    plot: str = None) -> Tuple:
+    """
+    Figure and dropdown options shown for finished or partial results.
+
+    Sectors and methods without results yet are disabled. The current selection is kept if it
+    has results; otherwise the first view with results is shown.
+    """
+    results = _results(handle)
+    dataset_search = params["search_type"] == "dataset"
+
+    def available(sector_name, method_name) -> bool:
+        if dataset_search:
+            sector_name = "selected datasets"
+        return isinstance(results, ResultFrame) and results.has(sector_name, method_name)
+
+    methods = params["impact_assessments"]
+    sector_options = [
+        {"label": s, "value": s, "disabled": not any(available(s, m) for m in methods)}
+        for s in params["filters"]
+    ]
+    if not any(option["value"] == sector and not option["disabled"] for option in sector_options):
+        enabled = [option["value"] for option in sector_options if not option["disabled"]]
+        sector = (enabled or [option["value"] for option in sector_options] or [None])[0]
+    if dataset_search:
+        sector = "selected datasets"
+
+    impact_options = [{"label": m, "value": m, "disabled": not available(sector, m)} for m in methods]
+    if not any(option["value"] == method and not option["disabled"] for option in impact_options):
+        enabled = [option["value"] for option in impact_options if not option["disabled"]]
+        method = (enabled or methods or [None])[0]
+
+    # Contributions are broken down into inputs or elementary flows, as analyzed
+    if params.get("breakdown") == "flows":
+        contribution = {"label": "Contribution (elementary flows)", "value": "flows"}
+    else:
+        contribution = {"label": "Contribution", "value": "contribution"}
+    plot_options = [{"label": "Total Scores", "value": "total"}, contribution]
+    if plot not in [option["value"] for option in plot_options]:
+        plot = plot_options[0]["value"]
+
+    fig = _view_figure(handle, sector, method, plot) or go.Figure()
+
+    return (
+        fig,
+        sector_options, sector,
+        impact_options, method,
+        plot_options, plot,
+    )
+
+
 @app.callback(
     [Output("analyze-data-store", "data"),
      Output("main-plot", "figure"),
@@ -174,12 +395,16 @@ def update_impact_assessment_list(
      Output("dropdown-2", "value"),
      Output("dropdown-3", "options"),
      Output("dropdown-3", "value"),
-     Output("loading-placeholder", "children")],
+     Output("loading-placeholder", "children"),
+     Output("job-store", "data"),
+     Output("job-poll", "disabled")],
+    # With clientside views, dropdown changes are handled in the browser
     [Input("calc-button", "n_clicks"),
-     Input("dropdown-1", "value"),
-     Input("dropdown-2", "value"),
-     Input("dropdown-3", "value")],
-    [State("projects-radioitems", "value"),
+     Input("job-poll", "n_intervals"),
+     Input("refine-button", "n_clicks")]
+    + ([] if CLIENTSIDE_VIEWS else [Input(dropdown, "value") for dropdown in VIEW_DROPDOWNS]),
+    ([State(dropdown, "value") for dropdown in VIEW_DROPDOWNS] if CLIENTSIDE_VIEWS else [])
+    + [State("projects-radioitems", "value"),
      State("databases-checklist", "value"),
      State("sectors-checklist", "value"),
      State("cpc-checklist", "value"),
@@ -189,10 +414,15 @@ def update_impact_assessment_list(
      State("analyze-data-store", "data"),
      State("dataset-type-checklist", "value"),
      State("excl-markets-check", "value"),
+     State("breakdown-check", "value"),
+     State("quick-check", "value"),
+     State("job-store", "data"),
      ]
 )
 def run_analysis_and_plot(
     n_clicks: int,
+    n_intervals: int,
+    refine_clicks: int,
     selected_sector: str,
     selected_method: str,
     selected_plot: str,
@@ -203,15 +433,24 @@ def run_analysis_and_plot(
     isic: List[str],
     dataset: List[str],
     methods: List[str],
-    stored_data: dict,
+    stored_data: str,
     search_type: List[str],
-    exclude_markets: List[str]
+    exclude_markets: List[str],
+    breakdown: List[str],
+    quick: List[str],
+    job_id: str,
 ) -> Tuple:
-    """Main analysis and plot callback. Handles running the analysis and updating the UI."""
+    """
+    Main analysis and plot callback. Starts the analysis as a background job, shows its results
+    once it is finished, refines quick results on request, and updates the plot when a dropdown
+    changes.
+    """
     triggered_id = callback_context.triggered[0]["prop_id"].split(".")[0]
 
     search_type = search_type[0] if isinstance(search_type, list) and search_type else "sectors"
     exclude_flag = bool(exclude_markets and "exclude" in exclude_markets)
+    breakdown = "flows" if breakdown and "flows" in breakdown else "inputs"
+    deadline = QUICK_DEADLINE if quick and "quick" in quick else None
 
     # Choose correct dataset based on search_type
     if search_type == "cpc":
@@ -224,6 +463,7 @@ def run_analysis_and_plot(
         selected_items = sectors
 
     selected_items = [item.strip() for item in selected_items or []]
+    calc_button = dbc.Button("Run Calculation", id="calc-button", n_clicks=n_clicks)
 
     if triggered_id == "calc-button" and n_clicks > 0:
         if not databases:
@@ -236,59 +476,161 @@ def run_analysis_and_plot(
             msg = None
 
         if msg:
-            return None, go.Figure(), [], None, [], None, [], None, html.Div(msg, style={"color": "red"})
-
-        result_data = analyze(
-            project,
-            databases,
-            methods,
-            selected_items,
-            search_type=search_type,
-            exclude_markets=exclude_flag,
+            return None, go.Figure(), [], None, [], None, [], None, html.Div(msg, style={"color": "red"}), None, True
+
+        params = {
+            "project": project,
+            "databases": databases,
+            "impact_assessments": methods,
+            "filters": selected_items,
+            "search_type": search_type,
+            "exclude_markets": exclude_flag,
+            "breakdown": breakdown,
+            "deadline": deadline,
+        }
+        key = analysis_key(project, databases, methods, selected_items, search_type, exclude_flag, breakdown,
+                           deadline)
+        job = job_manager.submit(key, params, _run_analysis)
+
+        # Results of a finished job may have been evicted from the cache
+        if job.status == DONE and result_cache.get(job.result) is None:
+            job_manager.discard(job.id)
+            job = job_manager.submit(key, params, _run_analysis)
+
+        return (
+            no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update,
+            calc_button, job.id, False
+        )
+
+    elif triggered_id == "refine-button" and refine_clicks:
+        # Continue refining the contributions of the last analysis, kept by its worker
+        job = job_manager.get(job_id)
+        if job is None or not job.finished:
+            return no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update
+
+        # The approximate results of the quick analysis are superseded by the refined ones
+        job_manager.discard_key(analysis_key(**dict(job.params, deadline=QUICK_DEADLINE)))
+        params = dict(job.params, deadline=REFINE_DEADLINE)
+        job = job_manager.submit(analysis_key(**params) + ("refine", refine_clicks), params, _run_analysis)
+        return (
+            no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update,
+            calc_button, job.id, False
         )
-        for key, val in result_data.items():
-            result_data[key] = convert_dataframe_to_dict(val)
 
-        sector_options = [{"label": s, "value": s} for s in selected_items]
+    elif triggered_id == "job-poll":
+        job = job_manager.get(job_id)
+        if job is None:
+            return no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, None, True
+        if not job.finished:
+            # Show the views completed so far
+            if job.partial is not None and _partial_handle(job) != stored_data:
+                handle = _partial_handle(job)
+                views = _render_results(handle, job.params, selected_sector, selected_method, selected_plot)
+                return (handle, *views, no_update, no_update, no_update)
+            return no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update
+        if job.status != DONE:
+            color = "red" if job.status == FAILED else "black"
+            return no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, \
+                html.Div([calc_button, html.Div(job.message, style={"color": color})]), no_update, True
+
+        views = _render_results(job.result, job.params, selected_sector, selected_method, selected_plot)
+        return (job.result, *views, calc_button, no_update, True)
+
+    elif triggered_id in VIEW_DROPDOWNS and stored_data:
         if search_type == "dataset":
-            default_sector = "selected datasets"
-        else:
-            default_sector = sector_options[0]["value"] if sector_options else None
+            selected_sector = "selected datasets"
+        fig = _view_figure(stored_data, selected_sector, selected_method, selected_plot)
+        if fig is None:
+            msg = "Results have expired. Please run the calculation again."
+            return None, go.Figure(), no_update, no_update, no_update, no_update, no_update, no_update, html.Div(msg, style={"color": "red"}), no_update, no_update
 
-        impact_options = [{"label": m, "value": m} for m in methods]
-        default_impact = impact_options[0]["value"] if impact_options else None
+        return stored_data, fig, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update
 
-        plot_options = [
-            {"label": "Total Scores", "value": "total"},
-            {"label": "Contribution", "value": "contribution"}
-        ]
-        default_plot = plot_options[0]["value"]
+    return no_update, go.Figure(), no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update
 
-        filtered_data = prepare_dataframe(df=result_data, sector=default_sector, impact=default_impact)
 
-        fig = scores_plot(df=filtered_data, sector=default_sector, impact_assessment=default_impact) \
-            if default_plot == "total" else \
-            contribution_plot(df=filtered_data, sector=default_sector, impact_assessment=default_impact)
+@app.callback(
+    [Output("refine-status", "children"),
+     Output("refine-button", "style")],
+    Input("analyze-data-store", "data"),
+    State("job-store", "data"),
+)
+def update_refine_status(handle: str, job_id: str) -> Tuple:
+    """Show how much of the results is refined, and the refine button for approximate results."""
+    results = _results(handle)
+    job = job_manager.get(job_id)
+    if not isinstance(results, ResultFrame) or job is None or not job.finished:
+        return "", {"display": "none"}
 
-        return (
-            result_data, fig,
-            sector_options, default_sector,
-            impact_options, default_impact,
-            plot_options, default_plot,
-            dbc.Button("Run Calculation", id="calc-button", n_clicks=n_clicks)
-        )
+    share = results.refined_share()
+    if share >= 1.0:
+        return "", {"display": "none"}
+    return f"Approximate results: {share:.0%} of the scores broken down", {"display": "inline-block"}
 
-    elif triggered_id in ["dropdown-1", "dropdown-2", "dropdown-3"] and stored_data:
-        if search_type == "dataset":
-            selected_sector = "selected datasets"
-        filtered_data = prepare_dataframe(df=stored_data, sector=selected_sector, impact=selected_method)
-        fig = scores_plot(df=filtered_data, sector=selected_sector, impact_assessment=selected_method) \
-            if selected_plot == "total" else \
-            contribution_plot(df=filtered_data, sector=selected_sector, impact_assessment=selected_method)
 
-        return stored_data, fig, no_update, no_update, no_update, no_update, no_update, no_update, no_update
+@app.callback(
+    [Output("progress-bar", "style"),
+     Output("progress-bar", "children"),
+     Output("progress-label", "children"),
+     Output("progress-indicator", "value"),
+     Output("cancel-button", "disabled")],
+    [Input("job-poll", "n_intervals"),
+     Input("job-store", "data")],
+)
+def update_progress(n_intervals: int, job_id: str) -> Tuple:
+    """Show the progress of the current analysis job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return progress_bar_style(0), "", "", False, True
+
+    percent = job.percent
+    label = f"{job.message} ({job.done}/{job.total})" if job.total and not job.finished else job.message
+    return progress_bar_style(percent), f"{percent}%", label, not job.finished, job.finished
+
+
+@app.callback(
+    Output("cancel-button", "n_clicks"),
+    Input("cancel-button", "n_clicks"),
+    State("job-store", "data"),
+    prevent_initial_call=True
+)
+def cancel_analysis(n_clicks: int, job_id: str) -> int:
+    """Cancel the current analysis job."""
+    if n_clicks:
+        job_manager.cancel(job_id)
+    return 0
+
+if CLIENTSIDE_VIEWS:
+    @app.callback(
+        Output("view-payload-store", "data"),
+        Input("analyze-data-store", "data"),
+        State("job-store", "data"),
+        prevent_initial_call=True
+    )
+    def ship_view_payload(handle: str, job_id: str) -> dict:
+        """
+        Send all views of finished results to the browser, once. Partial results change about
+        every PARTIAL_INTERVAL seconds, so their views are rendered by the server instead.
+        """
+        job = job_manager.get(job_id)
+        if not handle or handle.startswith(PARTIAL_HANDLE) or (job is not None and not job.finished):
+            return no_update
+        result_data = _results(handle)
+        if not isinstance(result_data, ResultFrame) or job is None:
+            return None
+        sector = "selected datasets" if job.params["search_type"] == "dataset" else None
+        return view_payload(result_data, job.params["impact_assessments"], handle=handle, sector=sector)
+
+    app.clientside_callback(
+        ClientsideFunction(namespace="dopo", function_name="render_view"),
+        Output("main-plot", "figure", allow_duplicate=True),
+        [Input(dropdown, "value") for dropdown in VIEW_DROPDOWNS] + [Input("view-payload-store", "data")],
+        State("analyze-data-store", "data"),
+        prevent_initial_call=True
+    )
 
-    return no_update, go.Figure(), no_update, no_update, no_update, no_update, no_update, no_update, no_update
 
 def main():
+    # Discover projects while the server starts
+    project_catalog.start()
     app.run(debug=True)
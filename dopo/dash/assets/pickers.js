@@ -0,0 +1,35 @@
+/*
+ * Loads the next page of a dataset picker when its list is scrolled to the bottom, by clicking
+ * the "Load more" button of that picker (see update_filtered_dataset_options in app.py).
+ */
+
+(function () {
+    "use strict";
+
+    var PICKERS = ["sectors-checklist", "cpc-checklist", "isic-checklist", "dataset-checklist"];
+
+    // Distance to the bottom, in pixels, at which the next page is requested
+    var THRESHOLD = 40;
+
+    document.addEventListener("scroll", function (event) {
+        var list = event.target;
+        if (!list.id || PICKERS.indexOf(list.id) === -1) {
+            return;
+        }
+        if (list.scrollTop + list.clientHeight < list.scrollHeight - THRESHOLD) {
+            return;
+        }
+
+        // Request each page once: wait until the options have changed
+        var count = String(list.childElementCount);
+        if (list.dataset.requested === count) {
+            return;
+        }
+
+        var button = document.getElementById(list.id.replace(/-checklist$/, "-load-more"));
+        if (button && button.style.display !== "none") {
+            list.dataset.requested = count;
+            button.click();
+        }
+    }, true);
+})();
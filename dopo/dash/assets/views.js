@@ -0,0 +1,123 @@
+/*
+ * Clientside views of analysis results.
+ *
+ * Builds the score and contribution plots from the payload of dopo/dash/utils/payload.py, so
+ * that changing the sector, method or plot type needs no request to the server. The figures
+ * match those of dopo/dash/plot/plot.py.
+ */
+
+(function () {
+    "use strict";
+
+    var REFERENCE_LINES = [
+        ["Average", function (s) { return s.mean; }, "black"],
+        ["Median", function (s) { return s.median; }, "green"],
+        ["Average + Std Dev", function (s) { return s.std === null ? null : s.mean + s.std; }, "blue"],
+        ["Average - Std Dev", function (s) { return s.std === null ? null : s.mean - s.std; }, "blue"],
+        ["5th Percentile", function (s) { return s.q05; }, "red"],
+        ["95th Percentile", function (s) { return s.q95; }, "red"]
+    ];
+
+    // Decodes a base64 little-endian typed array (int32 or float32)
+    function decode(data, Type) {
+        var binary = window.atob(data);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        var view = new DataView(bytes.buffer);
+        var values = new Array(bytes.length / 4);
+        for (var j = 0; j < values.length; j++) {
+            values[j] = Type === "float32" ? view.getFloat32(4 * j, true) : view.getInt32(4 * j, true);
+        }
+        return values;
+    }
+
+    function lookup(strings, codes) {
+        return codes.map(function (code) { return strings[code]; });
+    }
+
+    function layout(sector, method, unit, legend) {
+        return {
+            title: {text: sector + " analysis - " + method},
+            xaxis: {title: {text: "Activity"}, showticklabels: false},
+            yaxis: {title: {text: unit}},
+            legend: {title: {text: legend || "Input"}},
+            height: 700,
+            plot_bgcolor: "white"
+        };
+    }
+
+    function scoresFigure(payload, view, sector, method) {
+        var names = lookup(payload.strings, decode(view.scores.name, "int32"));
+        var scores = decode(view.scores.score, "float32");
+        var figure = {
+            data: [{
+                type: "scattergl", mode: "markers", name: "Score",
+                x: names, y: scores, marker: {size: 12}
+            }],
+            layout: layout(sector, method, payload.strings[view.unit])
+        };
+
+        figure.layout.shapes = [];
+        figure.layout.annotations = [];
+        REFERENCE_LINES.forEach(function (line) {
+            var value = line[1](view.statistics);
+            if (value === null || value === undefined) {
+                return;
+            }
+            figure.layout.shapes.push({
+                type: "line", xref: "x domain", x0: 0, x1: 1, yref: "y", y0: value, y1: value,
+                line: {color: line[2], width: 2}
+            });
+            figure.layout.annotations.push({
+                xref: "x domain", x: 1, yref: "y", y: value, text: line[0],
+                showarrow: false, xanchor: "right", yanchor: "bottom"
+            });
+        });
+        return figure;
+    }
+
+    function contributionFigure(payload, view, sector, method, legend) {
+        var contributions = view.contributions;
+        var names = lookup(payload.strings, decode(contributions.name, "int32"));
+        var inputs = decode(contributions.input, "int32");
+        var scores = decode(contributions.score, "float32");
+
+        var data = contributions.inputs.map(function (input) {
+            var trace = {type: "bar", name: payload.strings[input], x: [], y: []};
+            for (var i = 0; i < inputs.length; i++) {
+                if (inputs[i] === input) {
+                    trace.x.push(names[i]);
+                    trace.y.push(scores[i]);
+                }
+            }
+            return trace;
+        });
+
+        var figure = {data: data, layout: layout(sector, method, payload.strings[view.unit], legend)};
+        figure.layout.barmode = "stack";
+        return figure;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        dopo: {
+            render_view: function (sector, method, plot, payload, handle) {
+                var noUpdate = window.dash_clientside.no_update;
+                // Payloads of earlier results are ignored; the server rendered the first view
+                if (!payload || payload.handle !== handle) {
+                    return noUpdate;
+                }
+                sector = payload.sector || sector;
+                var view = (payload.views[sector] || {})[method];
+                if (!view) {
+                    return {data: [], layout: {}};
+                }
+                return plot === "total" ?
+                    scoresFigure(payload, view, sector, method) :
+                    contributionFigure(payload, view, sector, method,
+                                       plot === "flows" ? "Elementary flow" : "Input");
+            }
+        }
+    });
+})();
@@ -1,51 +1,108 @@
+import ast
+
 from dopo import Dopo
+from dopo.batched_lca import engine_cache
 import bw2data
 
-def get_projects():
-    projects = [project for project in bw2data.projects if get_databases(project.name) and project.name != ""]
-    bw2data.projects.set_current(projects[0].name)
-    return projects
+from .metadata import metadata_cache
+from .projects import project_catalog
+from .search import PAGE_SIZE
+from .workers import project_workers
 
-def activate_project(project):
-    bw2data.projects.set_current(project)
+# Analysis sessions of this (worker) process, per (search type, market exclusion, breakdown)
+_sessions = {}
+
+def get_projects():
+    return [project for project in project_catalog.projects() if project.databases and project.name != ""]
 
 def get_databases(project=None):
+    if project:
+        return project_catalog.databases(project)
     try:
-        if project:
-            bw2data.projects.set_current(project)
         return list(bw2data.databases)
     except:
         return []
 
-def get_methods():
-    return list(bw2data.methods)
+def get_methods(project=None):
+    if project:
+        return project_workers.query(project, get_methods)
+    return metadata_cache.methods()
 
 def get_datasets(database):
     return [ds for ds in bw2data.Database(database)]
 
-
-def get_classifications_from_database(database: str, classification="ISIC"):
-    data = []
-
-    for ds in bw2data.Database(database):
-        if "classifications" in ds:
-            for c in ds["classifications"]:
-                if classification in c[0].lower():
-                    data.append(c[1].split(":")[-1])
-
-    return sorted(list(set(data)))
-
-def analyze(project, databases, impact_assessments, filters, search_type, exclude_markets=False):
-    bw2data.projects.set_current(project)
-
-    dopo = Dopo()
-
-    for method in impact_assessments:
-        dopo.methods.methods.append(eval(method))
-
-    dopo.databases = []
-    for database in databases:
-        dopo.databases.append(database)
+def get_dataset_names(database, project=None):
+    if project:
+        return project_workers.query(project, get_dataset_names, database)
+    return metadata_cache.database(database).names
+
+
+def get_classifications_from_database(database: str, classification="ISIC", project=None):
+    if project:
+        return project_workers.query(project, get_classifications_from_database, database, classification)
+    return metadata_cache.database(database).classification_labels(classification)
+
+def search_dataset_names(database, query="", offset=0, limit=PAGE_SIZE, project=None):
+    """Returns a page of the dataset names of `database` matching `query`, and the number of matches."""
+    if project:
+        return project_workers.query(project, search_dataset_names, database, query, offset, limit)
+    return metadata_cache.database(database).index().search(query, offset, limit)
+
+def search_classifications(database, classification, query="", offset=0, limit=PAGE_SIZE, project=None):
+    """Returns a page of the `classification` labels of `database` matching `query`, and the number of matches."""
+    if project:
+        return project_workers.query(project, search_classifications, database, classification, query, offset, limit)
+    return metadata_cache.database(database).index(classification).search(query, offset, limit)
+
+def analysis_key(project, databases, impact_assessments, filters, search_type, exclude_markets=False,
+                 breakdown="inputs", deadline=None) -> tuple:
+    """
+    Normalized analysis parameters, identifying analyses that give the same results. The
+    modification state of the databases and methods is included, so that the results of an
+    analysis are not reused once its data changed.
+    """
+    return (
+        project,
+        project_catalog.state(project, databases),
+        tuple(sorted(databases)),
+        tuple(sorted(impact_assessments)),
+        tuple(sorted(item.strip() for item in filters)),
+        search_type,
+        bool(exclude_markets),
+        breakdown,
+        deadline,
+    )
+
+def analyze(project, databases, impact_assessments, filters, search_type, exclude_markets=False,
+            breakdown="inputs", deadline=None, progress=None):
+    """
+    Runs the analysis in the worker process of `project`, so that the project of the calling
+    process is never switched. Identical analyses are coalesced by the job manager, see
+    `analysis_key`.
+
+    With a `deadline`, input contributions are refined for at most that many seconds, and a
+    later call continues the refinement (see `Dopo.analyze`).
+    """
+    args = (databases, impact_assessments, filters, search_type, exclude_markets, breakdown, deadline)
+    if progress is None:
+        return project_workers.run(project, _analyze, *args)
+    return project_workers.run_with_progress(project, _analyze, progress, *args)
+
+def _analyze(databases, impact_assessments, filters, search_type, exclude_markets=False, breakdown="inputs",
+             deadline=None, progress=None):
+    """
+    Runs in a project worker. The worker keeps one `Dopo` per search context, so that only the
+    (database, sector, method) units missing from earlier analyses are computed.
+
+    With `progress`, every (sector, method) view is also reported as soon as it is complete, as
+    ``progress(done, total, message, view=(sector, method, scores))``.
+    """
+    dopo = _sessions.setdefault((search_type, bool(exclude_markets), breakdown), Dopo())
+
+    dopo.methods.methods = [ast.literal_eval(method) for method in impact_assessments]
+    dopo.databases = list(databases)
+    dopo.activities = {}
+    dopo.results = None
 
     if search_type == "sectors":
         dopo.add_sectors(filters)
@@ -57,7 +114,27 @@ def analyze(project, databases, impact_assessments, filters, search_type, exclud
     if exclude_markets is True:
         dopo.exclude_markets()
 
-    dopo.analyze()
+    # Reuse the matrices and factorization kept warm by this worker
+    engine = None
+    activities = [act for acts in dopo.activities.values() for act in acts]
+    if activities and dopo.methods.methods:
+        engine = engine_cache.get(activities, dopo.methods.methods)
 
-    return dopo.results
+    if progress is None:
+        dopo.analyze(engine=engine, breakdown=breakdown, deadline=deadline)
+        return dopo.results
+
+    # Send each complete (sector, method) view along with the progress reports
+    last = (0, 0, "")
 
+    def report(done, total, message=""):
+        nonlocal last
+        last = (done, total, message)
+        progress(done, total, message)
+
+    def on_view(sector, method, scores):
+        progress(*last, view=(sector, method, scores))
+
+    dopo.analyze(progress=report, engine=engine, on_view=on_view, breakdown=breakdown, deadline=deadline)
+
+    return dopo.results
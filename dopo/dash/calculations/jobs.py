@@ -0,0 +1,223 @@
+"""
+Background analysis jobs for the Dash app.
+
+Analyses run in a small thread pool, outside the request that started them. Callbacks poll
+the progress of a job and can cancel it. Jobs are keyed by their normalized parameters: asking
+again for an analysis that is queued, running or finished returns the existing job instead of
+starting a new one.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dopo.lca import AnalysisCancelled
+
+# Number of analyses running at the same time
+MAX_WORKERS = 2
+
+# Number of finished jobs kept for reuse
+MAX_FINISHED_JOBS = 32
+
+# Seconds a finished job is reused for
+FINISHED_JOB_TTL = 10 * 60
+
+QUEUED, RUNNING, DONE, CANCELLED, FAILED = "queued", "running", "done", "cancelled", "failed"
+
+
+class Job:
+    """
+    State of one background analysis.
+
+    Attributes
+    ----------
+    id : str
+        Identifier of the job, kept by the browser.
+    key : tuple
+        Normalized parameters of the analysis.
+    params : dict
+        Parameters of the analysis, as submitted.
+    status : str
+        One of "queued", "running", "done", "cancelled" or "failed".
+    done, total : int
+        Number of calculation steps finished, and to do.
+    message : str
+        Description of the last finished step, or of the error.
+    result
+        Return value of the analysis function, once done.
+    partial
+        Last partial result reported by the analysis while it runs, or None. It is kept on the
+        job only, never in the result cache, and dropped once the job is finished.
+    revision : int
+        Number of partial results reported so far.
+    finished_at : float
+        Time at which the job finished, or None.
+    """
+
+    def __init__(self, key: tuple, params: dict):
+        self.id = uuid.uuid4().hex[:16]
+        self.key = key
+        self.params = params
+        self.status = QUEUED
+        self.done, self.total = 0, 0
+        self.message = "Queued"
+        self.result = None
+        self.partial = None
+        self.revision = 0
+        self.created = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, CANCELLED, FAILED)
+
+    @property
+    def percent(self) -> int:
+        if self.status == DONE:
+            return 100
+        return int(100 * self.done / self.total) if self.total else 0
+
+    def progress(self, done: int, total: int, message: str = "", partial=None):
+        """
+        Progress callback given to the analysis. Raises `AnalysisCancelled` once the job is cancelled.
+
+        A `partial` result, if given, replaces the previous one in `partial` and increments `revision`.
+        """
+        if self._cancel.is_set():
+            raise AnalysisCancelled(self.id)
+        self.done, self.total, self.message = done, total, message
+        if partial is not None:
+            self.partial = partial
+            self.revision += 1
+
+    def cancel(self):
+        """
+        Asks the analysis to stop at its next progress report.
+        """
+        self._cancel.set()
+        if self.status == QUEUED:
+            self.status, self.message = CANCELLED, "Cancelled"
+
+
+class JobManager:
+    """
+    Runs analyses in a thread pool and keeps track of their state.
+
+    Methods
+    -------
+    submit(key, params, func)
+        Starts an analysis, or returns the job already holding it.
+    get(job_id)
+        Returns a job from its identifier.
+    cancel(job_id)
+        Cancels a job.
+    discard(job_id)
+        Forgets a job, so that its parameters are computed again on the next submission.
+    discard_key(key)
+        Forgets the job of a key.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_finished: int = MAX_FINISHED_JOBS,
+                 ttl: float = FINISHED_JOB_TTL):
+        self.max_finished = max_finished
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dopo-job")
+        self._jobs = OrderedDict()  # job id -> job
+        self._by_key = {}  # key -> job id
+        self._lock = threading.Lock()
+
+    def submit(self, key: tuple, params: dict, func) -> Job:
+        """
+        Runs ``func(**params, progress=job.progress)`` in the background.
+
+        If a job with the same `key` is queued, running, or done for less than `ttl` seconds, it
+        is returned instead. Cancelled, failed and expired jobs are started again.
+
+        :param key: Normalized, hashable parameters of the analysis.
+        :type key: tuple
+        :param params: Keyword arguments of `func`.
+        :type params: dict
+        :param func: The analysis function.
+        :type func: callable
+        :return: The job computing the analysis.
+        :rtype: Job
+        """
+        with self._lock:
+            job = self._jobs.get(self._by_key.get(key))
+            if job is not None and (
+                job.status in (QUEUED, RUNNING) or
+                job.status == DONE and time.time() - job.finished_at < self.ttl
+            ):
+                return job
+
+            job = Job(key, params)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+            self._prune()
+
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def _run(self, job: Job, func):
+        if job.status == CANCELLED:
+            return
+        job.status, job.message = RUNNING, "Running"
+        try:
+            job.result = func(**job.params, progress=job.progress)
+        except AnalysisCancelled:
+            job.status, job.message = CANCELLED, "Cancelled"
+        except Exception as err:  # reported to the user instead of killing the worker
+            job.status, job.message = FAILED, f"Analysis failed: {err}"
+        else:
+            job.finished_at = time.time()
+            job.status, job.message = DONE, "Done"
+        finally:
+            # Partial results are superseded by the result, or by nothing
+            job.partial = None
+            job.finished_at = job.finished_at or time.time()
+
+    def get(self, job_id: str):
+        """
+        Returns the job `job_id`, or None if it is unknown.
+        """
+        if not isinstance(job_id, str):
+            return None
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        """
+        Cancels the job `job_id`, if it is not finished yet.
+        """
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+
+    def discard(self, job_id: str):
+        """
+        Forgets the job `job_id`.
+        """
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is not None and self._by_key.get(job.key) == job_id:
+                del self._by_key[job.key]
+
+    def discard_key(self, key: tuple):
+        """
+        Forgets the job submitted with `key`, if any.
+        """
+        job_id = self._by_key.get(key)
+        if job_id is not None:
+            self.discard(job_id)
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+
+
+job_manager = JobManager()
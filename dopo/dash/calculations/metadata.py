@@ -0,0 +1,131 @@
+"""
+Per-project metadata cache for the Dash pickers.
+
+Dataset names and classification labels are collected in one pass over a database and kept
+per (project, database). Entries are invalidated when the database's "modified" timestamp in
+`bw2data.databases` changes. Method lists are kept per project and invalidated when the methods
+registry file changes.
+"""
+
+import os
+import threading
+
+import bw2data
+
+from .search import SearchIndex
+
+
+class DatabaseMetadata:
+    """
+    Distinct dataset names and classification labels of one database.
+
+    Attributes
+    ----------
+    names : list
+        Sorted, distinct dataset names.
+    classifications : dict
+        Sorted, distinct labels (without code) for each lowercase classification system.
+    """
+
+    def __init__(self, database: str):
+        names, classifications = set(), {}
+
+        for ds in bw2data.Database(database):
+            names.add(ds["name"])
+            for c in ds.get("classifications", []):
+                classifications.setdefault(c[0].lower(), set()).add(c[1].split(":")[-1])
+
+        self.names = sorted(names)
+        self.classifications = {system: sorted(labels) for system, labels in classifications.items()}
+        self._indexes = {}  # None for names, or a classification -> SearchIndex
+
+    def classification_labels(self, classification: str) -> list:
+        """
+        Returns the labels of every classification system whose name contains `classification`.
+        """
+        labels = set()
+        for system, values in self.classifications.items():
+            if classification in system:
+                labels.update(values)
+        return sorted(labels)
+
+    def index(self, classification: str = None) -> SearchIndex:
+        """
+        Returns the search index of the dataset names, or of the labels of `classification`.
+        Indexes are built on first use.
+        """
+        index = self._indexes.get(classification)
+        if index is None:
+            items = self.names if classification is None else self.classification_labels(classification)
+            index = self._indexes[classification] = SearchIndex(items)
+        return index
+
+
+class MetadataCache:
+    """
+    Keeps `DatabaseMetadata` per (project, database), and method lists per project.
+
+    Methods
+    -------
+    database(database)
+        Returns the metadata of a database of the current project.
+    methods()
+        Returns the methods of the current project.
+    clear()
+        Empties the cache.
+    """
+
+    def __init__(self):
+        self._databases = {}  # (project, database) -> (modified, DatabaseMetadata)
+        self._methods = {}  # project -> (version, list of methods)
+        self._lock = threading.Lock()
+
+    def database(self, database: str) -> DatabaseMetadata:
+        """
+        Returns the metadata of `database` in the current project, collecting it if it is
+        missing or if the database was modified since.
+        """
+        key = (bw2data.projects.current, database)
+        modified = bw2data.databases.get(database, {}).get("modified")
+
+        with self._lock:
+            cached = self._databases.get(key)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+
+        metadata = DatabaseMetadata(database)
+        with self._lock:
+            self._databases[key] = (modified, metadata)
+        return metadata
+
+    def methods(self) -> list:
+        """
+        Returns the methods of the current project, reading them again if the registry changed.
+        """
+        project = bw2data.projects.current
+        version = (len(bw2data.methods), _mtime(getattr(bw2data.methods, "filepath", None)))
+
+        with self._lock:
+            cached = self._methods.get(project)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        methods = list(bw2data.methods)
+        with self._lock:
+            self._methods[project] = (version, methods)
+        return methods
+
+    def clear(self):
+        with self._lock:
+            self._databases.clear()
+            self._methods.clear()
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except (OSError, TypeError):
+        return None
+
+
+metadata_cache = MetadataCache()
@@ -0,0 +1,162 @@
+"""
+Project discovery without switching projects.
+
+The project list is read from the `ProjectDataset` table of `projects.db`. The databases of each
+project are read from the `databases.json` file in its directory. `bw2data.projects.set_current`
+is never called, so discovery does not depend on the current project and does not change it.
+Results are cached and read again only for files whose modification time changed. The first
+scan can run in a background thread when the server starts.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import bw2data
+from bw2data.filesystem import safe_filename
+from bw2data.project import ProjectDataset
+
+
+class ProjectInfo:
+    """
+    Name and databases of a Brightway project.
+
+    Attributes
+    ----------
+    name : str
+        Name of the project.
+    databases : list
+        Names of the databases registered in the project.
+    """
+
+    def __init__(self, name: str, databases: list):
+        self.name = name
+        self.databases = databases
+
+    def __repr__(self):
+        return f"ProjectInfo({self.name!r}, {len(self.databases)} databases)"
+
+
+class ProjectCatalog:
+    """
+    Cached list of projects and their databases.
+
+    Methods
+    -------
+    projects()
+        Returns the projects, scanning them if needed.
+    databases(project)
+        Returns the databases of a project.
+    state(project, databases)
+        Returns the modification state of databases and their dependencies, and of the methods.
+    start()
+        Scans the projects in a background thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None  # (base directory, projects.db modification time)
+        self._paths = {}  # project name -> path of its databases.json
+        self._files = {}  # databases.json path -> (modification time, metadata of each database)
+        self._thread = None
+
+    def start(self):
+        """
+        Scans the projects in a background thread, unless a scan is already running.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.projects, name="dopo-projects", daemon=True)
+            self._thread.start()
+
+    def projects(self) -> list:
+        """
+        Returns a `ProjectInfo` for each project. Waits for a running background scan.
+        """
+        with self._lock:
+            self._refresh_paths()
+            return [
+                ProjectInfo(name, list(self._read_databases(path))) for name, path in self._paths.items()
+            ]
+
+    def databases(self, project: str) -> list:
+        """
+        Returns the names of the databases of `project`.
+        """
+        with self._lock:
+            self._refresh_paths()
+            path = self._paths.get(project)
+            return list(self._read_databases(path)) if path is not None else []
+
+    def state(self, project: str, databases: list) -> tuple:
+        """
+        Returns the `modified` time of `databases` and of the databases they depend on, and the
+        modification time of the method list, which changes when a method is written.
+
+        Results computed for an equal state are still valid.
+        """
+        with self._lock:
+            self._refresh_paths()
+            path = self._paths.get(project)
+            if path is None:
+                return ()
+            metadata = self._read_databases(path)
+
+        names, pending = set(), list(databases)
+        while pending:
+            name = pending.pop()
+            if name not in names:
+                names.add(name)
+                pending.extend(metadata.get(name, {}).get("depends", []))
+        modified = tuple(sorted((name, metadata.get(name, {}).get("modified") or "") for name in names))
+        return modified, _mtime(path.with_name("methods.json"))
+
+    def _refresh_paths(self):
+        """
+        Reads the project names again if `projects.db` changed since the last scan.
+        """
+        base_dir = bw2data.projects._base_data_dir
+        version = (base_dir, _mtime(os.path.join(base_dir, "projects.db")))
+        if version == self._version:
+            return
+
+        self._paths = {
+            dataset.name: _project_dir(base_dir, dataset) / "databases.json"
+            for dataset in sorted(ProjectDataset.select())
+        }
+        self._version = version
+
+    def _read_databases(self, path: Path) -> dict:
+        mtime = _mtime(path)
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                databases = dict(json.load(f))
+        except (OSError, ValueError):
+            databases = {}
+
+        self._files[path] = (mtime, databases)
+        return databases
+
+
+def _project_dir(base_dir, dataset) -> Path:
+    """
+    Directory of a project, as computed by `bw2data.projects.dir`.
+    """
+    if hasattr(dataset, "full_hash"):
+        # bw2data 4
+        return Path(base_dir) / safe_filename(dataset.name, full=dataset.full_hash)
+    return Path(base_dir) / safe_filename(dataset.name)
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+project_catalog = ProjectCatalog()
@@ -0,0 +1,72 @@
+"""
+Prefix search over dataset names and classification labels, for the pickers of the Dash app.
+
+Databases can hold tens of thousands of dataset names, too many to send to the browser and
+render as checklist options. The pickers only show a page of the matches of the search term.
+Matches are found with an index of the words of every item, sorted so that all words starting
+with a prefix are found by bisection.
+"""
+
+import re
+from bisect import bisect_left
+
+# Number of options shown at first, and added by each "load more"
+PAGE_SIZE = 100
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> list:
+    return _WORD.findall(text.lower())
+
+
+class SearchIndex:
+    """
+    Word-prefix index over a list of strings.
+
+    An item matches a query if, for every word of the query, one of its words starts with it:
+    "elec low" matches "market for electricity, low voltage". Matches are returned in the order
+    of the items.
+
+    Methods
+    -------
+    search(query, offset, limit)
+        Returns a page of the items matching a query, and the number of matches.
+    """
+
+    def __init__(self, items):
+        self.items = list(items)
+
+        pairs = sorted({(word, i) for i, item in enumerate(self.items) for word in _words(item)})
+        self._words = [word for word, _ in pairs]
+        self._positions = [i for _, i in pairs]
+
+    def __len__(self):
+        return len(self.items)
+
+    def _matching(self, prefix: str) -> set:
+        start = bisect_left(self._words, prefix)
+        stop = bisect_left(self._words, prefix + "\U0010ffff", lo=start)
+        return set(self._positions[start:stop])
+
+    def search(self, query: str = "", offset: int = 0, limit: int = PAGE_SIZE):
+        """
+        Returns the items matching `query`, from `offset` to at most `offset + limit`.
+
+        :param query: Search term; all items match if it is empty.
+        :type query: str
+        :param offset: Number of matches to skip.
+        :type offset: int
+        :param limit: Maximum number of matches returned.
+        :type limit: int
+        :return: The page of matching items, and the total number of matches.
+        :rtype: tuple
+        """
+        words = _words(query or "")
+        if not words:
+            return self.items[offset:offset + limit], len(self.items)
+
+        # Intersect from the rarest prefix
+        matches = sorted((self._matching(word) for word in set(words)), key=len)
+        positions = sorted(set.intersection(*matches))
+        return [self.items[i] for i in positions[offset:offset + limit]], len(positions)
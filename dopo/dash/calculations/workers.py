@@ -0,0 +1,203 @@
+"""
+Project-scoped execution for the Dash app.
+
+`bw2data.projects.set_current` changes the project of the whole process, so callbacks of
+concurrent users can switch each other's project in the middle of a request. Here, every project
+gets dedicated worker processes, which activate the project once when they start. Work for a
+project is sent to its workers, and the Dash server process never switches projects. The server
+can then answer concurrent requests from a thread pool.
+
+Each project has two workers: one for analyses, which can run for minutes, and one for the
+short metadata, search and method list requests of the pickers, which never wait behind an
+analysis.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import bw2data
+
+from dopo.batched_lca import engine_cache, ENGINE_MEMORY_LIMIT
+from dopo.lca import AnalysisCancelled
+
+# Number of project workers kept alive at the same time
+MAX_PROJECTS = 4
+
+# Seconds after which an unused project worker is shut down
+WORKER_IDLE_TIMEOUT = 60 * 60
+
+# Estimated memory, in bytes, each worker may keep in warm LCA engines
+WORKER_MEMORY_LIMIT = ENGINE_MEMORY_LIMIT
+
+# Seconds between checks for progress reports of a running analysis
+POLL_INTERVAL = 0.2
+
+# Workers of a project: analyses, and metadata and search requests
+ANALYSIS, METADATA = "analysis", "metadata"
+
+
+def _init_worker(project: str, memory_limit: int):
+    bw2data.projects.set_current(project)
+    engine_cache.memory_limit = memory_limit
+
+
+def _call_with_progress(func, progress_queue, cancel_event, args, kwargs):
+    """
+    Runs ``func(*args, progress=..., **kwargs)`` in a worker, sending progress reports to
+    `progress_queue` and stopping once `cancel_event` is set.
+    """
+
+    def progress(done, total, message="", **report):
+        if cancel_event.is_set():
+            raise AnalysisCancelled()
+        progress_queue.put((done, total, message, report))
+
+    return func(*args, progress=progress, **kwargs)
+
+
+class ProjectWorkers:
+    """
+    An analysis worker process and a metadata worker process per Brightway project.
+
+    Workers are started with the "spawn" method, so they do not inherit the project state of
+    the server. They live between requests. Analysis workers keep LCA engines (loaded matrices,
+    factorizations and characterization matrices) warm, up to `memory_limit` bytes each, and
+    metadata workers keep the metadata caches of the pickers. The workers of the least recently
+    used project are shut down when more than `max_projects` projects are in use, and those of
+    projects unused for `idle_timeout` seconds are shut down.
+
+    Methods
+    -------
+    submit(project, func, *args, **kwargs)
+        Runs a function in the analysis worker of a project and returns a future.
+    run(project, func, *args, **kwargs)
+        Runs a function in the analysis worker of a project and returns its result.
+    run_with_progress(project, func, progress, *args, **kwargs)
+        Runs an analysis in the worker of a project, relaying progress and cancellation.
+    query(project, func, *args, **kwargs)
+        Runs a short metadata or search request in the metadata worker of a project.
+    """
+
+    def __init__(self, max_projects: int = MAX_PROJECTS, idle_timeout: float = WORKER_IDLE_TIMEOUT,
+                 memory_limit: int = WORKER_MEMORY_LIMIT):
+        self.max_projects = max_projects
+        self.idle_timeout = idle_timeout
+        self.memory_limit = memory_limit
+        self._context = multiprocessing.get_context("spawn")
+        self._executors = OrderedDict()  # project -> {worker kind: ProcessPoolExecutor}
+        self._last_use = {}  # project -> time of the last submission
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def _executor(self, project: str, kind: str = ANALYSIS) -> ProcessPoolExecutor:
+        with self._lock:
+            now = time.monotonic()
+            for name in list(self._executors):
+                if name != project and now - self._last_use[name] > self.idle_timeout:
+                    self._shutdown_worker(name)
+
+            executors = self._executors.setdefault(project, {})
+            executor = executors.get(kind)
+            if executor is None:
+                executor = executors[kind] = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=self._context,
+                    initializer=_init_worker,
+                    initargs=(project, self.memory_limit if kind == ANALYSIS else 0),
+                )
+            self._executors.move_to_end(project)
+            self._last_use[project] = now
+
+            while len(self._executors) > self.max_projects:
+                self._shutdown_worker(next(iter(self._executors)))
+
+            return executor
+
+    def _shutdown_worker(self, project: str):
+        for executor in self._executors.pop(project).values():
+            executor.shutdown(wait=False)
+        del self._last_use[project]
+
+    def submit(self, project: str, func, *args, **kwargs):
+        """
+        Runs ``func(*args, **kwargs)`` in the worker of `project`.
+
+        :param project: Name of the Brightway project.
+        :type project: str
+        :param func: A picklable (module-level) function.
+        :type func: callable
+        :return: The future of the result.
+        :rtype: concurrent.futures.Future
+        """
+        return self._executor(project).submit(func, *args, **kwargs)
+
+    def run(self, project: str, func, *args, **kwargs):
+        """
+        Runs ``func(*args, **kwargs)`` in the worker of `project` and returns its result.
+        """
+        return self.submit(project, func, *args, **kwargs).result()
+
+    def query(self, project: str, func, *args, **kwargs):
+        """
+        Runs ``func(*args, **kwargs)`` in the metadata worker of `project` and returns its
+        result. Unlike `run`, it does not wait for a running analysis.
+        """
+        return self._executor(project, METADATA).submit(func, *args, **kwargs).result()
+
+    def run_with_progress(self, project: str, func, progress, *args, **kwargs):
+        """
+        Runs ``func(*args, progress=..., **kwargs)`` in the worker of `project`.
+
+        Progress reports of the worker, including their keyword arguments (such as partial
+        results), are passed on to `progress`, in the calling thread. When
+        `progress` raises `AnalysisCancelled`, the worker is asked to stop at its next report,
+        and `AnalysisCancelled` is raised once it has.
+
+        :param project: Name of the Brightway project.
+        :type project: str
+        :param func: A picklable (module-level) function accepting a `progress` keyword.
+        :type func: callable
+        :param progress: Called as ``progress(done, total, message, **report)``.
+        :type progress: callable
+        :return: The result of `func`.
+        """
+        with self._lock:
+            if self._manager is None:
+                self._manager = self._context.Manager()
+            progress_queue, cancel_event = self._manager.Queue(), self._manager.Event()
+
+        future = self.submit(
+            project, _call_with_progress, func, progress_queue, cancel_event, args, kwargs
+        )
+
+        while True:
+            try:
+                report = progress_queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if future.done():
+                    break
+                continue
+            if cancel_event.is_set():
+                continue
+            done, total, message, report = report
+            try:
+                progress(done, total, message, **report)
+            except AnalysisCancelled:
+                cancel_event.set()
+
+        return future.result()
+
+    def shutdown(self):
+        with self._lock:
+            for project in list(self._executors):
+                self._shutdown_worker(project)
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+
+project_workers = ProjectWorkers()
@@ -1,7 +1,12 @@
 # main_content.py
 from dash import html, dcc
 
+from .top_bar import top_bar_layout
+
 main_content_layout = html.Div([
+    # Analysis progress
+    top_bar_layout,
+
     # Row of Dropdowns
     html.Div([
         dcc.Dropdown(id="dropdown-1", placeholder="Sector", style={"width": "80%"}),
@@ -2,6 +2,9 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 
+# Dataset pickers, by dataset type
+PICKERS = ["sectors", "cpc", "isic", "dataset"]
+
 sidebar_layout = html.Div([
     # Projects Section
     html.H4("Projects", style={"margin": "10px 0"}),
@@ -47,6 +50,24 @@ sidebar_layout = html.Div([
             value=[],
             inline=True,
             style={"marginTop": "4px", "marginLeft": "2px"}
+        ),
+
+        # Break contributions down into elementary flows instead of inputs
+        dcc.Checklist(
+            id="breakdown-check",
+            options=[{"label": "elementary flows", "value": "flows"}],
+            value=[],
+            inline=True,
+            style={"marginTop": "4px", "marginLeft": "2px"}
+        ),
+
+        # Total scores first, contributions refined for a few seconds only
+        dcc.Checklist(
+            id="quick-check",
+            options=[{"label": "quick results", "value": "quick"}],
+            value=[],
+            inline=True,
+            style={"marginTop": "4px", "marginLeft": "2px"}
         )
     ]),
     dcc.Input(
@@ -57,15 +78,21 @@ sidebar_layout = html.Div([
         style={"marginBottom": "10px", "width": "100%"}
     ),
 
-    # Checklist containers
-    html.Div(dcc.Checklist(id="sectors-checklist", style={"overflowY": "auto", "height": "100px", "padding": "15px"}),
-             id="sectors-container"),
-    html.Div(dcc.Checklist(id="cpc-checklist", style={"overflowY": "auto", "height": "100px", "padding": "15px"}),
-             id="cpc-container"),
-    html.Div(dcc.Checklist(id="isic-checklist", style={"overflowY": "auto", "height": "100px", "padding": "15px"}),
-             id="isic-container"),
-    html.Div(dcc.Checklist(id="dataset-checklist", style={"overflowY": "auto", "height": "100px", "padding": "15px"}),
-             id="dataset-container"),
+    # Checklist containers. Each picker loads its first matches only, and a page more when its
+    # "Load more" button is clicked or its list is scrolled to the bottom (assets/pickers.js)
+    *[
+        html.Div([
+            dcc.Checklist(id=f"{picker}-checklist", style={"overflowY": "auto", "height": "100px", "padding": "15px"}),
+            html.Div([
+                html.Small(id=f"{picker}-status", style={"color": "gray"}),
+                dbc.Button("Load more", id=f"{picker}-load-more", n_clicks=0, size="sm", color="link",
+                           style={"display": "none"}),
+            ], style={"display": "flex", "justifyContent": "space-between", "alignItems": "center"}),
+        ], id=f"{picker}-container")
+        for picker in PICKERS
+    ],
+    # Number of matches loaded by each picker
+    dcc.Store(id="picker-limits", data={}),
 
     # Impact Assessment Section
     html.H4("Impact Assessment", style={"margin": "10px 0"}),
@@ -86,6 +113,13 @@ sidebar_layout = html.Div([
                 dbc.Button("Run Calculation", id="calc-button", n_clicks=0)
             ])
         )
-    ], style={"padding": "10px", "border": "1px solid #0099CC", "textAlign": "center"})
+    ], style={"padding": "10px", "border": "1px solid #0099CC", "textAlign": "center"}),
+
+    # Refinement of quick results
+    html.Div([
+        html.Small(id="refine-status", style={"color": "gray"}),
+        dbc.Button("Refine", id="refine-button", n_clicks=0, size="sm", color="link",
+                   style={"display": "none"}),
+    ], style={"display": "flex", "justifyContent": "space-between", "alignItems": "center"}),
 
 ], style={"width": "20%", "height": "100vh", "display": "inline-block", "verticalAlign": "top", "padding": "10px"})
@@ -1,32 +1,46 @@
 # top_bar.py
 from dash import html
 import dash_daq as daq
+import dash_bootstrap_components as dbc
+
+
+def progress_bar_style(percent: int) -> dict:
+    """Style of the filled part of the progress bar."""
+    return {
+        "width": f"{percent}%",
+        "height": "100%",
+        "backgroundColor": "#0099CC",
+        "textAlign": "center",
+        "lineHeight": "30px",
+        "color": "white"
+    }
+
 
 top_bar_layout = html.Div([
     html.Label("Progress", style={"marginRight": "10px"}),
 
-    # Progress indicator (could be adjusted based on actual progress logic)
+    # Lit while an analysis is running
     daq.Indicator(
-        label="55%", value=True, color="#0099CC"
+        id="progress-indicator", value=False, color="#0099CC"
     ),
 
     # Custom Progress Bar
     html.Div([
-        html.Div(style={
-            "width": "55%",  # Set this width dynamically if progress is variable
-            "height": "100%",
-            "backgroundColor": "#0099CC",
-            "textAlign": "center",
-            "lineHeight": "30px",
-            "color": "white"
-        }, children="55%")  # Display percentage inside the bar
+        html.Div(id="progress-bar", style=progress_bar_style(0), children="")
     ], style={
         "width": "50%",  # Outer container width
         "backgroundColor": "#e0e0e0",
         "height": "30px",
         "borderRadius": "5px",
         "overflow": "hidden",
-        "display": "inline-block"
-    })
+        "display": "inline-block",
+        "marginLeft": "10px",
+        "verticalAlign": "middle"
+    }),
+
+    html.Span(id="progress-label", style={"marginLeft": "10px"}),
+
+    dbc.Button("Cancel", id="cancel-button", n_clicks=0, color="secondary", size="sm",
+               disabled=True, style={"marginLeft": "10px"}),
 ], style={"padding": "10px", "border": "1px solid #0099CC", "marginBottom": "10px", "width": "100%",
           "display": "inline-block"})
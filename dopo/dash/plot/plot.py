@@ -1,30 +1,87 @@
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 
+from ..utils.result_frame import NAME_COLUMNS, method_label, score_statistics
+
+# Maximum number of points (markers or bars) sent to the browser per plot
+POINT_BUDGET = 5000
+
+# Number of inputs shown separately in contribution plots; the others are summed into "Other"
+TOP_N_INPUTS = 10
+
 
 def prepare_dataframe(df, sector, impact):
     # Select the initial filtered data for the first sector and method
     filtered_data = df[sector]
 
-    if not isinstance(impact, str):
-        impact = str(impact)
-
-    filtered_data = pd.DataFrame.from_dict(filtered_data)
-    filtered_data = filtered_data.loc[
-        (filtered_data["method"] == "-".join(list(eval(impact)))), :
-    ]
+    if not isinstance(filtered_data, pd.DataFrame):
+        filtered_data = pd.DataFrame.from_dict(filtered_data)
+    filtered_data = filtered_data.loc[filtered_data["method"] == method_label(impact), :].copy()
 
     # Add a descriptive name to each entry for the plot
-    filtered_data["name"] = filtered_data.apply(
-        lambda x: f"{x['activity']} - {x['location']} - {x['database']}", axis=1
-    )
+    filtered_data["name"] = filtered_data[NAME_COLUMNS].astype(str).agg(" - ".join, axis=1)
 
     return filtered_data
 
 
-def contribution_plot(df, sector, impact_assessment):
+def downsample(df, column, budget):
+    """
+    Keeps at most `budget` rows of `df`: the lowest and highest quarter of the budget by
+    `column`, where outliers are, and rows evenly spread over the rest.
+    """
+    if len(df) <= budget:
+        return df
+
+    df = df.sort_values(column)
+    tail = budget // 4
+    middle = df.iloc[tail:len(df) - tail]
+    # Evenly spaced rows from the first to the last of the middle
+    rows = np.linspace(0, len(middle) - 1, budget - 2 * tail).astype(int)
+    return pd.concat([df.iloc[:tail], middle.iloc[rows], df.iloc[len(df) - tail:]])
+
+
+def reduce_contributions(df, top_n=TOP_N_INPUTS, point_budget=POINT_BUDGET):
+    """
+    Reduces input contributions to what a contribution plot shows.
+
+    Only the `top_n` inputs with the largest contributions over all activities are kept; the
+    others are summed into "Other". When there would be more than `point_budget` bars, the
+    activities are downsampled, keeping those with the lowest and highest scores.
+
+    :return: The "name", "input" and "score" of each bar, and the inputs in stacking order.
+    :rtype: tuple
+    """
+    # Reduce the inputs to the top N and "Other"
+    ranking = df.groupby("input")["score"].apply(lambda x: x.abs().sum()).sort_values(ascending=False)
+    top_inputs = [i for i in ranking.index if i != "Other"][:top_n]
+    df = df.assign(input=df["input"].where(df["input"].isin(top_inputs), "Other"))
+    df = df.groupby(["name", "input"], as_index=False, sort=False)["score"].sum()
+
+    # Keep the number of bars within the budget
+    totals = df.groupby("name", as_index=False, sort=False)["score"].sum()
+    max_activities = max(point_budget // max(df["input"].nunique(), 1), 1)
+    names = downsample(totals, "score", max_activities)["name"]
+    df = df[df["name"].isin(set(names))]
+
+    inputs = [i for i in top_inputs + ["Other"] if (df["input"] == i).any()]
+    return df, inputs
+
+
+def contribution_plot(df, sector, impact_assessment, top_n=TOP_N_INPUTS, point_budget=POINT_BUDGET,
+                      legend_title="Input"):
+    """
+    Stacked bar plot of the contribution of each input, or elementary flow, to the score of each
+    activity.
+
+    Inputs and activities are reduced by `reduce_contributions`.
+    """
+    unit = df["method unit"].iloc[0]
+
+    df, inputs = reduce_contributions(df, top_n, point_budget)
+
     fig = go.Figure()
-    for input_name in df["input"].unique():
+    for input_name in inputs:
         input_data = df[df["input"] == input_name]
         fig.add_trace(
             go.Bar(x=input_data["name"], y=input_data["score"], name=input_name)
@@ -35,8 +92,8 @@ def contribution_plot(df, sector, impact_assessment):
         barmode="stack",
         title=f"{sector} analysis - {impact_assessment}",
         xaxis_title="Activity",
-        yaxis_title=input_data["method unit"].iloc[0],
-        legend_title="Input",
+        yaxis_title=unit,
+        legend_title=legend_title,
         height=700,
         xaxis=dict(showticklabels=False),
         plot_bgcolor='white'
@@ -44,55 +101,49 @@ def contribution_plot(df, sector, impact_assessment):
 
     return fig
 
-def scores_plot(df, sector, impact_assessment):
+def scores_plot(df, sector, impact_assessment, point_budget=POINT_BUDGET, statistics=None):
     """
-    Scatter plot of scores for each activity in the sector.
+    Scatter plot of scores for each activity in the sector, rendered with WebGL.
     Add a line for the average score.
     Add a line for standard deviation above and below the average score.
+
+    Statistics are computed on all activities. When there are more than `point_budget`
+    activities, the points are downsampled, keeping those with the lowest and highest scores.
+
+    If `statistics` is given (see `ResultFrame.statistics`), `df` holds one total score per
+    activity, and neither the totals nor the statistics are computed again.
     """
 
     fig = go.Figure()
 
-
-    df = df[["name", "score", "method unit"]].groupby(["name", "method unit"]).sum().reset_index()
+    if statistics is None:
+        df = df[["name", "score", "method unit"]].groupby(["name", "method unit"]).sum().reset_index()
+        statistics = score_statistics(df["score"])
+    points = downsample(df, "score", point_budget)
 
     # Add scatter plot of scores (the sum of all inputs)
     fig.add_trace(
-        go.Scatter(x=df["name"], y=df["score"], mode='markers', name='Score', marker=dict(size=12))
-    )
-
-    # Add average score line
-    avg_score = df["score"].mean()
-    fig.add_trace(
-        go.Scatter(x=df["name"], y=[avg_score]*len(df), mode='lines', name='Average', line=dict(color='black', width=2))
-    )
-
-    # Add median score line
-    median_score = df["score"].median()
-    fig.add_trace(
-        go.Scatter(x=df["name"], y=[median_score]*len(df), mode='lines', name='Median', line=dict(color='green', width=2))
+        go.Scattergl(x=points["name"], y=points["score"], mode='markers', name='Score', marker=dict(size=12))
     )
 
-    # Add standard deviation lines
-    std_dev = df["score"].std()
-    fig.add_trace(
-        go.Scatter(x=df["name"], y=[avg_score + std_dev]*len(df), mode='lines', name='Average + Std Dev', line=dict(color='blue', width=2))
-    )
-    fig.add_trace(
-        go.Scatter(x=df["name"], y=[avg_score - std_dev]*len(df), mode='lines', name='Average - Std Dev', line=dict(color='blue', width=2))
-    )
-
-    # Add 5th percentile line
-    percentile_5 = df["score"].quantile(0.05)
-    fig.add_trace(
-        go.Scatter(x=df["name"], y=[percentile_5]*len(df), mode='lines', name='5th Percentile', line=dict(color='red', width=2))
-    )
-
-    # Add 95th percentile line
-    percentile_95 = df["score"].quantile(0.95)
-    fig.add_trace(
-        go.Scatter(x=df["name"], y=[percentile_95]*len(df), mode='lines', name='95th Percentile', line=dict(color='red', width=2))
-    )
+    avg_score = statistics["mean"]
+    std_dev = statistics["std"]
+
+    # Reference lines are layout shapes, not traces with one point per activity
+    lines = [
+        ("Average", avg_score, 'black'),
+        ("Median", statistics["median"], 'green'),
+        ("Average + Std Dev", avg_score + std_dev, 'blue'),
+        ("Average - Std Dev", avg_score - std_dev, 'blue'),
+        ("5th Percentile", statistics["q05"], 'red'),
+        ("95th Percentile", statistics["q95"], 'red'),
+    ]
+    for name, value, color in lines:
+        if pd.notna(value):
+            fig.add_hline(
+                y=value, line=dict(color=color, width=2),
+                annotation_text=name, annotation_position="top right",
+            )
 
     # Update layout for scatter plot
     fig.update_layout(
@@ -0,0 +1,283 @@
+"""
+Server-side caches for analysis results and the figures rendered from them.
+
+Results stay on the server, and the browser only keeps a short handle in a `dcc.Store`.
+Callbacks use the handle to fetch the sector they need. Entries are kept in an in-process LRU
+and written to a disk backend, so they outlive LRU eviction and can be shared between worker
+processes. The disk backend is `diskcache` when it is installed, and plain pickle files in a
+cache directory otherwise. Pickles are only loaded from a directory private to the current user.
+"""
+
+import json
+import logging
+import os
+import pickle
+import stat
+import threading
+import uuid
+import warnings
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+
+import plotly.io as pio
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+# Number of result sets kept in memory
+MAX_ENTRIES = 8
+
+# Number of result sets kept on disk
+MAX_DISK_ENTRIES = 64
+
+# Number of rendered figures kept in memory
+MAX_FIGURES = 64
+
+CACHE_DIR = Path(os.environ.get(
+    "DOPO_CACHE_DIR",
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "dopo" / "results",
+))
+
+
+def private_directory(path: Path) -> bool:
+    """
+    Creates `path` readable by the current user only, if needed, and checks that it is private.
+
+    :param path: The cache directory.
+    :type path: Path
+    :return: True if `path` is a directory, not a symbolic link, owned by the current user and
+        not accessible to other users.
+    :rtype: bool
+    """
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        return False
+    if hasattr(os, "getuid"):
+        return info.st_uid == os.getuid() and not info.st_mode & 0o077
+    return True
+
+
+class ResultCache:
+    """
+    Keyed cache of analysis results, with an in-process LRU in front of a disk backend.
+
+    Attributes
+    ----------
+    max_entries : int
+        Number of result sets kept in memory.
+    directory : Path
+        Directory of the disk backend, or None to keep results in memory only. A directory that
+        other users can access is not used.
+    max_disk_entries : int
+        Number of result sets kept by the disk backend.
+
+    Methods
+    -------
+    put(results)
+        Stores a result set and returns its handle.
+    get(handle)
+        Returns the result set of a handle.
+    get_sector(handle, sector)
+        Returns the results of one sector.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, directory=CACHE_DIR,
+                 max_disk_entries: int = MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.directory = Path(directory) if directory else None
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+
+        if self.directory is not None and not private_directory(self.directory):
+            warnings.warn(f"{self.directory} is not private to the current user; results are kept in memory only")
+            self.directory = None
+        if self.directory is not None and diskcache is not None:
+            self._disk = diskcache.Cache(str(self.directory))
+
+    def put(self, results) -> str:
+        """
+        Stores `results` and returns the handle to fetch them with.
+
+        :param results: A `ResultFrame`, or a dictionary where each key is a sector name and each
+            value is a DataFrame.
+        :return: A short handle identifying the result set.
+        :rtype: str
+        """
+        handle = uuid.uuid4().hex[:16]
+        self._remember(handle, results)
+        if self.directory is not None:
+            self._write(handle, results)
+        return handle
+
+    def get(self, handle: str):
+        """
+        Returns the result set stored under `handle`, or None if it is unknown or expired.
+        """
+        if not handle or not isinstance(handle, str):
+            return None
+
+        with self._lock:
+            if handle in self._memory:
+                self._memory.move_to_end(handle)
+                return self._memory[handle]
+
+        results = self._read(handle) if self.directory is not None else None
+        if results is not None:
+            self._remember(handle, results)
+        return results
+
+    def get_sector(self, handle: str, sector: str):
+        """
+        Returns the results of `sector` in the result set stored under `handle`, or None.
+        """
+        results = self.get(handle)
+        if results is None:
+            return None
+        return results.get(sector)
+
+    def _remember(self, handle: str, results: dict):
+        with self._lock:
+            self._memory[handle] = results
+            self._memory.move_to_end(handle)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, handle: str) -> Path:
+        return self.directory / f"{handle}.pickle"
+
+    def _write(self, handle: str, results: dict):
+        if self._disk is not None:
+            self._disk.set(handle, results)
+            # diskcache iterates keys in storage order; drop the oldest result sets
+            excess = len(self._disk) - self.max_disk_entries
+            for old in list(islice(iter(self._disk), max(excess, 0))):
+                self._disk.delete(old)
+            return
+
+        path = self._path(handle)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+        files = sorted(self.directory.glob("*.pickle"), key=lambda p: p.stat().st_mtime)
+        for old in files[:-self.max_disk_entries]:
+            old.unlink(missing_ok=True)
+
+    def _read(self, handle: str):
+        if self._disk is not None:
+            return self._disk.get(handle)
+
+        # Handles are hex strings; anything else cannot be a cache file
+        if not all(c in "0123456789abcdef" for c in handle):
+            return None
+        try:
+            with open(self._path(handle), "rb") as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+
+class FigureCache:
+    """
+    LRU cache of rendered figures, keyed by result handle and view (sector, method, plot type).
+
+    Figures are stored as their JSON text, a compact and immutable copy of what is sent to the
+    browser, so a cached view is returned without building or validating a Plotly figure again.
+    Results are immutable once stored under a handle, so entries never need to be invalidated.
+    The hit-rate metrics are logged at debug level after each render.
+
+    Attributes
+    ----------
+    max_entries : int
+        Number of figures kept.
+    hits : int
+        Number of lookups answered from the cache.
+    misses : int
+        Number of lookups that rendered the figure.
+
+    Methods
+    -------
+    get_or_render(key, render)
+        Returns the cached figure of a view, rendering it on a miss.
+    stats()
+        Returns the hit-rate metrics.
+    """
+
+    def __init__(self, max_entries: int = MAX_FIGURES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key: tuple, render) -> dict:
+        """
+        Returns the figure cached under `key`, or renders, stores and returns it.
+
+        :param key: (handle, sector, method, plot type) of the view.
+        :type key: tuple
+        :param render: Called without arguments on a miss; returns a Plotly figure, a
+            dictionary, or None if the view cannot be rendered.
+        :type render: callable
+        :return: The figure as a dictionary, or None.
+        :rtype: dict
+        """
+        with self._lock:
+            text = self._figures.get(key)
+            if text is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return json.loads(text)
+            self.misses += 1
+
+        figure = render()
+        if figure is None:
+            return None
+        text = pio.to_json(figure, validate=False)
+
+        with self._lock:
+            self._figures[key] = text
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Rendered figure %s: %s", key, self.stats())
+        return json.loads(text)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """
+        Returns the number of hits, misses and cached figures, and the hit rate.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._figures),
+                "hit_rate": self.hit_rate,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+result_cache = ResultCache()
+
+figure_cache = FigureCache()
@@ -0,0 +1,123 @@
+"""
+Compact columnar payload of analysis results, for views rendered in the browser.
+
+With clientside views, the results are sent to the browser once, and changing the sector,
+method or plot type builds the Plotly traces there, without a request to the server. The
+payload holds what the plots show, already reduced to the point budget of `dopo.dash.plot`:
+
+- all strings (activity names, inputs, units) once, in a `strings` table;
+- per (sector, method), name and input columns as int32 codes into `strings`, and scores as
+  float32, each as a base64-encoded little-endian typed array;
+- per (sector, method), the summary statistics of the scores.
+
+This is much smaller than `DataFrame.to_dict()`, and decoded in the browser without parsing
+numbers one by one.
+"""
+
+import base64
+import math
+
+import numpy as np
+
+from ..plot.plot import POINT_BUDGET, TOP_N_INPUTS, downsample, reduce_contributions
+from .result_frame import ResultFrame
+
+PAYLOAD_VERSION = 1
+
+
+def encode_array(values, dtype: str) -> str:
+    """
+    Encodes `values` as a base64 string of a little-endian typed array.
+
+    :param values: Sequence of numbers.
+    :param dtype: "int32" or "float32".
+    :type dtype: str
+    :return: The base64-encoded bytes.
+    :rtype: str
+    """
+    array = np.asarray(values, dtype=np.dtype(dtype).newbyteorder("<"))
+    return base64.b64encode(array.tobytes()).decode("ascii")
+
+
+def decode_array(data: str, dtype: str) -> np.ndarray:
+    """
+    Decodes a base64 string written by `encode_array`.
+    """
+    return np.frombuffer(base64.b64decode(data), dtype=np.dtype(dtype).newbyteorder("<"))
+
+
+class _Strings:
+    """Dictionary encoding of strings."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value) -> int:
+        value = str(value)
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values) -> str:
+        return encode_array([self.code(v) for v in values], "int32")
+
+
+def view_payload(results: ResultFrame, methods: list, handle: str = None, sector: str = None,
+                 top_n: int = TOP_N_INPUTS, point_budget: int = POINT_BUDGET) -> dict:
+    """
+    Builds the payload of every (sector, method) view of `results`.
+
+    :param results: Results of an analysis.
+    :type results: ResultFrame
+    :param methods: Methods as the values of the method dropdown; views are keyed by these.
+    :type methods: list
+    :param handle: Handle of the results in the result cache, to tell payloads apart.
+    :type handle: str
+    :param sector: If given, the only sector shown, whatever the sector dropdown says (for
+        dataset searches).
+    :type sector: str
+    :return: A JSON-serializable dictionary.
+    :rtype: dict
+    """
+    strings = _Strings()
+    views = {}
+
+    for sector_name in results.sectors:
+        for method in methods:
+            scores = results.scores(sector_name, method)
+            if scores.empty:
+                continue
+
+            points = downsample(scores, "score", point_budget)
+            contributions, inputs = reduce_contributions(
+                results.contributions(sector_name, method), top_n, point_budget
+            )
+            statistics = results.statistics(sector_name, method)
+
+            views.setdefault(sector_name, {})[method] = {
+                "unit": strings.code(scores["method unit"].iloc[0]),
+                "statistics": {
+                    key: None if math.isnan(value) else float(value) for key, value in statistics.items()
+                },
+                "scores": {
+                    "name": strings.encode(points["name"]),
+                    "score": encode_array(points["score"], "float32"),
+                },
+                "contributions": {
+                    "inputs": [strings.code(i) for i in inputs],
+                    "name": strings.encode(contributions["name"]),
+                    "input": strings.encode(contributions["input"]),
+                    "score": encode_array(contributions["score"], "float32"),
+                },
+            }
+
+    return {
+        "version": PAYLOAD_VERSION,
+        "handle": handle,
+        "sector": sector,
+        "strings": strings.values,
+        "views": views,
+    }
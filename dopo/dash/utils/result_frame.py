@@ -0,0 +1,169 @@
+"""
+Analysis results indexed for the Dash plots.
+
+The results of an analysis are a DataFrame of input contributions per sector. Switching sector,
+method or plot type only needs one (sector, method) slice of them, so they are concatenated once
+into a columnar frame sorted by (sector, method), with the position of every slice, the display
+name of every row, the total score of every activity and the summary statistics of every slice.
+A dropdown change is then a lookup instead of a filter over all results.
+"""
+
+import ast
+
+import pandas as pd
+
+from dopo.lca import UNREFINED_INPUT
+
+# Columns identifying an activity in the plots
+NAME_COLUMNS = ["activity", "location", "database"]
+
+
+def method_label(method) -> str:
+    """
+    Label of a method in the results, e.g. "IPCC 2021-climate change-GWP 100a".
+
+    :param method: Method tuple, or its string representation as used by the dropdowns.
+    :return: The method names joined with "-".
+    """
+    if isinstance(method, str):
+        method = ast.literal_eval(method)
+    return "-".join(method)
+
+
+def score_statistics(scores: pd.Series) -> dict:
+    """
+    Mean, median, standard deviation and 5th and 95th percentiles of `scores`.
+    """
+    return {
+        "mean": scores.mean(),
+        "median": scores.median(),
+        "std": scores.std(),
+        "q05": scores.quantile(0.05),
+        "q95": scores.quantile(0.95),
+    }
+
+
+class ResultFrame:
+    """
+    Results of an analysis, indexed by (sector, method).
+
+    Attributes
+    ----------
+    frame : pd.DataFrame
+        Input contributions of all sectors, sorted by (sector, method), with a "sector" and a
+        display "name" column.
+    totals : pd.DataFrame
+        Total score of every activity, sorted by (sector, method).
+
+    Methods
+    -------
+    has(sector, method)
+        Returns True if there are scores for one sector and method.
+    contributions(sector, method)
+        Returns the input contributions of one sector and method.
+    scores(sector, method)
+        Returns the total score of each activity of one sector and method.
+    statistics(sector, method)
+        Returns the summary statistics of the scores of one sector and method.
+    refined_share()
+        Returns the share of the scores broken down into contributions.
+    """
+
+    def __init__(self, results: dict):
+        """
+        :param results: A dictionary where each key is a sector name and each value is a
+            DataFrame of input contributions, as returned by `Dopo.analyze`.
+        :type results: dict
+        """
+        frames = [
+            df.assign(sector=sector) for sector, df in results.items()
+            if df is not None and not df.empty
+        ]
+        if frames:
+            frame = pd.concat(frames, ignore_index=True)
+            frame["name"] = frame[NAME_COLUMNS].astype(str).agg(" - ".join, axis=1)
+        else:
+            frame = pd.DataFrame(columns=["sector", "method", "name", "method unit", "input", "score"])
+
+        # Stable sort, so that rows keep their order within a slice
+        self.frame = frame.sort_values(["sector", "method"], kind="stable", ignore_index=True)
+        self._rows = _positions(self.frame)
+
+        totals = self.frame.groupby(["sector", "method", "name", "method unit"], sort=True)["score"].sum()
+        self.totals = totals.reset_index()
+        self._totals = _positions(self.totals)
+
+        self._statistics = {
+            key: score_statistics(self.totals["score"].iloc[start:stop])
+            for key, (start, stop) in self._totals.items()
+        }
+        self.sectors = list(results)
+
+    def __contains__(self, sector) -> bool:
+        return sector in self.sectors
+
+    def has(self, sector: str, method) -> bool:
+        """
+        Returns True if there are scores for `sector` and `method`.
+        """
+        return (sector, method_label(method)) in self._totals
+
+    def get(self, sector, default=None):
+        """
+        Returns the input contributions of `sector` for all methods, or `default`.
+        """
+        if sector not in self:
+            return default
+        return self.frame[self.frame["sector"] == sector]
+
+    def contributions(self, sector: str, method) -> pd.DataFrame:
+        """
+        Returns the input contributions of `sector` for `method`, with a display "name" column.
+
+        :param sector: Name of the sector.
+        :param method: Method tuple, or its string representation.
+        :return: A slice of `frame`, empty if there are no results.
+        :rtype: pd.DataFrame
+        """
+        start, stop = self._rows.get((sector, method_label(method)), (0, 0))
+        return self.frame.iloc[start:stop]
+
+    def scores(self, sector: str, method) -> pd.DataFrame:
+        """
+        Returns the total score of each activity of `sector` for `method`.
+
+        :return: A DataFrame with "name", "method unit" and "score" columns.
+        :rtype: pd.DataFrame
+        """
+        start, stop = self._totals.get((sector, method_label(method)), (0, 0))
+        return self.totals.iloc[start:stop]
+
+    def statistics(self, sector: str, method) -> dict:
+        """
+        Returns the statistics of `score_statistics` for the scores of `sector` and `method`,
+        or None if there are no results.
+        """
+        return self._statistics.get((sector, method_label(method)))
+
+    def refined_share(self) -> float:
+        """
+        Returns the share of the absolute scores broken down into input contributions, below 1
+        for the results of an analysis stopped at its deadline.
+        """
+        magnitude = self.frame["score"].abs()
+        if not magnitude.sum():
+            return 1.0
+        return 1.0 - magnitude[self.frame["input"] == UNREFINED_INPUT].sum() / magnitude.sum()
+
+
+def _positions(df: pd.DataFrame) -> dict:
+    """
+    Returns the (start, stop) row positions of each (sector, method) in `df`, which is sorted
+    by them.
+    """
+    sizes = df.groupby(["sector", "method"], sort=True).size()
+    positions, start = {}, 0
+    for key, size in sizes.items():
+        positions[key] = (start, start + size)
+        start += size
+    return positions
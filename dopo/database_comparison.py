@@ -2,21 +2,29 @@
 Module for LCA Database Comparison and Excel Plotting
 
 Provides functions to compare LCA scores between databases and visualize results in Excel. It uses 
-`brightway2` for LCA calculations and `openpyxl` for Excel operations.
+`brightway2` for LCA calculations and `openpyxl` for Excel operations. Several databases (e.g. IAM
+scenarios and years) can be compared at once against a baseline with `database_panel_comparison`.
 """
 
-import brightway2 as bw
+import re
+import warnings
+from collections import defaultdict, deque
+
 import bw2data as bd
 import bw2analyzer as ba
 
+import numpy as np
 import pandas as pd
 
 from openpyxl import load_workbook
-from openpyxl.chart import ScatterChart, Reference, Series, BarChart
+from openpyxl.chart import Reference, BarChart
 from openpyxl.chart.axis import ChartLines
 
+from .batched_lca import BatchedLCA
+from .excel_report import ExcelReport
+
 def database_comparison_plots(database_dict_ecoinvent, database_dict_premise, method_dict,
-                              excel_file, current_row):
+                              excel_file, current_row, report=None):
     """
     Generate comparison plots of Life Cycle Assessment (LCA) scores between two databases and save
     them to an Excel file.
@@ -35,6 +43,10 @@ def database_comparison_plots(database_dict_ecoinvent, database_dict_premise, me
         excel_file (str): The name of the Excel file where the comparison plots will be saved.
         current_row (int): The last row in the Excel sheet occupied by stacked bar plot. The 
                             comparison charts will be inserted below.
+        report (ExcelReport, optional): A report to add the tables and charts to, e.g. the one 
+                            passed to `sector_lca_scores_plots`. If given, the workbook is not 
+                            written here. By default, the results are added to `excel_file` in a 
+                            single load/save cycle.
 
     Returns:
         None
@@ -51,14 +63,183 @@ def database_comparison_plots(database_dict_ecoinvent, database_dict_premise, me
             relative changes between databases and `barchart_compare_db_xcl` to generate and save 
             the bar chart.
     """
+    write_report = report is None
+    if write_report:
+        report = ExcelReport(excel_file, append=True)
+
     column_positions=_relative_changes_db(database_dict_ecoinvent, database_dict_premise,
-                                          method_dict, excel_file)
-    _barchart_compare_db_xcl(excel_file, column_positions, current_row)
+                                          method_dict, excel_file, report=report)
+    add_barcharts_compare_db(report, column_positions, current_row)
+
+    if write_report:
+        report.save()
+        print(f"Results and chart saved to {excel_file}")
+
+def _database_scores(database_dict, method_names):
+    """
+    Compute the total LCA scores of all activities of a database dictionary for several methods.
+
+    The technosphere matrix of each database is factorized once: all activities of that database
+    are solved as batched demands, and all methods are characterized from the shared inventory.
+
+    Args:
+        database_dict (dict): Dictionary where each key is a sector name and each value is a dictionary
+            containing activities of that sector.
+        method_names (list): List of method tuples.
+
+    Returns:
+        dict: A dictionary where each key is an activity key and each value is an array with one
+        score per method, in the order of `method_names`.
+    """
+
+    # Collect the unique activities of all sectors, grouped by database
+    activities_by_database = {}
+    for sector_data in database_dict.values():
+        for act in sector_data['activities']:
+            # Ensure the activity is an instance of the expected class
+            if not isinstance(act, bd.backends.peewee.proxies.Activity):
+                raise ValueError("`activities` must be an iterable of `Activity` instances")
+            activities_by_database.setdefault(act["database"], {})[act.key] = act
+
+    scores = {}
+    for activities in activities_by_database.values():
+        activities = list(activities.values())
+        engine = BatchedLCA(activities, method_names)
+        database_scores = engine.scores(activities)
+        for j, act in enumerate(activities):
+            scores[act.key] = database_scores[:, j]
+
+    return scores
+
+class ActivityMatchIndex:
+    """
+    Index matching the activities of a reference database to those of another database.
+
+    Activities are matched one-to-one, in three passes of decreasing strictness:
+
+    1. ``"code"``: identical activity code.
+    2. ``"exact"``: identical (name, reference product, location, unit) tuple.
+    3. ``"fuzzy"``: identical normalized (name, reference product) and unit, which catches
+       regionalized and reworded premise datasets. Candidates in the same location are preferred.
+
+    Each pass is a dictionary lookup per activity, so building the index is O(n).
+
+    Attributes:
+        matches (dict): Maps each matched reference activity key to a ``(key, match type)`` tuple
+            of the other database.
+        reverse (dict): Maps each matched activity key of the other database to a
+            ``(reference key, match type)`` tuple.
+    """
+
+    def __init__(self, reference, other):
+        """
+        Args:
+            reference (iterable): Activities of the reference database (e.g. ecoinvent).
+            other (iterable): Activities of the database to match (e.g. premise).
+        """
+        self.matches = {}
+        self.reverse = {}
+
+        reference = list({act.key: act for act in reference}.values())
+        other = list({act.key: act for act in other}.values())
+
+        passes = [
+            ("code", lambda act: act.key[1]),
+            ("exact", _exact_match_key),
+            ("fuzzy", _fuzzy_match_key),
+        ]
+
+        for match_type, make_key in passes:
+            # Candidates of each key, in order and by location
+            candidates = {}
+            for act in other:
+                if act.key not in self.reverse:
+                    ordered, by_location = candidates.setdefault(
+                        make_key(act), (deque(), defaultdict(deque))
+                    )
+                    ordered.append(act)
+                    by_location[act.get("location")].append(act)
+
+            for act in reference:
+                if act.key in self.matches:
+                    continue
+                found = _pick_candidate(candidates.get(make_key(act)), act, self.reverse)
+                if found is not None:
+                    self.matches[act.key] = (found.key, match_type)
+                    self.reverse[found.key] = (act.key, match_type)
+
+    def reference_code(self, key):
+        """
+        Returns the code of the reference activity matched to `key` of the other database, or the
+        code of `key` itself if it is unmatched.
+        """
+        return self.reverse.get(key, (key, None))[0][1]
+
+    def match_type(self, key):
+        """
+        Returns how `key` of the other database was matched, or ``"unmatched"``.
+        """
+        return self.reverse.get(key, (None, "unmatched"))[1]
+
+
+# Tokens ignored when comparing normalized labels
+LABEL_STOPWORDS = {"a", "an", "and", "of", "the"}
+
+
+def _normalize_label(label):
+    """
+    Lower-cases a label and sorts its alphanumeric tokens, so that reworded labels share a key.
+    """
+    tokens = set(re.findall(r"[a-z0-9]+", (label or "").lower())) - LABEL_STOPWORDS
+    return " ".join(sorted(tokens))
+
+
+def _exact_match_key(act):
+    return (act["name"], act.get("reference product"), act.get("location"), act.get("unit"))
+
+
+def _fuzzy_match_key(act):
+    return (
+        _normalize_label(act["name"]),
+        _normalize_label(act.get("reference product")),
+        act.get("unit"),
+    )
+
+
+def _pick_candidate(candidates, act, taken):
+    """
+    Pops the first candidate not already matched, preferring one in the location of `act`.
+
+    `candidates` is a ``(deque of candidates, {location: deque of candidates})`` tuple, or None.
+    Matched candidates are popped from the queues as they are met, and each is met at most
+    twice, so a pick is amortized O(1).
+    """
+    if candidates is None:
+        return None
+    ordered, by_location = candidates
+    for queue in (by_location.get(act.get("location")), ordered):
+        while queue:
+            candidate = queue.popleft()
+            if candidate.key not in taken:
+                return candidate
+    return None
+
+
+def _unique_activities(database_dict):
+    """
+    Returns the unique activities of all sectors of a database dictionary.
+    """
+    return list(
+        {act.key: act for sector_data in database_dict.values()
+         for act in sector_data['activities']}.values()
+    )
 
 def _lca_scores_compare(database_dict, method_dict):
     """
     Compare Life Cycle Assessment (LCA) scores across different sectors and methods.
 
+    Scores are computed with one factorization per database, see `_database_scores`.
+
     Args:
         database_dict (dict): Dictionary where each key is a sector name and each value is a dictionary 
             containing activities of that sector.
@@ -84,41 +265,32 @@ def _lca_scores_compare(database_dict, method_dict):
         "total",
     ]
 
+    method_names = [meth_info['method name'] for meth_info in method_dict.values()]
+    scores = _database_scores(database_dict, method_names)
+
     # Loop through each sector in the database_dict
     for sector, sector_data in database_dict.items():
         # Initialize a dictionary to hold DataFrames for each method in the current sector
         method_dataframes = {}
 
         # Loop through each method in method_dict
-        for meth_key, meth_info in method_dict.items():
-            data = []  # Initialize a new list to hold data for the current method
-
-            # Extract the 'method name' tuple from the current method info
-            method_name = meth_info['method name']
-            method_short_name=meth_info['short name']
+        for i, meth_info in enumerate(method_dict.values()):
+            method_short_name = meth_info['short name']
             method_unit = meth_info['unit']
 
-            # Now loop through each activity in the sector
-            for act in sector_data['activities']:
-                # Ensure the activity is an instance of the expected class
-                if not isinstance(act, bd.backends.peewee.proxies.Activity):
-                    raise ValueError("`activities` must be an iterable of `Activity` instances")
-
-                # Perform LCA calculations
-                lca = bw.LCA({act: 1}, method_name)
-                lca.lci()
-                lca.lcia()
-
-                # Collect data for the current activity and method
-                data.append([
+            # Collect data for each activity of the sector and the current method
+            data = [
+                [
                     act["name"],
                     act.key,
                     act.get("reference product"),
                     act.get("location", "")[:25],
                     method_short_name,
                     method_unit,
-                    lca.score,
-                ])
+                    scores[act.key][i],
+                ]
+                for act in sector_data['activities']
+            ]
 
             # Convert the data list to a DataFrame and store it in the sector's dictionary
             method_dataframes[method_short_name] = pd.DataFrame(data, columns=labels)
@@ -135,6 +307,9 @@ def _relative_changes_df(database_dict_eco, database_dict_premise, method_dict):
     Compute relative changes in Life Cycle Assessment (LCA) scores between two databases (ecoinvent and premise) 
     across different sectors and methods.
 
+    Premise activities are matched to ecoinvent activities with an `ActivityMatchIndex` built once
+    for the database pair. How each row was matched is recorded in the 'match_type' column.
+
     Args:
         database_dict_eco (dict): Dictionary of sectors with activities for the ecoinvent database.
         database_dict_premise (dict): Dictionary of sectors with activities for the premise database.
@@ -148,6 +323,11 @@ def _relative_changes_df(database_dict_eco, database_dict_premise, method_dict):
     ecoinvent_scores = _lca_scores_compare(database_dict_eco, method_dict)
     premise_scores = _lca_scores_compare(database_dict_premise, method_dict)
 
+    # Match premise activities to ecoinvent activities once for all sectors and methods
+    index = ActivityMatchIndex(
+        _unique_activities(database_dict_eco), _unique_activities(database_dict_premise)
+    )
+
     relative_dict = {}
 
     # Iterate over sectors
@@ -167,16 +347,19 @@ def _relative_changes_df(database_dict_eco, database_dict_premise, method_dict):
                 # Split the 'activity key' to extract the second part
                 # Access the second element of the tuple
                 df_ei['activity_code'] = df_ei['activity key'].apply(lambda x: x[1])
-                # print("df_ei")
-                # print(df_ei)
 
-                df_premise['activity_code'] = df_premise['activity key'].apply(lambda x: x[1])
-                # print("df_premise")
-                # print(df_premise)
+                # Premise activities carry the code of their matched ecoinvent activity
+                df_premise['activity_code'] = df_premise['activity key'].map(index.reference_code)
+                df_premise['match_type'] = df_premise['activity key'].map(index.match_type)
 
                 # Perform a full outer merge on 'activity_code' and 'method' to include all rows
                 merged_df = pd.merge(df_ei, df_premise, on=['activity_code', 'method'], how='outer',
                                      suffixes=('_ei', '_premise'))
+                # Rows without an ecoinvent score in this sector have no counterpart to compare to,
+                # even when their activity was matched in another sector
+                merged_df['match_type'] = (
+                    merged_df['match_type'].where(merged_df['total_ei'].notna()).fillna('unmatched')
+                )
 
                 # Calculate the relative change only where both scores are present
                 merged_df['relative_change'] = ((merged_df['total_premise'] - merged_df['total_ei'])
@@ -190,6 +373,218 @@ def _relative_changes_df(database_dict_eco, database_dict_premise, method_dict):
 
     return relative_dict
 
+class ScenarioPanel:
+    """
+    LCA scores of a sector's activities across several databases, aligned on the baseline activities.
+
+    The first database of the panel is the baseline the relative changes are computed against.
+
+    Attributes:
+        databases (list): Database labels, in panel order.
+        methods (list): Method short names.
+        activities (pd.DataFrame): One row per aligned activity, with its code, name, reference
+            product and location.
+        scores (np.ndarray): (activity x database x method) array of scores. NaN where an activity
+            is missing from a database.
+        match_types (np.ndarray): (activity x database) array recording how each activity was
+            matched to the baseline (see `ActivityMatchIndex`), "baseline" or "missing".
+        positions (np.ndarray): Position of each database along the panel (e.g. years), used for
+            the trends.
+        relative_changes (np.ndarray): (activity x database x method) relative changes (%) of the
+            scores against the baseline.
+        trends (np.ndarray): (activity x method) least-squares slope of the scores along the panel.
+        outliers (np.ndarray): (activity x database x method) boolean flags for relative changes
+            whose robust z-score exceeds the threshold within their (database, method) panel.
+    """
+
+    def __init__(self, databases, methods, activities, scores, match_types=None, positions=None,
+                 threshold=3.5):
+        self.databases = list(databases)
+        self.methods = list(methods)
+        self.activities = activities
+        self.scores = scores
+
+        if match_types is None:
+            match_types = np.full(scores.shape[:2], "code", dtype=object)
+        self.match_types = match_types
+
+        if positions is None:
+            positions = np.arange(len(self.databases))
+        self.positions = np.asarray(positions, dtype=float)
+
+        # Relative changes against the baseline, NaN where they cannot be calculated
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.relative_changes = (scores - scores[:, :1, :]) / scores[:, :1, :] * 100
+        self.relative_changes[~np.isfinite(self.relative_changes)] = np.nan
+
+        self.trends = _panel_trends(scores, self.positions)
+        self.outliers = _panel_outliers(self.relative_changes, threshold)
+
+    def to_dataframe(self):
+        """
+        Returns the panel as a long DataFrame with one row per (activity, database, method).
+        """
+        n_activities, n_databases, n_methods = self.scores.shape
+
+        df = self.activities.iloc[
+            np.repeat(np.arange(n_activities), n_databases * n_methods)
+        ].reset_index(drop=True)
+        df["database"] = np.tile(np.repeat(self.databases, n_methods), n_activities)
+        df["method"] = np.tile(self.methods, n_activities * n_databases)
+        df["match_type"] = np.repeat(self.match_types.ravel(), n_methods)
+        df["total"] = self.scores.ravel()
+        df["relative_change"] = self.relative_changes.ravel()
+        df["trend"] = np.repeat(self.trends, n_databases, axis=0).ravel()
+        df["outlier"] = self.outliers.ravel()
+
+        return df
+
+
+def _panel_trends(scores, positions):
+    """
+    Least-squares slope of the scores along the panel, ignoring missing values.
+
+    Args:
+        scores (np.ndarray): (activity x database x method) array of scores.
+        positions (np.ndarray): Position of each database along the panel.
+
+    Returns:
+        np.ndarray: (activity x method) array of slopes. NaN where fewer than two scores exist.
+    """
+    mask = np.isfinite(scores)
+    x = np.broadcast_to(positions[None, :, None], scores.shape)
+    y = np.where(mask, scores, 0.0)
+
+    n = mask.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = (x * mask).sum(axis=1) / n
+        y_mean = y.sum(axis=1) / n
+        dx = np.where(mask, x - x_mean[:, None, :], 0.0)
+        dy = np.where(mask, y - y_mean[:, None, :], 0.0)
+        slopes = (dx * dy).sum(axis=1) / (dx ** 2).sum(axis=1)
+
+    slopes[(n < 2) | ~np.isfinite(slopes)] = np.nan
+    return slopes
+
+
+def _panel_outliers(relative_changes, threshold=3.5):
+    """
+    Flags relative changes far from the others of the same (database, method) panel.
+
+    Uses the modified z-score ``0.6745 * (x - median) / MAD``. Where the MAD is zero, the mean
+    absolute deviation (scaled by 1.2533) is used instead.
+
+    Args:
+        relative_changes (np.ndarray): (activity x database x method) array of relative changes.
+        threshold (float): Absolute modified z-score above which a value is flagged.
+
+    Returns:
+        np.ndarray: Boolean array of the same shape as `relative_changes`.
+    """
+    if relative_changes.shape[0] == 0:
+        return np.zeros(relative_changes.shape, dtype=bool)
+
+    with warnings.catch_warnings():
+        # Panels without any relative change (all NaN) are expected
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        median = np.nanmedian(relative_changes, axis=0, keepdims=True)
+        deviation = np.abs(relative_changes - median)
+        mad = np.nanmedian(deviation, axis=0, keepdims=True)
+        mean_ad = np.nanmean(deviation, axis=0, keepdims=True)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_scores = np.where(
+            mad > 0, 0.6745 * deviation / mad, deviation / (1.2533 * mean_ad)
+        )
+
+    return np.nan_to_num(z_scores, nan=0.0, posinf=0.0) > threshold
+
+
+def database_panel_comparison(database_dicts, method_dict, positions=None, threshold=3.5):
+    """
+    Compare LCA scores of the same sectors across several databases at once.
+
+    The scores of each database are computed once, with one factorization per database. Activities
+    of each database are matched to the baseline with an `ActivityMatchIndex`, then aligned across
+    all databases in a single pass over a code index, so that e.g. 5 IAM scenarios x 7 years can be
+    compared against a baseline without recomputing it for each pair.
+
+    Args:
+        database_dicts (dict): Dictionary where each key is a database label and each value is a
+            database dictionary (sector names mapped to dictionaries containing 'activities'). The
+            first database is the baseline.
+        method_dict (dict): Dictionary of methods with their details such as 'method name',
+            'short name', and 'unit'.
+        positions (list, optional): Position of each database along the panel (e.g. years), used
+            for the trends. Defaults to 0, 1, 2, ...
+        threshold (float, optional): Robust z-score above which a relative change is flagged as
+            an outlier within its (database, method) panel. Default is 3.5.
+
+    Returns:
+        dict: A dictionary where each key is a sector name and each value is a `ScenarioPanel`.
+    """
+
+    labels = list(database_dicts.keys())
+    method_names = [meth_info['method name'] for meth_info in method_dict.values()]
+    short_names = [meth_info['short name'] for meth_info in method_dict.values()]
+
+    # Scores of each database are computed once, for all sectors
+    scores = {
+        label: _database_scores(database_dict, method_names)
+        for label, database_dict in database_dicts.items()
+    }
+
+    # Match the activities of every database to the baseline, once per database pair
+    baseline_activities = _unique_activities(database_dicts[labels[0]])
+    match_indexes = {
+        label: ActivityMatchIndex(baseline_activities, _unique_activities(database_dict))
+        for label, database_dict in list(database_dicts.items())[1:]
+    }
+
+    sectors = dict.fromkeys(
+        sector for database_dict in database_dicts.values() for sector in database_dict
+    )
+
+    panels = {}
+    for sector in sectors:
+        index = {}  # activity code -> panel row
+        metadata, rows, cols, values, match_types = [], [], [], [], []
+
+        for col, label in enumerate(labels):
+            for act in database_dicts[label].get(sector, {}).get('activities', []):
+                if label in match_indexes:
+                    code = match_indexes[label].reference_code(act.key)
+                    match_type = match_indexes[label].match_type(act.key)
+                else:
+                    code, match_type = act.key[1], "baseline"
+
+                if code not in index:
+                    index[code] = len(metadata)
+                    metadata.append(
+                        [code, act["name"], act.get("reference product"),
+                         act.get("location", "")[:25]]
+                    )
+                rows.append(index[code])
+                cols.append(col)
+                values.append(scores[label][act.key])
+                match_types.append(match_type)
+
+        array = np.full((len(metadata), len(labels), len(method_names)), np.nan)
+        matched = np.full((len(metadata), len(labels)), "missing", dtype=object)
+        if values:
+            array[rows, cols, :] = np.vstack(values)
+            matched[rows, cols] = match_types
+
+        activities = pd.DataFrame(
+            metadata, columns=["activity_code", "activity", "reference product", "location"]
+        )
+        panels[sector] = ScenarioPanel(
+            labels, short_names, activities, array, match_types=matched,
+            positions=positions, threshold=threshold
+        )
+
+    return panels
+
 def _add_sector_marker(df, sector):
     """
     Adds a 'sector' column to the DataFrame for labeling and plotting purposes, and reorders columns 
@@ -221,7 +616,8 @@ def _add_sector_marker(df, sector):
     return df
 
 
-def _relative_changes_db(database_dict_eco, database_dict_premise, method_dict, excel_file):
+def _relative_changes_db(database_dict_eco, database_dict_premise, method_dict, excel_file,
+                         report=None):
     """
     Computes relative changes in LCA scores between two databases (ecoinvent and premise), adds 
     sector markers, and writes the results to an Excel file. Also returns the column positions for plotting.
@@ -232,6 +628,8 @@ def _relative_changes_db(database_dict_eco, database_dict_premise, method_dict,
         method_dict (dict): Dictionary of methods with their details such as 'method name', 
         'short name', and 'unit'.
         excel_file (str): Path to the Excel file where results are to be saved.
+        report (ExcelReport, optional): A report to add the sheets to. If given, the workbook is 
+        not written here.
 
     Returns:
         dict: Dictionary containing the positions of specific columns for each sector and 
@@ -239,49 +637,42 @@ def _relative_changes_db(database_dict_eco, database_dict_premise, method_dict,
     """
 
     relative_dict = _relative_changes_df(database_dict_eco, database_dict_premise, method_dict)
-    # print(relative_dict)
-
-    # Load existing workbook and get existing sheet names
-    try:
-        book = load_workbook(excel_file)
-        existing_sheets = book.sheetnames
-    except FileNotFoundError:
-        # If the file does not exist, we will create a new one, so no need to check existing sheets
-        existing_sheets = []
+
+    write_report = report is None
+    if write_report:
+        report = ExcelReport(excel_file, append=True)
     
     column_positions = {}  # stores the indexes of columns for plotting
     
-    with pd.ExcelWriter(excel_file, engine='openpyxl', mode='a') as writer:
-        for sector in relative_dict.keys():
-            relative_changes = relative_dict[sector]
-            
-            for method, table in relative_changes.items():
-                # Create a DataFrame for the current LCA score table
-                df = pd.DataFrame(table)
-
-                # Add sector marker
-                df = _add_sector_marker(df, sector) #!! ADJUST      
-
-                # Sort the DataFrame by 'relative_change' from largest negative to largest positive
-                df = df.sort_values(by='relative_change', ascending=False)
-
-                # Add a 'rank' column based on the 'relative_change', 
-                # ranking from most negative to least negative
-                df['rank'] = df['relative_change'].rank(ascending=False, method='dense').astype(int)
+    for sector in relative_dict.keys():
+        relative_changes = relative_dict[sector]
+        
+        for method, table in relative_changes.items():
+            # Create a DataFrame for the current LCA score table
+            df = pd.DataFrame(table)
+
+            # Add sector marker
+            df = _add_sector_marker(df, sector) #!! ADJUST      
+
+            # Sort the DataFrame by 'relative_change' from largest negative to largest positive
+            df = df.sort_values(by='relative_change', ascending=False)
+
+            # Add a 'rank' column based on the 'relative_change', 
+            # ranking from most negative to least negative
+            df['rank'] = df['relative_change'].rank(ascending=False, method='dense').astype(int)
     
-                # Get the index values of columns
-                columns_of_interest = ["rank", "relative_change", "method", "method unit_ei"]
-                positions = {col: df.columns.get_loc(col) 
-                             for col in columns_of_interest if col in df.columns}
-                column_positions[f"{sector}_comparison_{method}"] = positions
-
-                # Generate worksheet name
-                worksheet_name = f"{sector}_comparison_{method}"
-                if len(worksheet_name) > 31:
-                    worksheet_name = worksheet_name[:31]
-                
-                # Save the DataFrame to the Excel file in a new worksheet
-                df.to_excel(writer, sheet_name=worksheet_name, index=False)
+            # Get the index values of columns
+            columns_of_interest = ["rank", "relative_change", "method", "method unit_ei"]
+            positions = {col: df.columns.get_loc(col) 
+                         for col in columns_of_interest if col in df.columns}
+            column_positions[f"{sector}_comparison_{method}"] = positions
+
+            # Add the DataFrame to the report in a new worksheet (names are truncated to 31
+            # characters)
+            report.add_sheet(f"{sector}_comparison_{method}", df)
+
+    if write_report:
+        report.save()
     
     return column_positions
 
@@ -300,12 +691,27 @@ def _categorize_sheets_by_sector_comparison(file_path):
 
     # Load the workbook
     workbook = load_workbook(filename=file_path, read_only=True)
+
+    return _categorize_comparison_sheet_names(workbook.sheetnames)
+
+def _categorize_comparison_sheet_names(sheet_names):
+    """
+    Categorizes comparison sheet names by sector, the sector being the first part of the sheet
+    name separated by an underscore. Sheets without '_comparison' in their name are skipped.
+
+    Args:
+        sheet_names (list): Sheet names, in workbook order.
+
+    Returns:
+        dict: A dictionary where each key is a sector and each value is a list of sheet names 
+        corresponding to that sector.
+    """
     
     # Initialize a dictionary to hold sectors and their corresponding sheet names
     worksheet_dict = {}
     
     # Iterate over all sheet names in the workbook
-    for sheet_name in workbook.sheetnames:
+    for sheet_name in sheet_names:
         # Skip combined sector sheets (assuming these sheets don't have an underscore)
         if '_comparison' not in sheet_name:
             continue
@@ -335,19 +741,33 @@ def _barchart_compare_db_xcl(filename, index_positions, current_row_stacked_bar)
         None. Saves the charts directly into the Excel file.
     """
 
-    worksheet_dict =_categorize_sheets_by_sector_comparison(file_path=filename)
-    # Load the workbook and select the sheet
-    wb = load_workbook(filename)
+    report = ExcelReport(filename, append=True)
+    add_barcharts_compare_db(report, index_positions, current_row_stacked_bar)
+    report.save()
+
+    print(f"Results and chart saved to {filename}")
+
+def add_barcharts_compare_db(report, index_positions, current_row_stacked_bar):
+    """
+    Adds bar charts comparing relative changes to an `ExcelReport`, organized by sector in
+    `{sector}_charts` sheets moved to the front of the workbook.
+
+    Args:
+        report (ExcelReport): The report holding the comparison sheets.
+        index_positions (dict): Dictionary with the positions of relevant columns for each sheet.
+        current_row_stacked_bar (int): Initial row position for placing stacked bar charts.
+
+    Returns:
+        None
+    """
+
+    worksheet_dict = _categorize_comparison_sheet_names(report.sheetnames)
 
     # Iterate over each sector and its associated worksheets
     for sector, worksheet_names in worksheet_dict.items():
         
         # Create or get the chart sheet for the current sector
-        chart_sheet_name = f"{sector}_charts"
-        if chart_sheet_name in wb.sheetnames:
-            ws_charts = wb[chart_sheet_name]
-        else:
-            ws_charts = wb.create_sheet(chart_sheet_name)  
+        chart_sheet_name = report.chart_sheet(f"{sector}_charts")
         
         # Initial position for the first chart
         current_col = 1  # Start placing charts from column 1
@@ -358,8 +778,6 @@ def _barchart_compare_db_xcl(filename, index_positions, current_row_stacked_bar)
     
         # Iterate over each worksheet name in the current sector
         for i, worksheet_name in enumerate(worksheet_names):
-            ws = wb[worksheet_name]
-
             # Find the key in index_positions that contains worksheet_name
             matching_key = None
             for key in index_positions.keys():
@@ -371,73 +789,12 @@ def _barchart_compare_db_xcl(filename, index_positions, current_row_stacked_bar)
                 print(f"Warning: No matching key found for worksheet '{worksheet_name}'. Skipping...")
                 continue
 
-            # Retrieve the column positions from the index_positions dictionary
-            positions = index_positions[matching_key]
-
-            # Find min_row, max_row and max_column
-            min_col_data = positions.get("relative_change", None) + 1 #15
-            rank_col = positions.get("rank", None) + 1 #17
-            method_col = positions.get("method", None) + 1 #5
-            method_unit_col = positions.get("method unit_ei", None) + 1 #6
-
-            # Create a bar chart
-            chart = BarChart()
-            chart.type="bar"
-            chart.style=2
-            chart.overlap= 100
-
-            # Set the data for the chart
-            data = Reference(ws, min_col=min_col_data, min_row=2, max_row=ws.max_row)
-            categories = Reference(ws, min_col=rank_col, min_row=2, max_row=ws.max_row)
-            chart.add_data(data, titles_from_data=False)
-            chart.set_categories(categories)
-
-            # Modify each series in the chart to disable the inversion of negative values 
-            for series in chart.series:
-                series.invertIfNegative = False
-
-            # Y-axis (categories) settings
-            chart.y_axis.majorGridlines = ChartLines()
-            chart.y_axis.delete = False
-            chart.y_axis.tickLblPos = "low"
-
-            # X-axis (values) settings
-            chart.x_axis.tickLblPos = "high" 
-            chart.x_axis.majorGridlines = None 
-            chart.x_axis.tickMarkSkip = 1  # Show all tick marks
-            chart.x_axis.tickLblSkip = 1  # Show all labels
-
-            chart.x_axis.scaling.orientation = "minMax"
-            chart.x_axis.crosses = "autoZero"
-            chart.x_axis.axPos = "b"
-            chart.x_axis.delete = False
-
-
-            # Chart titles
-            method_value = ws.cell(row=2, column=method_col).value
-            method_unit_value = ws.cell(row=2, column=method_unit_col).value
-            chart.title = f"{sector} - Database relatvie comparison for method: {method_value}"
-
-
-            chart.x_axis.title = "Activity"
-            chart.y_axis.title = "Relative Change (%)"
-
-            # Avoid overlap
-            chart.title.overlay = False
-            chart.x_axis.title.overlay = False
-            chart.y_axis.title.overlay = False 
-            chart.legend.overlay = False
-
-            # Adjust chart dimensions
-            chart.width = 30  # Increased width for better readability
-            chart.height = 15
-
-            # Adjust chart dimensions
-            chart.width = 20
-            chart.height = 14
-            # Calculate the position for this chart
-            position = ws_charts.cell(row=current_row, column=current_col).coordinate
-            ws_charts.add_chart(chart, position)
+            chart = _barchart_compare_db(
+                report, worksheet_name, index_positions[matching_key], sector
+            )
+
+            # Place the chart in the chart sheet
+            report.add_chart(chart_sheet_name, chart, current_row, current_col)
 
             # Update position for the next chart
             current_col += chart_width +1 
@@ -446,10 +803,78 @@ def _barchart_compare_db_xcl(filename, index_positions, current_row_stacked_bar)
                 current_col = 1  # Reset to the first column
 
         # Move the chart sheet to the first position
-        wb._sheets.remove(ws_charts)
-        wb._sheets.insert(0, ws_charts)
+        report.move_to_front(chart_sheet_name)
 
-    # Save the workbook
-    wb.save(filename)
+def _barchart_compare_db(report, worksheet_name, positions, sector):
+    """
+    Creates the bar chart of the relative changes of one comparison sheet.
 
-    print(f"Results and chart saved to {filename}")
+    Args:
+        report (ExcelReport): The report holding the comparison sheet.
+        worksheet_name (str): Name of the comparison sheet.
+        positions (dict): Column index positions of the comparison sheet.
+        sector (str): Name of the sector.
+
+    Returns:
+        BarChart: The chart.
+    """
+    ws = report.worksheet(worksheet_name)
+    max_row, _ = report.dimensions(worksheet_name)
+
+    # Find min_row, max_row and max_column
+    min_col_data = positions.get("relative_change", None) + 1 #15
+    rank_col = positions.get("rank", None) + 1 #17
+    method_col = positions.get("method", None) + 1 #5
+
+    # Create a bar chart
+    chart = BarChart()
+    chart.type="bar"
+    chart.style=2
+    chart.overlap= 100
+
+    # Set the data for the chart
+    data = Reference(ws, min_col=min_col_data, min_row=2, max_row=max_row)
+    categories = Reference(ws, min_col=rank_col, min_row=2, max_row=max_row)
+    chart.add_data(data, titles_from_data=False)
+    chart.set_categories(categories)
+
+    # Modify each series in the chart to disable the inversion of negative values 
+    for series in chart.series:
+        series.invertIfNegative = False
+
+    # Y-axis (categories) settings
+    chart.y_axis.majorGridlines = ChartLines()
+    chart.y_axis.delete = False
+    chart.y_axis.tickLblPos = "low"
+
+    # X-axis (values) settings
+    chart.x_axis.tickLblPos = "high" 
+    chart.x_axis.majorGridlines = None 
+    chart.x_axis.tickMarkSkip = 1  # Show all tick marks
+    chart.x_axis.tickLblSkip = 1  # Show all labels
+
+    chart.x_axis.scaling.orientation = "minMax"
+    chart.x_axis.crosses = "autoZero"
+    chart.x_axis.axPos = "b"
+    chart.x_axis.delete = False
+
+
+    # Chart titles
+    method_value = report.cell_value(worksheet_name, row=2, column=method_col)
+    chart.title = f"{sector} - Database relatvie comparison for method: {method_value}"
+
+
+    chart.x_axis.title = "Activity"
+    chart.y_axis.title = "Relative Change (%)"
+
+    # Avoid overlap
+    chart.title.overlay = False
+    chart.x_axis.title.overlay = False
+    chart.y_axis.title.overlay = False 
+    chart.legend.overlay = False
+
+    # Adjust chart dimensions
+    chart.width = 20
+    chart.height = 14
+
+    return chart
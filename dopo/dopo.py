@@ -1,13 +1,22 @@
 """
 
 """
+import time
 from collections import defaultdict
 import bw2data as bd
+import numpy as np
+import pandas as pd
 from pathlib import Path
 
 from .activity_filter import generate_sets_from_filters, _get_mapping
 from .methods import MethodFinder
-from .lca import sector_lca_scores
+from .batched_lca import BatchedLCA, engine_cache, method_state
+from .lca import sector_lca_scores, lca_totals, refine_lca_scores, RESULT_ORDER
+from .excel_report import export_results_to_excel
+from .outliers import (
+    outlier_statistics, flagged_activities, multivariate_outliers, rank_correlations, ROBUST_Z_THRESHOLD,
+)
+from .structural import structural_outliers
 
 MAPPING_DIR = Path(__file__).resolve().parent / "mapping"
 
@@ -25,8 +34,21 @@ class Dopo:
         self.databases = None
         self.activities = {}
         self.results = None
+        self.outliers = None
+        self.multivariate_outliers = None
+        self.correlations = None
+        self.structural_outliers = None
+        self.completeness = None
         self.sectors = None
 
+        # (database, sector, method) -> (activity keys, modification times of the database and
+        # its dependencies, scores)
+        self._units = {}
+        # (sector, method) -> view whose contributions are being refined, see `analyze(deadline=...)`
+        self._pending = {}
+        self._settings = None  # (cutoff, breakdown) of the units
+        self._method_states = {}  # method -> state of its characterization factors in the units
+
     def __str__(self):
         return f"Dopo: {self._dopo}"
 
@@ -98,11 +120,371 @@ class Dopo:
             for sector, activities in self.activities.items():
                 self.activities[sector] = [act for act in activities if "market" not in act["name"].lower()]
 
-    def analyze(self, cutoff=0.01):
-        if self.activities:
-            self.results = sector_lca_scores(
-                self.activities,
-                self.methods.methods,
+    def analyze(self, cutoff=0.01, progress=None, engine=None, on_view=None, breakdown="inputs",
+                deadline=None, excel_file=None):
+        """
+        Computes the LCA scores of the activities of each sector, for each method.
+
+        Results are kept per (database, sector, method) unit. Only the units not computed by an
+        earlier call are calculated, such as a new method, sector or database, or a unit whose
+        activities, database, databases it depends on, or method changed since. `results` then holds the scores of the current
+        activities and methods.
+
+        With a `deadline`, the total scores of all activities are computed first, with batched
+        solves. Their input contributions are then computed activity by activity, starting with
+        the activities with the largest share of the scores of their (sector, method), until
+        the deadline. Activities not refined in time have a single "Not refined" input holding
+        their total score, and `completeness` tells how much of each (sector, method) is
+        refined. A later call with a deadline continues the refinement where it stopped.
+
+        :param cutoff: A threshold value for summarizing inputs below or equal to this value in an "other" column.
+        :type cutoff: float, optional
+        :param progress: Called as ``progress(done, total, message)`` before the first and after each
+            calculated unit group. It may raise `AnalysisCancelled` to stop the analysis.
+        :type progress: callable, optional
+        :param engine: An engine whose matrices include all activities.
+        :type engine: BatchedLCA, optional
+        :param on_view: Called as ``on_view(sector, method, scores)`` as soon as the scores of a
+            sector for a method are complete, with the rows of that method in `results[sector]`.
+            Views that are already known are reported first.
+        :type on_view: callable, optional
+        :param breakdown: "inputs" to break scores down into the CPC classes of their inputs,
+            "flows" to break them down into their largest elementary flows.
+        :type breakdown: str, optional
+        :param deadline: Seconds after which input contributions are no longer computed. Only
+            used with the "inputs" breakdown, elementary flows being computed with batched
+            solves anyway.
+        :type deadline: float, optional
+        :param excel_file: Excel file the results are written to, or None to skip the export.
+            See also `to_excel`.
+        :type excel_file: str, optional
+        """
+        if not self.activities:
+            return
+
+        started = time.monotonic()
+        if (cutoff, breakdown) != self._settings:
+            self._units.clear()
+            self._pending.clear()
+            self._settings = (cutoff, breakdown)
+        anytime = deadline is not None and breakdown == "inputs"
+
+        methods = self.methods.methods
+
+        # Units of methods whose characterization factors were written again are stale
+        for method in methods:
+            state = method_state(method)
+            if self._method_states.get(method, state) != state:
+                self._units = {key: unit for key, unit in self._units.items() if key[2] != method}
+                self._pending = {key: view for key, view in self._pending.items() if key[1] != method}
+            self._method_states[method] = state
+
+        # Activities of each (database, sector), and their state
+        groups = defaultdict(list)
+        for sector, activities in self.activities.items():
+            for act in activities:
+                groups[(act["database"], sector)].append(act)
+        modified = {database: _modified(database) for database, _ in groups}
+        states = {
+            (database, sector): (frozenset(act.key for act in activities), modified[database])
+            for (database, sector), activities in groups.items()
+        }
+
+        # Sectors to calculate, grouped by the methods they miss
+        missing = defaultdict(lambda: defaultdict(list))
+        for (database, sector), activities in groups.items():
+            missing_methods = tuple(
+                method for method in methods
+                if self._units.get((database, sector, method), (None, None))[:2] != states[(database, sector)]
+            )
+            if missing_methods:
+                missing[missing_methods][sector].extend(activities)
+
+        def _view(sector, method):
+            """Scores of `sector` for `method`, or None if a unit is missing."""
+            units, pending = [], None
+            for (database, s), state in states.items():
+                if s != sector:
+                    continue
+                unit = self._units.get((database, sector, method))
+                if unit is not None and unit[:2] == state:
+                    if len(unit[2]):
+                        units.append(unit[2])
+                elif self._pending_state(sector, method, database) == state:
+                    pending = self._pending[(sector, method)]
+                else:
+                    return None
+            if pending is not None:
+                units.append(pending.scores())
+            if not units:
+                return pd.DataFrame(columns=RESULT_ORDER + ["score"])
+            return pd.concat(units).sort_values(RESULT_ORDER, kind="stable").reset_index(drop=True)
+
+        def _unit_done(sector, method, scores, sectors):
+            self._pending.pop((sector, method), None)
+            databases = {act["database"] for act in sectors[sector]}
+            self._store_unit(sector, method, scores, {
+                (database, s): state for (database, s), state in states.items()
+                if s == sector and database in databases
+            })
+            if on_view is not None:
+                view = _view(sector, method)
+                if view is not None:
+                    on_view(sector, method, view)
+
+        if on_view is not None:
+            for sector in self.activities:
+                for method in methods:
+                    view = _view(sector, method)
+                    if view is not None:
+                        on_view(sector, method, view)
+
+        if missing and engine is None:
+            engine = BatchedLCA(
+                [act for sectors in missing.values() for acts in sectors.values() for act in acts],
+                methods,
+            )
+
+        if anytime:
+            self._refine(missing, states, cutoff, engine, started + deadline, progress, on_view, _view)
+            missing = {}
+
+        total = sum(len(sectors) * len(m) for m, sectors in missing.items())
+        offset = 0
+        if progress is not None and not anytime:
+            progress(0, total, "Starting analysis")
+
+        for missing_methods, sectors in missing.items():
+            def _group_progress(done, _, message, offset=offset):
+                if progress is not None:
+                    progress(offset + done, total, message)
+
+            sector_lca_scores(
+                sectors,
+                list(missing_methods),
                 cutoff=cutoff,
+                progress=_group_progress,
+                engine=engine,
+                excel_file=None,
+                on_unit=lambda *unit, sectors=sectors: _unit_done(*unit, sectors),
+                breakdown=breakdown,
             )
+            offset += len(sectors) * len(missing_methods)
+
+        self.results, completeness = {}, []
+        for sector in self.activities:
+            for method in methods:
+                pending = self._pending.get((sector, method))
+                refining = pending is not None and all(
+                    states.get(key) == state for key, state in pending.states.items()
+                )
+                completeness.append(
+                    (sector, "-".join(method), pending.refined_share if refining else 1.0)
+                )
+            views = [view for view in (_view(sector, method) for method in methods) if len(view)]
+            if views:
+                self.results[sector] = (
+                    pd.concat(views)
+                    .sort_values(RESULT_ORDER, kind="stable")
+                    .reset_index(drop=True)
+                )
+        self.completeness = pd.DataFrame(completeness, columns=["sector", "method", "refined share"])
+
+        # Outlier statistics of every (database, sector, method) group, and of every sector
+        # over all methods together
+        self.outliers = outlier_statistics(self.results)
+        self.multivariate_outliers = multivariate_outliers(self.results)
+        self.correlations = rank_correlations(self.results)
+
+        if excel_file is not None:
+            self.to_excel(excel_file)
+
+    def _refine(self, missing, states, cutoff, engine, stop_at, progress, on_view, view):
+        """
+        Computes the total scores of the `missing` units, then refines the input contributions
+        of their activities by decreasing share of the scores, until `stop_at`. See `analyze`.
+        """
+        # Totals of the views not being refined yet
+        requested, created = [], []
+        for missing_methods, sectors in missing.items():
+            for sector, activities in sectors.items():
+                databases = {act["database"] for act in activities}
+                sector_states = {
+                    (database, s): state for (database, s), state in states.items()
+                    if s == sector and database in databases
+                }
+                requested.extend((sector, method) for method in missing_methods)
+                new_methods = [
+                    method for method in missing_methods
+                    if self._pending.get((sector, method)) is None
+                    or self._pending[(sector, method)].states != sector_states
+                ]
+                if not new_methods:
+                    continue
+                for method, totals in lca_totals(activities, new_methods, engine).items():
+                    self._pending[(sector, method)] = _PendingView(activities, sector_states, totals)
+                    created.append((sector, method))
+
+        if on_view is not None:
+            for sector, method in created:
+                scores = view(sector, method)
+                if scores is not None:
+                    on_view(sector, method, scores)
+
+        # Activities to refine, by decreasing share of the scores of their view
+        queue = sorted(
+            (
+                (-share, sector, method, position)
+                for sector, method in requested
+                for position, share in self._pending[(sector, method)].todo()
+            ),
+            key=lambda item: item[0],
+        )
+        total, done = len(queue), 0
+        if progress is not None:
+            progress(done, total, "Refining contributions")
+
+        for _, sector, method, position in queue:
+            if time.monotonic() >= stop_at:
+                break
+            pending = self._pending[(sector, method)]
+            pending.refine(position, refine_lca_scores(
+                [pending.activities[position]], method, cutoff=cutoff, engine=engine,
+            ))
+
+            if pending.complete:
+                del self._pending[(sector, method)]
+                self._store_unit(sector, method, pending.scores(), pending.states)
+                if on_view is not None:
+                    scores = view(sector, method)
+                    if scores is not None:
+                        on_view(sector, method, scores)
+
+            done += 1
+            if progress is not None:
+                progress(done, total, f"{sector}: {'-'.join(method)}")
+
+    def _pending_state(self, sector, method, database):
+        """State of `database` in the view of `sector` and `method` being refined, if any."""
+        pending = self._pending.get((sector, method))
+        if pending is None:
+            return None
+        return pending.states.get((database, sector))
+
+    def _store_unit(self, sector, method, scores, states):
+        """
+        Splits the scores of a sector for a method into (database, sector, method) units, one
+        for each (database, sector) of `states`.
+        """
+        for (database, _), state in states.items():
+            unit = scores.loc[scores["database"] == database]
+            self._units[(database, sector, method)] = state + (unit,)
+
+    def flagged_activities(self, flag="outlier", **groups):
+        """
+        Returns the activities flagged as outliers by the last analysis, see `dopo.outliers`.
+
+        :param flag: "outlier" (any rule), "z outlier", "robust outlier" or "iqr outlier".
+        :type flag: str, optional
+        :param groups: Restricts the activities to a "database", "sector" or "method".
+        :return: One row per flagged activity, with its score and outlier statistics.
+        :rtype: pd.DataFrame
+        """
+        if self.outliers is None:
+            print("No results found.")
+            return None
+        return flagged_activities(self.outliers, flag, **groups)
+
+    def find_structural_outliers(self, threshold=ROBUST_Z_THRESHOLD, engine=None):
+        """
+        Compares the exchanges of the activities of each sector, per unit of product, and flags
+        those far off the other activities of the sector, see `dopo.structural`.
+
+        :param threshold: Absolute robust z-score of the log amount above which an exchange is flagged.
+        :type threshold: float, optional
+        :param engine: An engine whose matrices include all activities. Taken from the engine
+            cache if not given, so that the matrices of an analysis are reused.
+        :type engine: BatchedLCA, optional
+        :return: One row per sector, activity and input, also kept in `structural_outliers`.
+        :rtype: pd.DataFrame
+        """
+        activities = [act for acts in self.activities.values() for act in acts]
+        if not activities:
+            print("No activities found.")
+            return None
+
+        if engine is None:
+            engine = engine_cache.get(activities, self.methods.methods)
+        self.structural_outliers = structural_outliers(engine, self.activities, threshold)
+        return self.structural_outliers
+
+    def to_excel(self, filename="lca_scores.xlsx"):
+        """
+        Streams the results to an Excel file, one sheet per sector. Sectors with more rows than
+        an Excel sheet holds are split over several sheets.
+
+        :param filename: Path of the Excel file to write.
+        :type filename: str, optional
+        :return: Rows written, seconds spent and rows per second.
+        :rtype: dict
+        """
+        if not self.results:
+            print("No results found.")
+            return None
+        return export_results_to_excel(self.results, filename)
+
+
+class _PendingView:
+    """
+    Scores of a (sector, method) view whose input contributions are computed activity by
+    activity. Activities not refined yet have one row holding their total score.
+    """
+
+    def __init__(self, activities, states, totals):
+        self.activities = list(activities)
+        self.states = states
+        self._totals = totals
+        self._refined = {}  # position -> contributions
+        magnitude = np.abs(totals["score"].to_numpy(dtype=float))
+        self._shares = magnitude / magnitude.sum() if magnitude.sum() > 0 else np.zeros(len(magnitude))
+
+    @property
+    def complete(self) -> bool:
+        return len(self._refined) == len(self.activities)
+
+    @property
+    def refined_share(self) -> float:
+        """Share of the absolute scores of the view broken down into input contributions."""
+        if not self.activities:
+            return 1.0
+        if self._shares.sum() == 0:
+            return len(self._refined) / len(self.activities)
+        return float(sum(self._shares[position] for position in self._refined))
+
+    def todo(self):
+        """(position, share) of the activities not refined yet."""
+        return [(p, self._shares[p]) for p in range(len(self.activities)) if p not in self._refined]
+
+    def refine(self, position, contributions):
+        self._refined[position] = contributions
+
+    def scores(self) -> pd.DataFrame:
+        unrefined = self._totals.iloc[[p for p, _ in self.todo()]]
+        scores = pd.concat([unrefined, *self._refined.values()], ignore_index=True)
+        # Activities with the same labels are one row per input, as in `sector_lca_scores`
+        scores = scores.groupby(RESULT_ORDER, as_index=False, sort=False)["score"].sum()
+        return (
+            scores.loc[scores["score"] != 0]
+            .sort_values(RESULT_ORDER, kind="stable")
+            .reset_index(drop=True)
+        )
+
+
+def _modified(database):
+    """
+    Modification times of `database` and of the databases it depends on, to detect changes
+    since a unit was computed.
+    """
+    names = bd.Database(database).find_graph_dependents() if database in bd.databases else {database}
+    return frozenset((name, bd.databases.get(name, {}).get("modified")) for name in names)
 
@@ -0,0 +1,314 @@
+"""
+Single-pass Excel report writer.
+
+Data sheets and charts are collected in memory and the workbook is written once, instead of
+writing the tables with `pd.ExcelWriter` and re-opening the file with `load_workbook` for every
+chart pass. New workbooks are written with OpenPyXL's streaming (write-only) mode: rows are
+converted in chunks straight from the DataFrames, so no worksheet cell objects are kept in memory.
+Tables longer than Excel's row limit are split over several sheets.
+"""
+
+import logging
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.chart.reference import DummyWorksheet
+from openpyxl.utils import get_column_letter
+
+logger = logging.getLogger(__name__)
+
+# Excel limits sheet names to 31 characters
+MAX_SHEET_NAME_LENGTH = 31
+
+# Excel limits worksheets to 1,048,576 rows, header row included
+MAX_ROWS = 1_048_576
+
+# Number of DataFrame rows converted and written at once
+CHUNK_SIZE = 10_000
+
+
+class ExcelReport:
+    """
+    Collects data sheets and chart specifications in memory and writes the workbook once.
+
+    Sheets are kept in the order they will have in the workbook. Charts reference the data
+    sheets by name, so they can be added before the workbook exists.
+
+    Attributes
+    ----------
+    filename : str
+        Path of the Excel file to write.
+    append : bool
+        If True and `filename` exists, the new sheets and charts are added to the existing
+        workbook, which is loaded and saved once. Data sheets that already exist are replaced.
+    max_rows : int
+        Maximum number of rows of a sheet, header row included. Longer tables are split over
+        several sheets.
+    chunk_size : int
+        Number of DataFrame rows converted and written at once.
+    stats : dict
+        Rows written, seconds spent and rows per second of the last `save`.
+
+    Methods
+    -------
+    add_sheet(name, df)
+        Adds a data sheet written from a DataFrame.
+    chart_sheet(name)
+        Returns the name of a sheet holding charts, creating it if needed.
+    add_chart(sheet_name, chart, row, column)
+        Places a chart in a sheet.
+    save()
+        Writes the workbook and returns its write statistics.
+    """
+
+    def __init__(self, filename, append: bool = False, max_rows: int = MAX_ROWS,
+                 chunk_size: int = CHUNK_SIZE):
+        self.filename = filename
+        self.append = append and Path(filename).exists()
+        self.max_rows = max_rows
+        self.chunk_size = chunk_size
+        self.stats = {}
+
+        self._order = []  # sheet names, in workbook order
+        self._data = {}  # sheet name -> (DataFrame, first row, end row), for new data sheets
+        self._existing = {}  # sheet name -> (max_row, max_column, second row values)
+        self._charts = {}  # sheet name -> list of (chart, anchor)
+
+        if self.append:
+            self._read_existing_sheets()
+
+    def _read_existing_sheets(self):
+        """
+        Reads the names, dimensions and first data row of the sheets of the existing workbook.
+        """
+        workbook = load_workbook(filename=self.filename, read_only=True)
+        for ws in workbook.worksheets:
+            second_row = next(ws.iter_rows(min_row=2, max_row=2, values_only=True), ())
+            self._existing[ws.title] = (ws.max_row or 1, ws.max_column or 1, second_row)
+            self._order.append(ws.title)
+        workbook.close()
+
+    @property
+    def sheetnames(self) -> list:
+        """
+        Names of all sheets, in workbook order.
+        """
+        return list(self._order)
+
+    def add_sheet(self, name: str, df: pd.DataFrame) -> str:
+        """
+        Adds a data sheet holding `df`, written with a header row and without index.
+
+        If `df` does not fit in one sheet, it is split over several sheets named `name`,
+        `name (2)`, `name (3)`, ... each repeating the header row.
+
+        :param name: Name of the sheet. Truncated to 31 characters.
+        :type name: str
+        :param df: The data to write.
+        :type df: pd.DataFrame
+        :return: The name of the (first) sheet.
+        :rtype: str
+        """
+        rows_per_sheet = self.max_rows - 1
+        parts = max(math.ceil(len(df) / rows_per_sheet), 1)
+
+        names = []
+        for part in range(parts):
+            suffix = f" ({part + 1})" if part else ""
+            sheet_name = name[:MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+            if sheet_name not in self._order:
+                self._order.append(sheet_name)
+            start = part * rows_per_sheet
+            self._data[sheet_name] = (df, start, min(start + rows_per_sheet, len(df)))
+            names.append(sheet_name)
+
+        return names[0]
+
+    def chart_sheet(self, name: str) -> str:
+        """
+        Returns the name of the sheet `name`, creating an empty sheet for charts if needed.
+        """
+        name = name[:MAX_SHEET_NAME_LENGTH]
+        if name not in self._order:
+            self._order.append(name)
+        return name
+
+    def move_to_front(self, name: str):
+        """
+        Moves the sheet `name` to the first position of the workbook.
+        """
+        self._order.remove(name)
+        self._order.insert(0, name)
+
+    def worksheet(self, name: str) -> DummyWorksheet:
+        """
+        Returns a placeholder for the sheet `name`, to build chart `Reference` objects with.
+        """
+        return DummyWorksheet(name)
+
+    def dimensions(self, name: str) -> tuple:
+        """
+        Returns the ``(max_row, max_column)`` the sheet `name` has once written.
+        """
+        if name in self._data:
+            df, start, stop = self._data[name]
+            return stop - start + 1, max(len(df.columns), 1)
+        if name in self._existing:
+            return self._existing[name][:2]
+        return 1, 1
+
+    def cell_value(self, name: str, row: int, column: int):
+        """
+        Returns the value of a cell of the sheet `name`, with 1-based indices as in Excel.
+        Only the header row and the first data row are available.
+        """
+        if name in self._data:
+            df, start, _ = self._data[name]
+            if row == 1:
+                return df.columns[column - 1]
+            return _cell_value(df.iat[start + row - 2, column - 1])
+        if name in self._existing and row == 2:
+            values = self._existing[name][2]
+            return values[column - 1] if column <= len(values) else None
+        return None
+
+    def add_chart(self, sheet_name: str, chart, row: int, column: int):
+        """
+        Places `chart` in the sheet `sheet_name`, with its top-left corner at (`row`, `column`).
+        """
+        anchor = f"{get_column_letter(column)}{row}"
+        self._charts.setdefault(sheet_name, []).append((chart, anchor))
+
+    def save(self) -> dict:
+        """
+        Writes the workbook and logs the write throughput.
+
+        :return: The write statistics, also kept in `stats`.
+        :rtype: dict
+        """
+        start = time.perf_counter()
+
+        if self.append:
+            rows = self._save_appended()
+        else:
+            rows = self._save_new()
+
+        seconds = time.perf_counter() - start
+        self.stats = {
+            "rows": rows,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds > 0 else float("nan"),
+        }
+        logger.info(
+            "Wrote %d rows to %s in %.2f s (%.0f rows/s)",
+            rows, self.filename, seconds, self.stats["rows_per_second"],
+        )
+        return self.stats
+
+    def _save_new(self) -> int:
+        workbook = Workbook(write_only=True)
+        rows = 0
+
+        for name in self._order:
+            ws = workbook.create_sheet(name)
+            for chart, anchor in self._charts.get(name, []):
+                ws.add_chart(chart, anchor)
+            if name in self._data:
+                rows += _write_dataframe(ws, *self._data[name], chunk_size=self.chunk_size)
+
+        workbook.save(self.filename)
+        return rows
+
+    def _save_appended(self) -> int:
+        workbook = load_workbook(self.filename)
+        rows = 0
+
+        for name in self._order:
+            if name in self._data and name in workbook.sheetnames:
+                # A data sheet written again replaces the existing one, so that its rows, and the
+                # charts built from `dimensions`, only hold the new data
+                workbook.remove(workbook[name])
+            if name in workbook.sheetnames:
+                ws = workbook[name]
+            else:
+                ws = workbook.create_sheet(name)
+            if name in self._data:
+                rows += _write_dataframe(ws, *self._data[name], chunk_size=self.chunk_size)
+            for chart, anchor in self._charts.get(name, []):
+                ws.add_chart(chart, anchor)
+
+        # Apply the sheet order
+        for position, name in enumerate(self._order):
+            workbook.move_sheet(name, offset=position - workbook.sheetnames.index(name))
+
+        workbook.save(self.filename)
+        return rows
+
+
+def export_results_to_excel(results: dict, filename, max_rows: int = MAX_ROWS,
+                            chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Streams a result store, such as `Dopo.results`, to an Excel file with one sheet per sector.
+
+    Rows are written in chunks with OpenPyXL's write-only mode, so memory use does not grow with
+    the number of rows. Sectors with more rows than an Excel sheet holds are split over several
+    sheets.
+
+    :param results: A dictionary where each key is a sector name and each value is a DataFrame.
+    :type results: dict
+    :param filename: Path of the Excel file to write.
+    :type filename: str
+    :param max_rows: Maximum number of rows of a sheet, header row included.
+    :type max_rows: int, optional
+    :param chunk_size: Number of rows converted and written at once.
+    :type chunk_size: int, optional
+    :return: Rows written, seconds spent and rows per second.
+    :rtype: dict
+    """
+    report = ExcelReport(filename, max_rows=max_rows, chunk_size=chunk_size)
+    for sector, df in results.items():
+        report.add_sheet(str(sector), df)
+    return report.save()
+
+
+def _cell_value(value):
+    """
+    Converts a DataFrame value to a value OpenPyXL can write, as `pd.DataFrame.to_excel` does.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    if isinstance(value, (int, float)):
+        return None if np.isnan(value) else value
+    if isinstance(value, str):
+        return value
+    if value is pd.NaT or value is pd.NA:
+        return None
+    return str(value)
+
+
+def _write_dataframe(ws, df: pd.DataFrame, start: int = 0, stop: int = None,
+                     chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Writes the rows `start` to `stop` of `df` to the worksheet `ws`, with a header row and without
+    index. Rows are converted one chunk at a time.
+
+    :return: The number of data rows written.
+    :rtype: int
+    """
+    stop = len(df) if stop is None else stop
+    ws.append([_cell_value(label) for label in df.columns])
+
+    for chunk_start in range(start, stop, chunk_size):
+        chunk = df.iloc[chunk_start:min(chunk_start + chunk_size, stop)]
+        for row in chunk.itertuples(index=False, name=None):
+            ws.append([_cell_value(value) for value in row])
+
+    return stop - start
@@ -5,19 +5,37 @@ The module computes LCA scores for activities and methods.
 """
 
 from bw2analyzer.comparisons import group_leaves, commonprefix, get_value_for_cpc
+import heapq
+import itertools
 import operator
+import time
 import tabulate
 import bw2data as bd
-from bw2calc import __version__ as bc_version
-import bw2calc as bc
+import numpy as np
 import pandas as pd
+
+from .batched_lca import BatchedLCA, TOP_FLOWS
+from .excel_report import export_results_to_excel
+
 pd.options.mode.chained_assignment = None  # default='warn'
 
-if isinstance(bc_version, str):
-    bc_version = tuple(map(int, bc_version.split(".")))
+# Maximum number of supply chain nodes `find_leaves` expands per activity
+MAX_NODES = 1000
+
+# Input of the rows holding the total score of an activity whose contributions are not computed
+UNREFINED_INPUT = "Not refined"
+
+# Contributions `sector_lca_scores` can break scores down into: the CPC classes of the inputs
+# of the supply chain, or the elementary flows of the inventory
+BREAKDOWNS = ("inputs", "flows")
+
+
+class AnalysisCancelled(Exception):
+    """Raised by a progress callback to stop a running analysis."""
 
 
-def sector_lca_scores(sectors, methods, cutoff=0.01) -> dict:
+def sector_lca_scores(sectors, methods, cutoff=0.01, progress=None, engine=None,
+                      excel_file=None, on_unit=None, breakdown="inputs") -> dict:
     """
     Generates LCA score tables for each sector's activity list, including total scores and CPC 
     input contributions.
@@ -26,44 +44,86 @@ def sector_lca_scores(sectors, methods, cutoff=0.01) -> dict:
     in the `method_dict`. Inputs below or equal to the `cutoff` value are summarized in an "other" 
     column.
 
+    With ``breakdown="flows"``, scores are broken down into the elementary flows of the inventory
+    instead: the characterized inventories of all activities of a sector are computed at once
+    from the supply block of the engine, and the `TOP_FLOWS` largest flows of each activity are
+    kept, the rest being summarized in "Other".
+
     :param sectors: A dictionary where keys are sector names and values are lists of activities.
     :type sectors: dict
     :param methods: A list of methods to use for LCA calculations.
     :type methods: list
     :param cutoff: A threshold value for summarizing inputs below or equal to this value in an "other" column.
     :type cutoff: float, optional
+    :param progress: Called as ``progress(done, total, message)`` before the first and after each
+        (sector, method) calculation. It may raise `AnalysisCancelled` to stop the analysis.
+    :type progress: callable, optional
+    :param engine: An engine whose matrices include all activities. Its loaded matrices,
+        factorization and characterization matrices are shared by all sectors and methods.
+        Built for this call if not given.
+    :type engine: BatchedLCA, optional
+    :param excel_file: Excel file the results are streamed to. Not exported by default.
+    :type excel_file: str, optional
+    :param on_unit: Called as ``on_unit(sector, method, scores)`` as soon as the scores of a
+        sector for a method are computed, with the rows of that method in the sector's table.
+    :type on_unit: callable, optional
+    :param breakdown: "inputs" for contributions of CPC input classes, "flows" for
+        contributions of elementary flows. The "input" column holds the class or the flow.
+    :type breakdown: str, optional
     :return: A dictionary where each key is a sector name and each value is a DataFrame containing LCA scores.
     :rtype: dict
     """
+    if breakdown not in BREAKDOWNS:
+        raise ValueError(f"Invalid breakdown: {breakdown}. Valid breakdowns are: {BREAKDOWNS}")
+
+    results = {}
+    total, done = len(sectors) * len(methods), 0
+
+    all_activities = [act for activities in sectors.values() for act in activities]
+    if engine is None and all_activities and methods:
+        engine = BatchedLCA(all_activities, methods)
 
-    results, cache = {}, {}
+    if progress is not None:
+        progress(done, total, "Starting analysis")
 
     # Loop through each sector in scores_dict
     for sector, activities in sectors.items():
-        results[sector] = {}
-        
-        # Calculate LCA scores using the specified methods
-        scores = _compare_activities_multiple_methods(
-            activities=activities,
-            methods=methods,
-            cutoff=cutoff,
-            cache=cache
-        )
+        units = []
+
+        def _unit_done(method, scores, sector=sector, units=units):
+            nonlocal done
+            units.append(scores)
+            if on_unit is not None:
+                on_unit(sector, method, scores)
+
+            done += 1
+            if progress is not None:
+                progress(done, total, f"{sector}: {'-'.join(method)}")
+
+        if breakdown == "flows":
+            # Elementary flows of all activities of the sector at once
+            for method, scores in _flow_scores(engine, activities, methods, cutoff).items():
+                _unit_done(method, scores)
+        else:
+            # Calculate LCA scores using the specified methods
+            _compare_activities_multiple_methods(
+                activities=activities,
+                methods=methods,
+                cutoff=cutoff,
+                # turn the lca scores of the method into a long table
+                on_method_done=lambda method, result: _unit_done(method, _long_scores(result, cutoff)),
+                engine=engine,
+            )
 
-        # turn lca_scores into a long tables
-        scores = scores.melt(
-            id_vars=['activity', 'product', 'database', 'location', 'unit', 'method', 'method unit',],
-            var_name='input',
-            value_name='score'
+        # Save the LCA scores to the scores_dict
+        results[sector] = (
+            pd.concat(units).sort_values(RESULT_ORDER, kind="stable").reset_index(drop=True)
+            if units else pd.DataFrame(columns=RESULT_ORDER + ["score"])
         )
 
-        # Apply cutoff to summarize small inputs in an "other" column
-        scores = _agg_small_inputs(scores, cutoff)
-
-        scores.to_excel("lca_scores.xlsx")
-        
-        # Save the LCA scores to the scores_dict
-        results[sector] = scores
+    # Stream all sectors to one workbook, one sheet per sector
+    if excel_file is not None:
+        export_results_to_excel(results, excel_file)
 
     return results
 
@@ -74,7 +134,8 @@ def _compare_activities_multiple_methods(
     output_format: str ="pandas",
     mode: str ="absolute",
     cutoff: float = 0.01,
-    cache=None
+    on_method_done=None,
+    engine=None,
 ) -> pd.DataFrame:
     """
     Compares a list of activities using multiple LCA methods and stores the results in a dictionary 
@@ -93,6 +154,11 @@ def _compare_activities_multiple_methods(
     :type output_format: str, optional
     :param mode: The mode of the comparison.
     :type mode: str, optional
+    :param on_method_done: Called as ``on_method_done(method, result)`` once the scores of a
+        method are computed, with the DataFrame of that method.
+    :type on_method_done: callable, optional
+    :param engine: An engine to reuse the matrices and factorization of.
+    :type engine: BatchedLCA, optional
     :return: A pandas DataFrame containing LCA scores.
     :rtype: pd.DataFrame
     """
@@ -100,14 +166,14 @@ def _compare_activities_multiple_methods(
 
     for method in methods: # method_key is not called, but necessary
         # Perform the comparison using the Brightway2 analyzer
-        result, cache = compare_activities_by_grouped_leaves(
+        result, engine = compare_activities_by_grouped_leaves(
             activities,
             method,
             output_format=output_format,
             mode=mode,
             max_level=1,
             cutoff=cutoff,
-            cache=cache
+            engine=engine,
         )
 
         # Add method and method unit columns to the DataFrame
@@ -125,8 +191,30 @@ def _compare_activities_multiple_methods(
         # Store the result DataFrame in the dictionary
         dataframe = pd.concat([dataframe, result], axis=0)
 
+        if on_method_done is not None:
+            on_method_done(method, result)
+
     return dataframe
 
+# Row order of the tables returned by `sector_lca_scores`
+RESULT_ORDER = ['activity', 'product', 'location', 'database', 'method', 'method unit', 'input']
+
+
+def _long_scores(dataframe, cutoff=0.01):
+    """
+    Turns the scores of `_compare_activities_multiple_methods` into a long table with one row
+    per activity, method and input, summarizing small inputs in an "Other" input.
+    """
+    scores = dataframe.melt(
+        id_vars=['activity', 'product', 'database', 'location', 'unit', 'method', 'method unit',],
+        var_name='input',
+        value_name='score'
+    )
+
+    # Apply cutoff to summarize small inputs in an "other" column
+    return _agg_small_inputs(scores, cutoff)
+
+
 def _agg_small_inputs(dataframe, cutoff=0.01):
     """
     Aggregates small inputs in a DataFrame into an "other" input category.
@@ -170,6 +258,119 @@ def _agg_small_inputs(dataframe, cutoff=0.01):
 
     return aggregated_df
 
+def _flow_scores(engine, activities, methods, cutoff=0.01, top_k=TOP_FLOWS) -> dict:
+    """
+    Breaks the scores of `activities` down into their largest elementary flows, for each method.
+
+    Flows below `top_k` or below `cutoff` of the total score of their activity are summarized
+    in an "Other" input.
+
+    :return: A dictionary where each key is a method and each value is a long table with the
+        `RESULT_ORDER` columns and a "score" column.
+    :rtype: dict
+    """
+    activities = list(activities)
+    if not activities or engine is None:
+        return {method: pd.DataFrame(columns=RESULT_ORDER + ["score"]) for method in methods}
+
+    # Scores are given for the production amount of each activity, as for input contributions
+    flows, contributions, totals = engine.flow_contributions(
+        activities, methods, _production_amounts(activities), top_k
+    )
+    labels = engine.labels.biosphere(flows)
+
+    n, k = len(activities), flows.shape[2]
+    columns = _activity_columns(activities)
+
+    tables = {}
+    for i, method in enumerate(methods):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            small = contributions[i] / totals[i][:, None] < cutoff
+        inputs = np.where(small, "Other", labels[i])
+        other = totals[i] - contributions[i].sum(axis=1)
+        # Rounding errors when all flows are kept
+        other[np.abs(other) <= 1e-9 * np.abs(totals[i])] = 0.0
+
+        frame = pd.DataFrame({
+            **{column: np.repeat(values, k + 1) for column, values in columns.items()},
+            "input": np.column_stack([inputs, np.full(n, "Other", dtype=object)]).ravel(),
+            "score": np.column_stack([contributions[i], other]).ravel(),
+        })
+        frame.insert(4, "method", "-".join(method))
+        frame.insert(5, "method unit", bd.Method(method).metadata["unit"])
+
+        frame = frame.groupby(RESULT_ORDER, as_index=False, sort=False)["score"].sum()
+        tables[method] = (
+            frame.loc[frame["score"] != 0]
+            .sort_values(RESULT_ORDER, kind="stable")
+            .reset_index(drop=True)
+        )
+    return tables
+
+
+def lca_totals(activities, methods, engine) -> dict:
+    """
+    Computes the total score of each activity for each method, without breaking it down.
+
+    The scores of all activities come from batched solves of the engine, which is much faster
+    than finding their input contributions. `refine_lca_scores` computes the contributions later.
+
+    :param activities: A list of activities.
+    :type activities: list
+    :param methods: A list of methods.
+    :type methods: list
+    :param engine: An engine whose matrices include all activities.
+    :type engine: BatchedLCA
+    :return: A dictionary where each key is a method and each value is a table with the
+        `RESULT_ORDER` columns and a "score" column, with one `UNREFINED_INPUT` row per activity,
+        in the order of `activities`.
+    :rtype: dict
+    """
+    activities = list(activities)
+    scores = engine.scores(activities, methods, _production_amounts(activities))
+
+    tables = {}
+    for i, method in enumerate(methods):
+        frame = pd.DataFrame(_activity_columns(activities))
+        frame["method"] = "-".join(method)
+        frame["method unit"] = bd.Method(method).metadata["unit"]
+        frame["input"] = UNREFINED_INPUT
+        frame["score"] = scores[i]
+        tables[method] = frame
+    return tables
+
+
+def refine_lca_scores(activities, method, cutoff=0.01, engine=None) -> pd.DataFrame:
+    """
+    Computes the input contributions of `activities` for `method`, as `sector_lca_scores` does.
+
+    :return: A long table with the `RESULT_ORDER` columns and a "score" column.
+    :rtype: pd.DataFrame
+    """
+    result = _compare_activities_multiple_methods(
+        activities=activities,
+        methods=[method],
+        cutoff=cutoff,
+        engine=engine,
+    )
+    return _long_scores(result, cutoff)
+
+
+def _production_amounts(activities) -> list:
+    """Production amount of each activity, 1 if it has no production exchange."""
+    return [next((e["amount"] for e in act.production()), 1) for act in activities]
+
+
+def _activity_columns(activities) -> dict:
+    """Columns identifying `activities` in the result tables."""
+    return {
+        "activity": [act["name"] for act in activities],
+        "product": [act.get("reference product", "") for act in activities],
+        "location": [act.get("location", "")[:25] for act in activities],
+        "database": [act["database"] for act in activities],
+    }
+
+
 def compare_activities_by_grouped_leaves(
     activities,
     lcia_method,
@@ -178,7 +379,9 @@ def compare_activities_by_grouped_leaves(
     cutoff=7.5e-3,
     output_format="list",
     str_length=50,
-    cache=None
+    engine=None,
+    max_nodes=MAX_NODES,
+    time_budget=None,
 ):
     """Compare activities by the impact of their different inputs, aggregated by the product classification of those inputs.
 
@@ -190,6 +393,9 @@ def compare_activities_by_grouped_leaves(
         cutoff: float. Fraction of total impact to cutoff supply chain graph traversal at.
         output_format: str. See below.
         str_length; int. If ``output_format`` is ``html``, this controls how many characters each column label can have.
+        engine: ``BatchedLCA``. If given, its matrices, factorization and unit scores are reused instead of building a new engine.
+        max_nodes: int. Maximum number of supply chain nodes expanded per activity, see ``find_leaves``.
+        time_budget: float. Maximum seconds spent traversing the supply chain of each activity.
 
     Raises:
         ValueError: ``activities`` is malformed.
@@ -199,7 +405,7 @@ def compare_activities_by_grouped_leaves(
 
         * ``list``: Tuple of ``(column labels, data)``
         * ``html``: HTML string that will print nicely in Jupyter notebooks.
-        * ``pandas``: a pandas ``DataFrame``.
+        * ``pandas``: Tuple of a pandas ``DataFrame`` and the ``BatchedLCA`` engine, which can be passed back as ``engine``.
 
     """
 
@@ -209,27 +415,25 @@ def compare_activities_by_grouped_leaves(
         for e in act.production():
             fus[act] = e["amount"]
 
-    lca = bc.LCA(fus, lcia_method)
-    lca.lci(factorize=True)
-    lca.lcia()
+    if engine is None:
+        engine = BatchedLCA(activities, [lcia_method])
 
-    objs = []
+    # Scores of one unit of every product, from one solve
+    unit_scores, direct_scores = engine.unit_scores(lcia_method)
 
-    activities_to_exclude_from_cache = [
-        (lcia_method, a["database"], a["code"])
-        for a in activities
-    ]
+    objs = []
 
     for act in activities:
-        leaves, cache = find_leaves(
-                activity=act,
-                lcia_method=lcia_method,
-                max_level=max_level,
-                cutoff=cutoff,
-                lca_obj=lca,
-                cache=cache,
-                activities_to_exclude_from_cache=activities_to_exclude_from_cache
-            )
+        leaves = find_leaves(
+            activity=act,
+            lcia_method=lcia_method,
+            engine=engine,
+            amount=fus.get(act, 1),
+            max_level=max_level,
+            cutoff=cutoff,
+            max_nodes=max_nodes,
+            time_budget=time_budget,
+        )
 
         grouped_leaves = group_leaves(leaves)
 
@@ -258,14 +462,8 @@ def compare_activities_by_grouped_leaves(
     data = []
     for act, lst in zip(activities, objs):
 
-        amount = 1
-        for e in act.production():
-            amount = e["amount"]
-
-        if bc_version >= (2, 0, 0):
-            lca.lcia({act.id: amount})
-        else:
-            lca.redo_lcia({act: amount})
+        amount = fus.get(act, 1)
+        column = engine.activity_index(act)
         data.append(
             [
                 act["name"],
@@ -273,16 +471,9 @@ def compare_activities_by_grouped_leaves(
                 act["database"],
                 act.get("location", "")[:25],
                 act.get("unit", ""),
-                lca.score,
-            ]
-            + [
-                (
-                    lca.characterization_matrix
-                    * lca.biosphere_matrix
-                    * lca.demand_array
-                    * amount
-                ).sum()
+                amount * unit_scores[column],
             ]
+            + [amount * direct_scores[column]]
             + [get_value_for_cpc(lst, key) for _, key in sorted_keys]
         )
 
@@ -296,7 +487,7 @@ def compare_activities_by_grouped_leaves(
     if output_format == "list":
         return labels, data
     elif output_format == "pandas":
-        return pd.DataFrame(data, columns=labels), cache
+        return pd.DataFrame(data, columns=labels), engine
     elif output_format == "html":
         return tabulate.tabulate(
             data,
@@ -308,79 +499,106 @@ def compare_activities_by_grouped_leaves(
 def find_leaves(
     activity,
     lcia_method,
-    results=None,
-    lca_obj=None,
+    engine=None,
     amount=1,
-    total_score=None,
-    level=0,
     max_level=3,
     cutoff=2.5e-2,
-    cache=None,
-    activities_to_exclude_from_cache=None
+    max_nodes=MAX_NODES,
+    time_budget=None,
 ):
     """Traverse the supply chain of an activity to find leaves - places where the impact of that
     component falls below a threshold value.
 
-    Returns a list of ``(impact of this activity, amount consumed, Activity instance)`` tuples."""
-    first_level = results is None
-
-    activity = bd.get_activity(activity)
-
-    k = (lcia_method, activity["database"], activity["code"])
-
-    if first_level:
-        level = 0
-        results = []
-
-        total_score = lca_obj.score
-        if k not in activities_to_exclude_from_cache:
-            cache[k] = lca_obj.score
-    else:
-        if k not in cache:
-            if bc_version >= (2, 0, 0):
-                lca_obj.lcia({activity.id: amount})
-            else:
-                lca_obj.redo_lcia({activity: amount})
-            if k not in activities_to_exclude_from_cache:
-                cache[k] = lca_obj.score
-            sub_score = lca_obj.score
-        else:
-            sub_score = cache[k]
-
-        # If this is a leaf, add the leaf and return
-        if abs(sub_score) <= abs(total_score * cutoff) or level >= max_level:
-
-            # Only add leaves with scores that matter
-            if abs(sub_score) > abs(total_score * 1e-4):
-                results.append((sub_score, amount, activity))
+    The supply chain is traversed best-first: the node with the largest absolute score is always
+    expanded next, so that a limited budget is spent on the paths that matter most. A node is a
+    leaf when its score is below ``cutoff`` of the total score, when it is ``max_level`` levels
+    deep, when it was already expanded through another path or upstream on its own path (a loop),
+    or once ``max_nodes`` nodes were expanded or ``time_budget`` seconds spent, so every node is
+    expanded at most once. The direct emissions of every expanded node below the root are reported
+    as well, so that leaves and direct emissions add up to the total score.
+
+    Node scores and inputs are read from the unit scores and the technosphere matrix columns of
+    ``engine``, which keeps them between calls; the traversal does no LCA calculation and no
+    database query per node.
+
+    Returns a list of ``(impact, amount consumed, Activity instance, path)`` tuples, sorted by
+    decreasing impact, where ``path`` is the tuple of activities from ``activity`` to the leaf."""
+    if engine is None:
+        engine = BatchedLCA([activity], [lcia_method])
+
+    started = time.monotonic()
+    unit_scores, direct_scores = engine.unit_scores(lcia_method)
+
+    root = engine.activity_index(activity)
+    total_score = amount * unit_scores[root]
+    counter = itertools.count()
+
+    # Nodes of the traversal tree as (column, index of the parent node); paths are only built
+    # for the results, by following the parents back to the root
+    nodes = []
+    # Columns already expanded, each at most once
+    expanded = set()
+
+    # (-|score|, tie breaker, column, amount, level, index of the parent node)
+    queue = [(-abs(total_score), next(counter), root, amount, 0, None)]
+    results = []
+
+    while queue:
+        _, _, column, node_amount, level, parent = heapq.heappop(queue)
+        node = len(nodes)
+        nodes.append((column, parent))
+
+        if level:
+            sub_score = node_amount * unit_scores[column]
+            exhausted = len(expanded) >= max_nodes or (
+                time_budget is not None and time.monotonic() - started > time_budget
+            )
 
-            return results, cache
+            # If this is a leaf, add the leaf. A column expanded before, through another path or
+            # upstream on this one (a loop), keeps its whole score here instead of being expanded
+            # again.
+            if (
+                abs(sub_score) <= abs(total_score * cutoff)
+                or level >= max_level
+                or exhausted
+                or column in expanded
+            ):
+                # Only add leaves with scores that matter
+                if abs(sub_score) > abs(total_score * 1e-4):
+                    results.append((sub_score, node_amount, node))
+                continue
 
-        else:
             # Add direct emissions from this demand
-            direct = (
-                    lca_obj.characterization_matrix
-                    * lca_obj.biosphere_matrix
-                    * lca_obj.demand_array
-            ).sum()
+            direct = node_amount * direct_scores[column]
             if abs(direct) >= abs(total_score * 1e-4):
-                results.append((direct, amount, activity))
-
-    for exc in activity.technosphere():
-        _, cache = find_leaves(
-            activity=exc.input,
-            lcia_method=lcia_method,
-            results=results,
-            lca_obj=lca_obj,
-            amount=amount * exc["amount"],
-            total_score=total_score,
-            level=level + 1,
-            max_level=max_level,
-            cutoff=cutoff,
-            cache=cache,
-            activities_to_exclude_from_cache=activities_to_exclude_from_cache
-        )
-
-    return sorted(results, reverse=True), cache
-
-
+                results.append((direct, node_amount, node))
+
+        expanded.add(column)
+        for child, child_amount in zip(*engine.inputs(column)):
+            child_amount = node_amount * child_amount
+            heapq.heappush(queue, (
+                -abs(child_amount * unit_scores[child]),
+                next(counter),
+                child,
+                child_amount,
+                level + 1,
+                node,
+            ))
+
+    def _path(node):
+        path = []
+        while node is not None:
+            column, node = nodes[node]
+            path.append(column)
+        return path[::-1]
+
+    paths = [(score, node_amount, _path(node)) for score, node_amount, node in results]
+    activities = engine.activities({column for *_, path in paths for column in path})
+    return sorted(
+        [
+            (score, node_amount, activities[path[-1]], tuple(activities[c] for c in path))
+            for score, node_amount, path in paths
+        ],
+        key=lambda leaf: leaf[0],
+        reverse=True,
+    )
@@ -0,0 +1,283 @@
+"""
+Outlier statistics of the activity scores of an analysis.
+
+Activities are compared within each (database, sector, method) group. For every activity, the
+module computes:
+
+- the z-score, from the mean and standard deviation of its group;
+- the robust z-score, 0.6745 * (score - median) / MAD, from the median and the median absolute
+  deviation of its group, which a few extreme activities do not distort;
+- the IQR fences of its group, Q1 - 1.5 IQR and Q3 + 1.5 IQR;
+
+and flags it when one of them is exceeded. All groups are processed at once with NumPy, from
+arrays sorted by group and score.
+
+An activity can also be unremarkable for each method on its own, and extreme for several methods
+together. For each sector, `multivariate_outliers` scores the (activity x method) matrix of
+total scores with robust Mahalanobis distances, and `rank_correlations` gives the Spearman
+correlations between methods.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+
+# Absolute z-score above which an activity is flagged
+Z_THRESHOLD = 3.0
+
+# Absolute robust z-score above which an activity is flagged (Iglewicz and Hoaglin)
+ROBUST_Z_THRESHOLD = 3.5
+
+# Multiple of the interquartile range between the quartiles and the fences
+IQR_FACTOR = 1.5
+
+# Columns of the groups activities are compared within
+GROUP_COLUMNS = ["database", "sector", "method"]
+
+# Columns identifying an activity in a group
+ACTIVITY_COLUMNS = ["method unit", "activity", "product", "location"]
+
+# Chi-squared quantile of the squared Mahalanobis distance above which an activity is flagged
+MAHALANOBIS_QUANTILE = 0.975
+
+# Share of the activities of a sector the robust covariance is estimated from
+SUPPORT_FRACTION = 0.75
+
+# Maximum number of concentration steps of the robust covariance estimate
+MAX_CONCENTRATION_STEPS = 20
+
+
+def outlier_statistics(results: dict) -> pd.DataFrame:
+    """
+    Computes the outlier statistics and flags of every activity of `results`.
+
+    :param results: A dictionary where each key is a sector name and each value is a DataFrame
+        of input contributions, as in `Dopo.results`.
+    :type results: dict
+    :return: One row per (database, sector, method) and activity, with its total "score",
+        "z", "robust z", "lower fence", "upper fence", and the flags "z outlier",
+        "robust outlier", "iqr outlier" and "outlier" (any of the three).
+    :rtype: pd.DataFrame
+    """
+    frames = [df.assign(sector=sector) for sector, df in (results or {}).items() if len(df)]
+    if not frames:
+        return pd.DataFrame(columns=GROUP_COLUMNS + ACTIVITY_COLUMNS + [
+            "score", "z", "robust z", "lower fence", "upper fence",
+            "z outlier", "robust outlier", "iqr outlier", "outlier",
+        ])
+
+    scores = (
+        pd.concat(frames, ignore_index=True)
+        .groupby(GROUP_COLUMNS + ACTIVITY_COLUMNS, sort=True, as_index=False)["score"]
+        .sum()
+    )
+
+    codes = scores.groupby(GROUP_COLUMNS, sort=True).ngroup().to_numpy()
+    x = scores["score"].to_numpy(dtype=float)
+    counts = np.bincount(codes)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(codes, weights=x) / counts
+        deviation = x - mean[codes]
+        std = np.sqrt(np.bincount(codes, weights=deviation ** 2) / (counts - 1))
+
+        ordered = x[np.lexsort((x, codes))]
+        q1 = _group_quantile(ordered, starts, counts, 0.25)
+        q3 = _group_quantile(ordered, starts, counts, 0.75)
+
+        z = deviation / std[codes]
+
+    # Groups without spread have no defined z-scores
+    z[~np.isfinite(z)] = np.nan
+    _, _, robust_z = robust_z_scores(x, codes)
+
+    lower = (q1 - IQR_FACTOR * (q3 - q1))[codes]
+    upper = (q3 + IQR_FACTOR * (q3 - q1))[codes]
+
+    scores["z"] = z
+    scores["robust z"] = robust_z
+    scores["lower fence"] = lower
+    scores["upper fence"] = upper
+    scores["z outlier"] = np.abs(z) > Z_THRESHOLD
+    scores["robust outlier"] = np.abs(robust_z) > ROBUST_Z_THRESHOLD
+    scores["iqr outlier"] = (x < lower) | (x > upper)
+    scores["outlier"] = scores["z outlier"] | scores["robust outlier"] | scores["iqr outlier"]
+    return scores
+
+
+def robust_z_scores(x: np.ndarray, codes: np.ndarray):
+    """
+    Robust z-scores of `x` within groups, 0.6745 * (x - median) / MAD.
+
+    :param x: Values.
+    :type x: np.ndarray
+    :param codes: Group of each value, from 0 to the number of groups - 1.
+    :type codes: np.ndarray
+    :return: The median and the MAD of the group of each value, and its robust z-score, which
+        is NaN in groups without spread.
+    :rtype: tuple
+    """
+    counts = np.bincount(codes)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        median = _group_quantile(x[np.lexsort((x, codes))], starts, counts, 0.5)[codes]
+        absolute = np.abs(x - median)
+        mad = _group_quantile(absolute[np.lexsort((absolute, codes))], starts, counts, 0.5)[codes]
+        robust_z = 0.6745 * (x - median) / mad
+
+    robust_z[~np.isfinite(robust_z)] = np.nan
+    return median, mad, robust_z
+
+
+def flagged_activities(outliers: pd.DataFrame, flag: str = "outlier", **groups) -> pd.DataFrame:
+    """
+    Returns the activities of `outliers` with `flag` set.
+
+    :param outliers: Statistics returned by `outlier_statistics`.
+    :type outliers: pd.DataFrame
+    :param flag: "outlier", "z outlier", "robust outlier" or "iqr outlier".
+    :type flag: str
+    :param groups: Restricts the activities to a "database", "sector" or "method", e.g.
+        ``method="IPCC 2021-climate change-GWP 100a"``.
+    :return: The flagged rows of `outliers`.
+    :rtype: pd.DataFrame
+    """
+    if flag not in ("outlier", "z outlier", "robust outlier", "iqr outlier"):
+        raise ValueError(f"Invalid flag: {flag}.")
+
+    mask = outliers[flag].astype(bool)
+    for column, value in groups.items():
+        if column not in GROUP_COLUMNS:
+            raise ValueError(f"Invalid group column: {column}. Valid columns are: {GROUP_COLUMNS}")
+        mask &= outliers[column] == value
+    return outliers.loc[mask].reset_index(drop=True)
+
+
+def score_matrix(scores: pd.DataFrame) -> pd.DataFrame:
+    """
+    Total score of each activity of a sector (rows) for each method (columns).
+
+    :param scores: Input contributions of one sector, as in `Dopo.results`.
+    :type scores: pd.DataFrame
+    :return: One row per (database, activity, product, location), one column per method.
+        Activities without score for a method score 0.
+    :rtype: pd.DataFrame
+    """
+    return (
+        scores.groupby(["database", "activity", "product", "location", "method"])["score"]
+        .sum()
+        .unstack("method", fill_value=0.0)
+    )
+
+
+def multivariate_outliers(results: dict, support_fraction: float = SUPPORT_FRACTION,
+                          quantile: float = MAHALANOBIS_QUANTILE) -> pd.DataFrame:
+    """
+    Scores the activities of each sector of `results` over all methods at once.
+
+    The scores of each method are standardized by their median and MAD. A robust center and
+    covariance of the standardized scores are estimated from the `support_fraction` of the
+    activities closest to each other (concentration steps of the minimum covariance determinant
+    estimator, starting from the activities closest to the medians), and scaled to be consistent
+    for normal data. The robust Mahalanobis distance of each activity to that center is
+    compared to the chi-squared `quantile` with one degree of freedom per method.
+
+    :param results: A dictionary where each key is a sector name and each value is a DataFrame
+        of input contributions, as in `Dopo.results`.
+    :type results: dict
+    :return: One row per sector and activity, with its "distance", the "threshold" it is
+        compared to, and its "outlier" flag. Sectors with a single method or fewer than three
+        activities are left out.
+    :rtype: pd.DataFrame
+    """
+    frames = []
+    for sector, scores in (results or {}).items():
+        if not len(scores):
+            continue
+        matrix = score_matrix(scores)
+        n, p = matrix.shape
+        if p < 2 or n < 3:
+            continue
+
+        distance = _robust_distances(matrix.to_numpy(dtype=float), support_fraction)
+        threshold = np.sqrt(chi2.ppf(quantile, p))
+
+        frame = matrix.index.to_frame(index=False)
+        frame.insert(0, "sector", sector)
+        frame["distance"] = distance
+        frame["threshold"] = threshold
+        frame["outlier"] = distance > threshold
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=[
+            "sector", "database", "activity", "product", "location", "distance", "threshold", "outlier",
+        ])
+    return pd.concat(frames, ignore_index=True)
+
+
+def rank_correlations(results: dict) -> dict:
+    """
+    Spearman rank correlations between the methods, over the activities of each sector.
+
+    :param results: A dictionary where each key is a sector name and each value is a DataFrame
+        of input contributions, as in `Dopo.results`.
+    :type results: dict
+    :return: A dictionary where each key is a sector name and each value is a (method x method)
+        DataFrame of correlations.
+    :rtype: dict
+    """
+    correlations = {}
+    for sector, scores in (results or {}).items():
+        if not len(scores):
+            continue
+        # Pearson correlations of the ranks
+        correlations[sector] = score_matrix(scores).rank(axis=0).corr()
+    return correlations
+
+
+def _robust_distances(x: np.ndarray, support_fraction: float) -> np.ndarray:
+    """
+    Robust Mahalanobis distances of the rows of `x`, see `multivariate_outliers`.
+    """
+    n, p = x.shape
+
+    # Standardize each method by its median and MAD, or its standard deviation without spread
+    median = np.median(x, axis=0)
+    scale = 1.4826 * np.median(np.abs(x - median), axis=0)
+    spread = x.std(axis=0)
+    scale = np.where(scale > 0, scale, np.where(spread > 0, spread, 1.0))
+    z = (x - median) / scale
+
+    # Concentration steps, from the activities closest to the medians
+    h = min(max(int(np.ceil(support_fraction * n)), p + 1), n)
+    support = np.argsort(np.einsum("ij,ij->i", z, z))[:h]
+    for _ in range(MAX_CONCENTRATION_STEPS):
+        center = z[support].mean(axis=0)
+        precision = np.linalg.pinv(np.cov(z[support], rowvar=False))
+        diff = z - center
+        squared = np.einsum("ij,jk,ik->i", diff, precision, diff)
+        new_support = np.argsort(squared)[:h]
+        if np.array_equal(np.sort(new_support), np.sort(support)):
+            break
+        support = new_support
+
+    # Consistency for normally distributed scores
+    median_squared = np.median(squared)
+    if median_squared > 0:
+        squared = squared * chi2.ppf(0.5, p) / median_squared
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def _group_quantile(ordered, starts, counts, q):
+    """
+    Quantile `q` of each group of `ordered`, sorted by group and value, with linear
+    interpolation as in `pandas.Series.quantile`.
+    """
+    position = q * (counts - 1)
+    low = np.floor(position).astype(int)
+    high = np.minimum(low + 1, counts - 1)
+    fraction = position - low
+    return ordered[starts + low] * (1 - fraction) + ordered[starts + high] * fraction
@@ -3,11 +3,15 @@ This module processes Excel files to create dot plots and stacked bar charts usi
 categorizes sheets by sector and generates charts for each sector, including scatter plots for LCA 
 scores and stacked bar charts for data contributions. Customizations include axis labels, titles, 
 and visual styles.
+
+Charts are added to an `ExcelReport`, so that the whole workbook is written in a single pass.
 """
 
 from openpyxl import load_workbook
 from openpyxl.chart import ScatterChart, BarChart, Reference, Series
 
+from .excel_report import ExcelReport
+
 def _categorize_sheets_by_sector(file_path):
     """
     Categorizes the sheets in an Excel workbook by sector.
@@ -30,12 +34,30 @@ def _categorize_sheets_by_sector(file_path):
     """
     # Load the workbook
     workbook = load_workbook(filename=file_path, read_only=True)
-    
+
+    return _categorize_sheet_names(workbook.sheetnames)
+
+def _categorize_sheet_names(sheet_names):
+    """
+    Categorizes sheet names by sector, the sector being the first part of the sheet name
+    separated by an underscore ('_'). Sheet names without an underscore are skipped.
+
+    Parameters
+    ----------
+    sheet_names : list
+        Sheet names, in workbook order.
+
+    Returns
+    -------
+    dict
+        A dictionary where the keys are sector names and the values are lists of 
+        sheet names corresponding to that sector.
+    """
     # Initialize a dictionary to hold sectors and their corresponding sheet names
     worksheet_dict = {}
     
     # Iterate over all sheet names in the workbook
-    for sheet_name in workbook.sheetnames:
+    for sheet_name in sheet_names:
         # Skip combined sector sheets (assuming these sheets don't have an underscore)
         if '_' not in sheet_name:
             continue
@@ -72,20 +94,40 @@ def dot_plots_xcl(filepath_workbook, column_positions):
     int
         The row position where the last chart was placed.
     """
-    worksheet_dict = _categorize_sheets_by_sector(filepath_workbook)
-    
-    # Load the workbook
-    wb = load_workbook(filepath_workbook)
-    
+    report = ExcelReport(filepath_workbook, append=True)
+    current_row = add_dot_plots(report, column_positions)
+    report.save()
+    return current_row
+
+def add_dot_plots(report, column_positions):
+    """
+    Adds dot plots for each sector to an `ExcelReport`.
+
+    The sheets of the report are categorized by sector, and a scatter chart (dot plot) is created
+    for each method sheet. The charts are placed in a `{sector}_charts` sheet, moved to the front
+    of the workbook.
+
+    Parameters
+    ----------
+    report : ExcelReport
+        The report holding the LCA scores sheets.
+    column_positions : dict
+        A dictionary containing column index positions for the data required to create 
+        the charts for each worksheet.
+
+    Returns
+    -------
+    int
+        The row position where the last chart was placed.
+    """
+    worksheet_dict = _categorize_sheet_names(report.sheetnames)
+    current_row = 1
+
     # Iterate over each sector and its associated worksheets
     for sector, worksheet_names in worksheet_dict.items():
         
         # Create or get the chart sheet for the current sector
-        chart_sheet_name = f"{sector}_charts"
-        if chart_sheet_name in wb.sheetnames:
-            ws_charts = wb[chart_sheet_name]
-        else:
-            ws_charts = wb.create_sheet(chart_sheet_name)        
+        chart_sheet_name = report.chart_sheet(f"{sector}_charts")
                 
         # Initial position for the first chart
         current_row = 1  # Start placing charts from row 1
@@ -96,136 +138,20 @@ def dot_plots_xcl(filepath_workbook, column_positions):
         
         # Iterate over each worksheet name in the current sector
         for i, worksheet_name in enumerate(worksheet_names):
-            ws = wb[worksheet_name]
-
-            # Find min_row, max_row and max_column
-            max_row = ws.max_row
-            max_column = ws.max_column
-            min_row = 1
-
-            # Find the key in index_positions that contains worksheet_name
-            matching_key = None
-            for key in column_positions.keys():
-                if worksheet_name in key:
-                    matching_key = key
-                    break
-
+            matching_key = _matching_key(worksheet_name, column_positions)
             if not matching_key:
                 print(f"Warning: No matching key found for worksheet '{worksheet_name}'. Skipping...")
                 continue
 
-            # Retrieve the column positions from the index_positions dictionary
-            positions = column_positions[matching_key]
-            total_col = positions.get("total", None) + 1
-            rank_col = positions.get("rank", None) + 1
-            mean_col = positions.get("mean", None) + 1
-            std_adv_col = positions.get("2std_abv", None) + 1
-            std_blw_col = positions.get("2std_blw", None) + 1
-            q1_col = positions.get("q1", None) + 1
-            q3_col = positions.get("q3", None) + 1
-            method_col = positions.get("method", None) + 1
-            method_unit_col = positions.get("method unit", None) + 1
-            
-            # Ensure that all required columns are present
-            if None in [total_col, rank_col, mean_col, std_adv_col, std_blw_col, q1_col, q3_col, 
-                        method_col, method_unit_col]:
+            chart = _dot_plot_chart(
+                report, worksheet_name, column_positions[matching_key], sector
+            )
+            if chart is None:
                 print(f"Warning: Missing columns in worksheet '{worksheet_name}' for sector '{sector}'. Skipping...")
                 continue
-            
-            # Create a ScatterChart (or other chart type as needed)
-            chart = ScatterChart()
 
-            # Chart titles
-            method_value = ws.cell(row=2, column=method_col).value
-            chart.title = f"{method_value} LCA scores for {sector} sector" 
-            
-            method_unit_value = ws.cell(row=2, column=method_unit_col).value
-            chart.y_axis.title = f"{method_unit_value}"
-            chart.x_axis.title = 'activity rank'
-            # Avoid overlap
-            chart.title.overlay = False
-            chart.x_axis.title.overlay = False
-            chart.y_axis.title.overlay = False 
-
-            # Define the data range for the chart
-            y_values = Reference(ws, min_col=total_col, min_row=min_row, max_row=max_row)
-            x_values = Reference(ws, min_col=rank_col, min_row=min_row, max_row=max_row)
-
-            # Create a series and add it to the chart
-            series = Series(y_values, x_values, title_from_data=True)
-            chart.series.append(series)
-            chart.style = 9
-
-            # Customize the series to show only markers (dots)
-            series.marker.symbol = "circle"
-            series.marker.size = 5
-            series.graphicalProperties.line.noFill = True
-
-            # Adjust X-axis properties
-            chart.x_axis.tickLblPos = "low"
-            chart.x_axis.majorGridlines = None 
-            chart.x_axis.tickMarkSkip = 1  # Show all tick marks
-            chart.x_axis.tickLblSkip = 1  # Show all labels
-
-            chart.x_axis.scaling.orientation = "minMax"
-            chart.x_axis.crosses = "autoZero"
-            chart.x_axis.axPos = "b"
-            chart.x_axis.delete = False
-
-            # Adjust Y-axis properties
-            chart.y_axis.tickLblPos = "nextTo"  # Position the labels next to the tick marks
-            chart.y_axis.delete = False  # Ensure axis is not deleted
-            chart.y_axis.number_format = '0.00000'
-            chart.y_axis.majorGridlines = None 
-
-            # Add statistics: mean, IQR, and standard deviation lines to the chart
-            # MEAN
-            mean_y = Reference(ws, min_col=mean_col, min_row=min_row, max_row=max_row)
-            mean_series = Series(mean_y, x_values, title_from_data="True")
-            chart.series.append(mean_series)
-            mean_series.marker.symbol = "none"  # No markers, just a line
-            mean_series.graphicalProperties.line.solidFill = "FF0000"  # Red line for mean value
-            mean_series.graphicalProperties.line.width = 10000  # Set line width
-
-            # IQR
-            iqr1 = Reference(ws, min_col=q1_col, min_row=min_row, max_row=max_row)
-            iqr3 = Reference(ws, min_col=q3_col, min_row=min_row, max_row=max_row)
-            iqr1_series = Series(iqr1, x_values, title_from_data="True")
-            iqr3_series = Series(iqr3, x_values, title_from_data="True")
-            chart.series.append(iqr1_series)
-            chart.series.append(iqr3_series)
-            iqr1_series.marker.symbol = "none"  # No markers, just a line
-            iqr3_series.marker.symbol = "none"
-            iqr1_series.graphicalProperties.line.solidFill = "6082B6"  # Blue line 
-            iqr3_series.graphicalProperties.line.solidFill = "6082B6"  
-            iqr1_series.graphicalProperties.line.width = 10000  # Set line width
-            iqr3_series.graphicalProperties.line.width = 10000  # Set line width
-
-            # STD
-            std_abv = Reference(ws, min_col=std_adv_col, min_row=min_row, max_row=max_row)
-            std_blw = Reference(ws, min_col=std_blw_col, min_row=min_row, max_row=max_row)
-            std_abv_series = Series(std_abv, x_values, title_from_data="True")
-            std_blw_series = Series(std_blw, x_values, title_from_data="True")
-            chart.series.append(std_abv_series)
-            chart.series.append(std_blw_series)
-            std_abv_series.marker.symbol = "none"  # No markers, just a line
-            std_blw_series.marker.symbol = "none"
-            std_abv_series.graphicalProperties.line.solidFill = "FFAA1D"  # Orange line
-            std_blw_series.graphicalProperties.line.solidFill = "FFAA1D"  
-            std_abv_series.graphicalProperties.line.width = 10000  # Set line width
-            std_blw_series.graphicalProperties.line.width = 10000  # Set line width
-
-            # Set legend position to the right of the plot area
-            chart.legend.position = 'r'  # 'r' for right
-            chart.legend.overlay = False
-
-            # Adjust chart dimensions
-            chart.width = 20  # Width of the chart
-            chart.height = 14  # Height of the chart
-
-            # Calculate the position for this chart
-            position = ws_charts.cell(row=current_row, column=current_col).coordinate
-            ws_charts.add_chart(chart, position)
+            # Place the chart in the chart sheet
+            report.add_chart(chart_sheet_name, chart, current_row, current_col)
             
             # Update position for the next chart
             current_col += chart_width +1 
@@ -234,12 +160,150 @@ def dot_plots_xcl(filepath_workbook, column_positions):
                 current_col = 1  # Reset to the first column
 
         # Move the chart sheet to the first position
-        wb._sheets.remove(ws_charts)
-        wb._sheets.insert(0, ws_charts)
+        report.move_to_front(chart_sheet_name)
 
-    wb.save(filepath_workbook)
     return current_row
 
+def _matching_key(worksheet_name, column_positions):
+    """
+    Returns the first key of `column_positions` containing `worksheet_name`, or None.
+    """
+    for key in column_positions.keys():
+        if worksheet_name in key:
+            return key
+    return None
+
+def _dot_plot_chart(report, worksheet_name, positions, sector):
+    """
+    Creates the scatter chart (dot plot) of the LCA scores of one method sheet, with lines for
+    the mean, the interquartile range and the standard deviation bounds.
+
+    Parameters
+    ----------
+    report : ExcelReport
+        The report holding the method sheet.
+    worksheet_name : str
+        Name of the method sheet.
+    positions : dict
+        Column index positions of the method sheet.
+    sector : str
+        Name of the sector.
+
+    Returns
+    -------
+    ScatterChart or None
+        The chart, or None if a required column is missing.
+    """
+    ws = report.worksheet(worksheet_name)
+
+    # Find min_row, max_row and max_column
+    max_row, max_column = report.dimensions(worksheet_name)
+    min_row = 1
+
+    # Retrieve the column positions
+    required = ["total", "rank", "mean", "2std_abv", "2std_blw", "q1", "q3", "method",
+                "method unit"]
+
+    # Ensure that all required columns are present
+    if any(positions.get(col) is None for col in required):
+        return None
+
+    total_col, rank_col, mean_col, std_adv_col, std_blw_col, q1_col, q3_col, method_col, \
+        method_unit_col = [positions[col] + 1 for col in required]
+    
+    # Create a ScatterChart (or other chart type as needed)
+    chart = ScatterChart()
+
+    # Chart titles
+    method_value = report.cell_value(worksheet_name, row=2, column=method_col)
+    chart.title = f"{method_value} LCA scores for {sector} sector" 
+    
+    method_unit_value = report.cell_value(worksheet_name, row=2, column=method_unit_col)
+    chart.y_axis.title = f"{method_unit_value}"
+    chart.x_axis.title = 'activity rank'
+    # Avoid overlap
+    chart.title.overlay = False
+    chart.x_axis.title.overlay = False
+    chart.y_axis.title.overlay = False 
+
+    # Define the data range for the chart
+    y_values = Reference(ws, min_col=total_col, min_row=min_row, max_row=max_row)
+    x_values = Reference(ws, min_col=rank_col, min_row=min_row, max_row=max_row)
+
+    # Create a series and add it to the chart
+    series = Series(y_values, x_values, title_from_data=True)
+    chart.series.append(series)
+    chart.style = 9
+
+    # Customize the series to show only markers (dots)
+    series.marker.symbol = "circle"
+    series.marker.size = 5
+    series.graphicalProperties.line.noFill = True
+
+    # Adjust X-axis properties
+    chart.x_axis.tickLblPos = "low"
+    chart.x_axis.majorGridlines = None 
+    chart.x_axis.tickMarkSkip = 1  # Show all tick marks
+    chart.x_axis.tickLblSkip = 1  # Show all labels
+
+    chart.x_axis.scaling.orientation = "minMax"
+    chart.x_axis.crosses = "autoZero"
+    chart.x_axis.axPos = "b"
+    chart.x_axis.delete = False
+
+    # Adjust Y-axis properties
+    chart.y_axis.tickLblPos = "nextTo"  # Position the labels next to the tick marks
+    chart.y_axis.delete = False  # Ensure axis is not deleted
+    chart.y_axis.number_format = '0.00000'
+    chart.y_axis.majorGridlines = None 
+
+    # Add statistics: mean, IQR, and standard deviation lines to the chart
+    # MEAN
+    mean_y = Reference(ws, min_col=mean_col, min_row=min_row, max_row=max_row)
+    mean_series = Series(mean_y, x_values, title_from_data="True")
+    chart.series.append(mean_series)
+    mean_series.marker.symbol = "none"  # No markers, just a line
+    mean_series.graphicalProperties.line.solidFill = "FF0000"  # Red line for mean value
+    mean_series.graphicalProperties.line.width = 10000  # Set line width
+
+    # IQR
+    iqr1 = Reference(ws, min_col=q1_col, min_row=min_row, max_row=max_row)
+    iqr3 = Reference(ws, min_col=q3_col, min_row=min_row, max_row=max_row)
+    iqr1_series = Series(iqr1, x_values, title_from_data="True")
+    iqr3_series = Series(iqr3, x_values, title_from_data="True")
+    chart.series.append(iqr1_series)
+    chart.series.append(iqr3_series)
+    iqr1_series.marker.symbol = "none"  # No markers, just a line
+    iqr3_series.marker.symbol = "none"
+    iqr1_series.graphicalProperties.line.solidFill = "6082B6"  # Blue line 
+    iqr3_series.graphicalProperties.line.solidFill = "6082B6"  
+    iqr1_series.graphicalProperties.line.width = 10000  # Set line width
+    iqr3_series.graphicalProperties.line.width = 10000  # Set line width
+
+    # STD
+    std_abv = Reference(ws, min_col=std_adv_col, min_row=min_row, max_row=max_row)
+    std_blw = Reference(ws, min_col=std_blw_col, min_row=min_row, max_row=max_row)
+    std_abv_series = Series(std_abv, x_values, title_from_data="True")
+    std_blw_series = Series(std_blw, x_values, title_from_data="True")
+    chart.series.append(std_abv_series)
+    chart.series.append(std_blw_series)
+    std_abv_series.marker.symbol = "none"  # No markers, just a line
+    std_blw_series.marker.symbol = "none"
+    std_abv_series.graphicalProperties.line.solidFill = "FFAA1D"  # Orange line
+    std_blw_series.graphicalProperties.line.solidFill = "FFAA1D"  
+    std_abv_series.graphicalProperties.line.width = 10000  # Set line width
+    std_blw_series.graphicalProperties.line.width = 10000  # Set line width
+
+    # Set legend position to the right of the plot area
+    chart.legend.position = 'r'  # 'r' for right
+    chart.legend.overlay = False
+
+    # Adjust chart dimensions
+    chart.width = 20  # Width of the chart
+    chart.height = 14  # Height of the chart
+
+    return chart
+
 def stacked_bars_xcl(filepath_workbook, column_positions, current_row_dot_plot):
     """
     Creates stacked bar charts for each sector in an Excel workbook.
@@ -259,26 +323,45 @@ def stacked_bars_xcl(filepath_workbook, column_positions, current_row_dot_plot):
         The row number in the chart sheet where the dot plots ended, used to determine 
         the starting row for the stacked bar charts.
 
+    Returns
+    -------
+    int
+        The row position where the last chart was placed.
+    """
+    report = ExcelReport(filepath_workbook, append=True)
+    current_row = add_stacked_bars(report, column_positions, current_row_dot_plot)
+    report.save()
+    return current_row
+
+def add_stacked_bars(report, column_positions, current_row_dot_plot):
+    """
+    Adds stacked bar charts of the input contributions for each sector to an `ExcelReport`.
+
+    Parameters
+    ----------
+    report : ExcelReport
+        The report holding the LCA scores sheets.
+    column_positions : dict
+        A dictionary containing column index positions for the data required to create 
+        the charts for each worksheet.
+    current_row_dot_plot : int
+        The row number in the chart sheet where the dot plots ended, used to determine 
+        the starting row for the stacked bar charts.
+
     Returns
     -------
     int
         The row position where the last chart was placed.
     """
     # Categorize sheets by sector
-    worksheet_dict = _categorize_sheets_by_sector(filepath_workbook)
-    
-    # Load the workbook
-    wb = load_workbook(filepath_workbook)
+    worksheet_dict = _categorize_sheet_names(report.sheetnames)
+    current_row = current_row_dot_plot
     
     # Iterate over each sector and its associated worksheets
     for sector, worksheet_names in worksheet_dict.items():
         
         # Create or get the chart sheet for the current sector
-        chart_sheet_name = f"{sector}_charts"
-        if chart_sheet_name in wb.sheetnames:
-            ws_charts = wb[chart_sheet_name]
-        else:
-            ws_charts = wb.create_sheet(chart_sheet_name)
+        chart_sheet_name = report.chart_sheet(f"{sector}_charts")
                 
         # Initial position for the first chart
         chart_height = 30  # Number of rows a chart occupies
@@ -289,88 +372,17 @@ def stacked_bars_xcl(filepath_workbook, column_positions, current_row_dot_plot):
         
         # Iterate over each worksheet name in the current sector
         for i, worksheet_name in enumerate(worksheet_names):
-            ws = wb[worksheet_name]
-
-            # Find the key in index_positions that contains worksheet_name
-            matching_key = None
-            for key in column_positions.keys():
-                if worksheet_name in key:
-                    matching_key = key
-                    break
-
+            matching_key = _matching_key(worksheet_name, column_positions)
             if not matching_key:
                 print(f"Warning: No matching key found for worksheet '{worksheet_name}'. Skipping...")
                 continue
 
-            # Retrieve the column positions from the index_positions dictionary
-            positions = column_positions[matching_key]
-
-            # Find min_row, max_row, and max_column
-            max_row = ws.max_row
-            max_column = ws.max_column
-            input_min_col = positions.get("first_input", None) + 1
-            rank_col = positions.get("rank", None) + 1
-            method_col = positions.get("method", None) + 1
-            method_unit_col = positions.get("method unit", None) + 1
-
-            # Create a BarChart object for the stacked bar chart
-            chart = BarChart()
-            chart.type = "bar"
-            chart.style = 2
-            chart.grouping = "stacked"
-            chart.overlap = 100
-
-            # Chart titles
-            method_value = ws.cell(row=2, column=method_col).value
-            chart.title = f"Inputs contributions to {method_value} LCA score for sector {sector}"
-
-            method_unit_value = ws.cell(row=2, column=method_unit_col).value
-            chart.y_axis.title = f"{method_unit_value}"
-            chart.x_axis.title = 'activity rank'
-
-            # Avoid overlap
-            chart.title.overlay = False
-            chart.x_axis.title.overlay = False
-            chart.y_axis.title.overlay = False 
-            chart.legend.overlay = False
-
-            # Define data for the stacked bar chart
-            data = Reference(ws, min_col=input_min_col, min_row=1, max_row=max_row, 
-                             max_col=max_column)
-            cats = Reference(ws, min_col=rank_col, min_row=2, max_row=max_row)
-
-            chart.add_data(data, titles_from_data=True)
-            chart.set_categories(cats)
-            chart.shape = 4
-
-            # Modify each series in the chart to disable the inversion of negative values 
-            for series in chart.series:
-                series.invertIfNegative = False
-
-            # y-axis ticks
-            chart.y_axis.tickLblPos = "nextTo"
-            chart.y_axis.delete = False  # Ensure axis is not deleted
-            chart.y_axis.number_format = '0.000'
-
-            # Adjust X-axis properties
-            chart.x_axis.tickLblPos = "low" 
-            chart.x_axis.majorGridlines = None 
-            chart.x_axis.tickMarkSkip = 1  # Show all tick marks
-            chart.x_axis.tickLblSkip = 1  # Show all labels
-
-            chart.x_axis.scaling.orientation = "minMax"
-            chart.x_axis.crosses = "autoZero"
-            chart.x_axis.axPos = "b"
-            chart.x_axis.delete = False
-
-            # Adjust chart dimensions
-            chart.width = 20  # Width of the chart
-            chart.height = 14  # Height of the chart
+            chart = _stacked_bar_chart(
+                report, worksheet_name, column_positions[matching_key], sector
+            )
 
             # Add the chart to the chart worksheet
-            # Calculate the position for this chart
-            position = ws_charts.cell(row=current_row, column=current_col).coordinate
-            ws_charts.add_chart(chart, position)
+            report.add_chart(chart_sheet_name, chart, current_row, current_col)
             
             # Update position for the next chart
             current_col += chart_width + 1
@@ -379,10 +391,91 @@ def stacked_bars_xcl(filepath_workbook, column_positions, current_row_dot_plot):
                 current_col = 1  # Reset to the first column
 
         # Move the chart sheet to the first position
-        wb._sheets.remove(ws_charts)
-        wb._sheets.insert(0, ws_charts)
-        
-    # Save the workbook with the charts added
-    wb.save(filepath_workbook)
+        report.move_to_front(chart_sheet_name)
     
     return current_row
+
+def _stacked_bar_chart(report, worksheet_name, positions, sector):
+    """
+    Creates the stacked bar chart of the input contributions of one method sheet.
+
+    Parameters
+    ----------
+    report : ExcelReport
+        The report holding the method sheet.
+    worksheet_name : str
+        Name of the method sheet.
+    positions : dict
+        Column index positions of the method sheet.
+    sector : str
+        Name of the sector.
+
+    Returns
+    -------
+    BarChart
+        The chart.
+    """
+    ws = report.worksheet(worksheet_name)
+
+    # Find min_row, max_row, and max_column
+    max_row, max_column = report.dimensions(worksheet_name)
+    input_min_col = positions.get("first_input", None) + 1
+    rank_col = positions.get("rank", None) + 1
+    method_col = positions.get("method", None) + 1
+    method_unit_col = positions.get("method unit", None) + 1
+
+    # Create a BarChart object for the stacked bar chart
+    chart = BarChart()
+    chart.type = "bar"
+    chart.style = 2
+    chart.grouping = "stacked"
+    chart.overlap = 100
+
+    # Chart titles
+    method_value = report.cell_value(worksheet_name, row=2, column=method_col)
+    chart.title = f"Inputs contributions to {method_value} LCA score for sector {sector}"
+
+    method_unit_value = report.cell_value(worksheet_name, row=2, column=method_unit_col)
+    chart.y_axis.title = f"{method_unit_value}"
+    chart.x_axis.title = 'activity rank'
+
+    # Avoid overlap
+    chart.title.overlay = False
+    chart.x_axis.title.overlay = False
+    chart.y_axis.title.overlay = False 
+    chart.legend.overlay = False
+
+    # Define data for the stacked bar chart
+    data = Reference(ws, min_col=input_min_col, min_row=1, max_row=max_row, 
+                     max_col=max_column)
+    cats = Reference(ws, min_col=rank_col, min_row=2, max_row=max_row)
+
+    chart.add_data(data, titles_from_data=True)
+    chart.set_categories(cats)
+    chart.shape = 4
+
+    # Modify each series in the chart to disable the inversion of negative values 
+    for series in chart.series:
+        series.invertIfNegative = False
+
+    # y-axis ticks
+    chart.y_axis.tickLblPos = "nextTo"
+    chart.y_axis.delete = False  # Ensure axis is not deleted
+    chart.y_axis.number_format = '0.000'
+
+    # Adjust X-axis properties
+    chart.x_axis.tickLblPos = "low" 
+    chart.x_axis.majorGridlines = None 
+    chart.x_axis.tickMarkSkip = 1  # Show all tick marks
+    chart.x_axis.tickLblSkip = 1  # Show all labels
+
+    chart.x_axis.scaling.orientation = "minMax"
+    chart.x_axis.crosses = "autoZero"
+    chart.x_axis.axPos = "b"
+    chart.x_axis.delete = False
+
+    # Adjust chart dimensions
+    chart.width = 20  # Width of the chart
+    chart.height = 14  # Height of the chart
+
+    return chart
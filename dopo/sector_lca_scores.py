@@ -15,7 +15,9 @@ import tabulate
 import pandas as pd
 import re
 
-def sector_lca_scores_plots(activity_dict, method_dict, excel_file_name, cutoff=0.01):
+from .excel_report import ExcelReport
+
+def sector_lca_scores_plots(activity_dict, method_dict, excel_file_name, cutoff=0.01, report=None):
     """
     Generate plots of Life Cycle Assessment (LCA) scores for different sectors and save them to an 
     Excel file.
@@ -33,34 +35,49 @@ def sector_lca_scores_plots(activity_dict, method_dict, excel_file_name, cutoff=
                                 be saved.
         cutoff (float, optional): A cutoff value for filtering LCA scores. Any scores below this 
                                     value will be excluded. Default is 0.01.
+        report (ExcelReport, optional): A report to add the tables and plots to. If given, the 
+                                    workbook is not written, so that further results (e.g. 
+                                    `database_comparison_plots`) can be added before calling 
+                                    `report.save()`. By default, a new report is written to 
+                                    `excel_file_name`.
 
     Returns:
-        None
+        int: The last row occupied in the Excel charts sheet.
 
     The function performs the following steps:
     1. Generates LCA scores tables based on the provided activity and method dictionaries and the 
         cutoff value.
-    2. Saves the generated LCA scores tables to the specified Excel file.
-    3. Creates dot plots of the LCA scores and saves them in the Excel file.
-    4. Creates stacked bar charts of the LCA scores and appends them to the Excel file.
-    5. Prints the last row occupied in the Excel charts sheet, which indicates where the plots end.
+    2. Adds the generated LCA scores tables to the report.
+    3. Adds dot plots of the LCA scores to the report.
+    4. Adds stacked bar charts of the LCA scores to the report.
+    5. Writes the workbook once, unless a report was given.
+    6. Prints the last row occupied in the Excel charts sheet, which indicates where the plots end.
 
     Note:
-        - The `dot_plots_xcl` and `stacked_bars_xcl` functions are imported inside this function to 
+        - The `add_dot_plots` and `add_stacked_bars` functions are imported inside this function to 
             avoid circular imports.
         - The function relies on helper functions such as `sector_lca_scores` and 
-            `sector_lca_scores_to_excel` to generate and save LCA scores, and `dot_plots_xcl` and 
-            `stacked_bars_xcl` for generating plots.
+            `sector_lca_scores_to_excel` to generate and save LCA scores, and `add_dot_plots` and 
+            `add_stacked_bars` for generating plots.
     """
-    from dopo.plots_sector_lca_scores import dot_plots_xcl, stacked_bars_xcl
+    from dopo.plots_sector_lca_scores import add_dot_plots, add_stacked_bars
+
+    write_report = report is None
+    if write_report:
+        report = ExcelReport(excel_file_name)
    
     scores_dict=_sector_lca_scores(activity_dict, method_dict, cutoff)
-    column_positions=_sector_lca_scores_to_excel(scores_dict, excel_file_name)
-    current_row=dot_plots_xcl(excel_file_name, column_positions)
-    current_row=stacked_bars_xcl(excel_file_name, column_positions, current_row)
+    column_positions=_sector_lca_scores_to_excel(scores_dict, excel_file_name, report=report)
+    current_row=add_dot_plots(report, column_positions)
+    current_row=add_stacked_bars(report, column_positions, current_row)
+
+    if write_report:
+        report.save()
     
     print(f"last row occupied in excel charts sheet: {current_row} --> use as current_row argument")
 
+    return current_row
+
 def _sector_lca_scores(activity_dict, method_dict, cutoff=0.01):
     """
     Generates LCA score tables for each sector's activity list, including total scores and CPC 
@@ -113,7 +130,7 @@ def _sector_lca_scores(activity_dict, method_dict, cutoff=0.01):
 
     return scores_dict
 
-def _sector_lca_scores_to_excel(scores_dict, excel_file_name):
+def _sector_lca_scores_to_excel(scores_dict, excel_file_name, report=None):
     """
     Writes LCA scores to an Excel file, organizing data by sector and method.
 
@@ -134,6 +151,8 @@ def _sector_lca_scores_to_excel(scores_dict, excel_file_name):
     excel_file_name : str
         The name of the Excel file to be created, including the file extension 
         (e.g., 'lca_scores.xlsx').
+    report : ExcelReport, optional
+        A report to add the sheets to. If given, the workbook is not written here.
 
     Returns
     -------
@@ -192,20 +211,21 @@ def _sector_lca_scores_to_excel(scores_dict, excel_file_name):
         combined_df = pd.concat(sector_dfs, axis=0, ignore_index=True, sort=False).fillna(0)
         combined_sector_dfs[sector] = combined_df
 
+    write_report = report is None
+    if write_report:
+        report = ExcelReport(excel_file_name)
+
+    # Add all combined sector sheets (names are truncated to 31 characters)
+    for sector, combined_df in combined_sector_dfs.items():
+        report.add_sheet(f"{sector}", combined_df)
+
+    # Add all method-specific sheets
+    for worksheet_name, df in method_dfs:
+        report.add_sheet(worksheet_name, df)
+
     # Write to Excel file
-    with pd.ExcelWriter(excel_file_name, engine='openpyxl') as writer:
-        # Write all combined sector sheets
-        for sector, combined_df in combined_sector_dfs.items():
-            worksheet_name_big = f"{sector}"
-            if len(worksheet_name_big) > 31:
-                worksheet_name_big = worksheet_name_big[:31]
-            combined_df.to_excel(writer, sheet_name=worksheet_name_big, index=False)
-
-        # Write all method-specific sheets
-        for worksheet_name, df in method_dfs:
-            if len(worksheet_name) > 31:
-                worksheet_name = worksheet_name[:31]
-            df.to_excel(writer, sheet_name=worksheet_name, index=False)
+    if write_report:
+        report.save()
 
     return column_positions
 
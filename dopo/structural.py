@@ -0,0 +1,121 @@
+"""
+Structural outliers: exchanges whose amounts are far off those of the other activities of a
+sector.
+
+The scores of an activity can look ordinary while its inventory is not, e.g. a clinker kiln
+using ten times the heat per kg of its peers, compensated by another input. This module compares
+the exchanges of the activities of a sector directly, from the columns of the technosphere and
+biosphere matrices already built for the LCA:
+
+- every exchange is normalized by the production amount of its activity (e.g. MJ heat per kg
+  clinker);
+- technosphere inputs are aligned by the CPC class of the supplying activity (or its reference
+  product if it has none), and biosphere flows by name and compartment, and summed per activity;
+- within each (sector, input) group, amounts are compared on a log scale with robust z-scores.
+
+Labels of the matrix rows are read with bulk queries of the activity table by the engine, not
+one query per exchange.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .outliers import ROBUST_Z_THRESHOLD, robust_z_scores
+
+# Minimum number of activities of a sector with an input for its amounts to be compared
+MIN_ACTIVITIES = 3
+
+
+def structural_outliers(engine, sectors: dict, threshold: float = ROBUST_Z_THRESHOLD,
+                        min_activities: int = MIN_ACTIVITIES) -> pd.DataFrame:
+    """
+    Compares the normalized exchanges of the activities of each sector.
+
+    :param engine: An engine whose matrices include all activities of `sectors`.
+    :type engine: BatchedLCA
+    :param sectors: A dictionary where keys are sector names and values are lists of activities.
+    :type sectors: dict
+    :param threshold: Absolute robust z-score of the log amount above which an exchange is flagged.
+    :type threshold: float, optional
+    :param min_activities: Minimum number of activities having an input for it to be compared.
+    :type min_activities: int, optional
+    :return: One row per sector, activity and input, with the "exchange" type ("technosphere" or
+        "biosphere"), the "amount" per unit of product, the "sector median" amount of the
+        input, the "robust z" of the log amount and the "outlier" flag.
+    :rtype: pd.DataFrame
+    """
+    technosphere = engine.lca.technosphere_matrix.tocsc()
+    biosphere = engine.lca.biosphere_matrix.tocsc()
+    labels = engine.labels
+
+    frames = []
+    for sector, activities in sectors.items():
+        activities = list(activities)
+        if not activities:
+            continue
+
+        columns = np.array([engine.activity_index(act) for act in activities])
+        products = np.array([engine.product_index(act) for act in activities])
+        production = np.asarray(technosphere[products, columns]).ravel()
+
+        for exchange, matrix, row_labels in (
+            ("technosphere", technosphere, labels.technosphere),
+            ("biosphere", biosphere, labels.biosphere),
+        ):
+            block = matrix[:, columns].tocoo()
+            rows, position, amounts = block.row, block.col, block.data
+            if exchange == "technosphere":
+                # Inputs are negative, and the production exchange is not an input
+                keep = rows != products[position]
+                rows, position, amounts = rows[keep], position[keep], -amounts[keep]
+            if not len(rows):
+                continue
+
+            frame = pd.DataFrame({
+                "position": position,
+                "input": row_labels(rows),
+                "amount": amounts / production[position],
+            })
+            frame = frame.groupby(["input", "position"], as_index=False, sort=False)["amount"].sum()
+            frame = frame.loc[frame["amount"] != 0]
+            frame.insert(0, "exchange", exchange)
+            frames.append((sector, activities, frame))
+
+    if not frames:
+        return pd.DataFrame(columns=[
+            "sector", "database", "activity", "product", "location", "exchange", "input",
+            "amount", "sector median", "robust z", "outlier",
+        ])
+
+    result = pd.concat(
+        [
+            frame.assign(
+                sector=sector,
+                database=[activities[i]["database"] for i in frame["position"]],
+                activity=[activities[i]["name"] for i in frame["position"]],
+                product=[activities[i].get("reference product") for i in frame["position"]],
+                location=[activities[i].get("location") for i in frame["position"]],
+            )
+            for sector, activities, frame in frames
+        ],
+        ignore_index=True,
+    )
+
+    # Compare the log amounts within each (sector, exchange type, input), keeping signs apart
+    codes, _ = pd.factorize(pd.MultiIndex.from_frame(
+        result[["sector", "exchange", "input"]].assign(sign=np.sign(result["amount"]))
+    ))
+    log_amount = np.log10(np.abs(result["amount"].to_numpy(dtype=float)))
+    median, _, robust_z = robust_z_scores(log_amount, codes)
+
+    # Inputs of too few activities are not compared
+    robust_z[np.bincount(codes)[codes] < min_activities] = np.nan
+
+    result["sector median"] = np.sign(result["amount"]) * 10 ** median
+    result["robust z"] = robust_z
+    result["outlier"] = np.abs(robust_z) > threshold
+
+    return result[[
+        "sector", "database", "activity", "product", "location", "exchange", "input",
+        "amount", "sector median", "robust z", "outlier",
+    ]]
@@ -1,3 +1,70 @@
 """Fixtures for dopo"""
 
-# import pytest
+import pytest
+
+
+@pytest.fixture(scope="session")
+def bw_project():
+    """
+    A temporary Brightway project with a small technosphere database, a biosphere database
+    and two impact assessment methods.
+    """
+    bd = pytest.importorskip("bw2data")
+
+    use_temp_directory = getattr(bd.projects, "use_temp_directory", None) or getattr(
+        bd.projects, "_use_temp_directory"
+    )
+    use_temp_directory()
+    bd.projects.set_current("dopo-tests")
+
+    bd.Database("bio").write({
+        ("bio", "co2"): {"name": "carbon dioxide", "unit": "kilogram", "type": "emission",
+                         "categories": ("air",)},
+        ("bio", "ch4"): {"name": "methane", "unit": "kilogram", "type": "emission",
+                         "categories": ("air",)},
+    })
+
+    def _activity(code, name, product, location, exchanges, cpc):
+        return {
+            "name": name,
+            "reference product": product,
+            "location": location,
+            "unit": "kilogram",
+            "classifications": [("CPC", cpc)],
+            "exchanges": [{"input": ("db", code), "amount": 1, "type": "production"}]
+            + exchanges,
+        }
+
+    bd.Database("db").write({
+        ("db", "clinker"): _activity(
+            "clinker", "clinker production", "clinker", "CH",
+            [{"input": ("db", "heat"), "amount": 3.5, "type": "technosphere"},
+             {"input": ("bio", "co2"), "amount": 0.5, "type": "biosphere"}],
+            "37440: Clinker",
+        ),
+        ("db", "clinker-de"): _activity(
+            "clinker-de", "clinker production", "clinker", "DE",
+            [{"input": ("db", "heat"), "amount": 4.0, "type": "technosphere"},
+             {"input": ("bio", "co2"), "amount": 0.55, "type": "biosphere"}],
+            "37440: Clinker",
+        ),
+        ("db", "cement"): _activity(
+            "cement", "cement production, Portland", "cement, Portland", "CH",
+            [{"input": ("db", "clinker"), "amount": 0.9, "type": "technosphere"},
+             {"input": ("db", "heat"), "amount": 0.2, "type": "technosphere"}],
+            "37440: Cement",
+        ),
+        ("db", "heat"): _activity(
+            "heat", "heat production, natural gas", "heat", "GLO",
+            [{"input": ("bio", "co2"), "amount": 0.2, "type": "biosphere"},
+             {"input": ("bio", "ch4"), "amount": 0.001, "type": "biosphere"}],
+            "97300: Heat",
+        ),
+    })
+
+    bd.Method(("IPCC", "GWP100")).register(unit="kg CO2-Eq")
+    bd.Method(("IPCC", "GWP100")).write([(("bio", "co2"), 1.0), (("bio", "ch4"), 29.7)])
+    bd.Method(("IPCC", "GWP20")).register(unit="kg CO2-Eq")
+    bd.Method(("IPCC", "GWP20")).write([(("bio", "co2"), 1.0), (("bio", "ch4"), 82.5)])
+
+    return bd
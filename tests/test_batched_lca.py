@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+bc = pytest.importorskip("bw2calc")
+
+from dopo.batched_lca import BatchedLCA
+
+
+def test_batched_scores_match_single_lca(bw_project):
+    activities = list(bw_project.Database("db"))
+    methods = [("IPCC", "GWP100"), ("IPCC", "GWP20")]
+
+    engine = BatchedLCA(activities, methods, chunk_size=3)
+    scores = engine.scores(activities)
+
+    assert scores.shape == (2, len(activities))
+    for i, method in enumerate(methods):
+        for j, act in enumerate(activities):
+            lca = bc.LCA({act: 1}, method)
+            lca.lci()
+            lca.lcia()
+            assert np.isclose(scores[i, j], lca.score)
+
+
+def test_engine_cache_reuses_engines(bw_project):
+    from dopo.batched_lca import EngineCache
+
+    activities = list(bw_project.Database("db"))
+    cache = EngineCache()
+
+    engine = cache.get(activities, [("IPCC", "GWP100")])
+    assert cache.get(activities[:1], [("IPCC", "GWP20")]) is engine
+
+    act = activities[0]
+    engine.use_method(("IPCC", "GWP20"))
+    lca = bc.LCA({act: 1}, ("IPCC", "GWP20"))
+    lca.lci()
+    lca.lcia()
+    assert np.isclose(engine.calculate({act: 1}).score, lca.score)
+
+
+def test_flow_contributions_keep_largest_flows(bw_project):
+    activities = list(bw_project.Database("db"))
+    methods = [("IPCC", "GWP100"), ("IPCC", "GWP20")]
+
+    engine = BatchedLCA(activities, methods, chunk_size=3)
+    flows, contributions, scores = engine.flow_contributions(activities, top_k=1)
+
+    assert flows.shape == contributions.shape == (2, len(activities), 1)
+    assert np.allclose(scores, engine.scores(activities))
+
+    # The kept flow is the largest of the characterized inventory
+    _, supply = next(engine.supply(activities[:1]))
+    inventory = engine.lca.biosphere_matrix @ supply[:, 0]
+    for i, method in enumerate(methods):
+        characterized = engine.characterization_vector(method) * inventory
+        largest = np.argmax(np.abs(characterized))
+        assert flows[i, 0, 0] == largest
+        assert np.isclose(contributions[i, 0, 0], characterized[largest])
+
+
+def test_nbytes_counts_what_the_engine_keeps(bw_project):
+    engine = BatchedLCA(list(bw_project.Database("db")), [("IPCC", "GWP100")])
+    matrices = engine.nbytes
+
+    total, direct = engine.unit_scores(("IPCC", "GWP100"))
+    with_scores = engine.nbytes
+    assert with_scores > matrices + total.nbytes + direct.nbytes
+
+    columns = range(len(total))
+    engine.activities(columns)
+    for column in columns:
+        engine.inputs(column)
+    assert engine.nbytes > with_scores
+
+
+def test_engine_cache_rebuilds_engines_of_rewritten_methods(bw_project):
+    from dopo.batched_lca import EngineCache
+
+    activities = list(bw_project.Database("db"))
+    cache = EngineCache()
+    engine = cache.get(activities, [("IPCC", "GWP20")])
+    before = engine.scores(activities)
+
+    method = bw_project.Method(("IPCC", "GWP20"))
+    factors = method.load()
+    try:
+        method.write([(flow, 2 * cf) for flow, cf in factors])
+        rebuilt = cache.get(activities, [("IPCC", "GWP20")])
+        assert rebuilt is not engine
+        assert np.allclose(rebuilt.scores(activities), 2 * before)
+    finally:
+        method.write(factors)
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from dopo.dash.utils.cache import FigureCache, ResultCache
+
+
+def test_result_cache_falls_back_to_disk(tmp_path):
+    cache = ResultCache(max_entries=1, directory=tmp_path)
+    results = {"cement": pd.DataFrame({"activity": ["a", "b"], "score": [1.0, 2.0]})}
+
+    handle = cache.put(results)
+    cache.put({"steel": pd.DataFrame()})  # evicts the first result set from memory
+
+    assert handle not in cache._memory
+    pd.testing.assert_frame_equal(cache.get_sector(handle, "cement"), results["cement"])
+    assert cache.get("unknown") is None
+    assert cache.get({"cement": {}}) is None
+
+
+def test_figure_cache_renders_each_view_once():
+    cache = FigureCache(max_entries=2)
+    renders = []
+
+    def render(name):
+        renders.append(name)
+        return {"data": [], "layout": {"title": name}}
+
+    assert cache.get_or_render(("h", "cement", "m", "total"), lambda: render("a"))["layout"]["title"] == "a"
+    assert cache.get_or_render(("h", "cement", "m", "total"), lambda: render("b"))["layout"]["title"] == "a"
+    cache.get_or_render(("h", "steel", "m", "total"), lambda: render("c"))
+    cache.get_or_render(("h", "glass", "m", "total"), lambda: render("d"))  # evicts cement
+    cache.get_or_render(("h", "cement", "m", "total"), lambda: render("e"))
+    assert cache.get_or_render(("h", "x", "m", "total"), lambda: None) is None
+
+    assert renders == ["a", "c", "d", "e"]
+    # Figures are kept as JSON, so callers cannot change the cached copy
+    cache.get_or_render(("h", "cement", "m", "total"), lambda: None)["layout"]["title"] = "changed"
+    assert cache.get_or_render(("h", "cement", "m", "total"), lambda: None)["layout"]["title"] == "e"
+    assert all(isinstance(text, str) for text in cache._figures.values())
+    assert cache.stats() == {"hits": 3, "misses": 5, "entries": 2, "hit_rate": 3 / 8}
+
+
+def test_result_cache_ignores_shared_directories(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+
+    with pytest.warns(UserWarning):
+        cache = ResultCache(directory=shared)
+    assert cache.directory is None
+
+    handle = cache.put({"cement": pd.DataFrame()})
+    assert cache.get(handle) is not None
+    assert not list(shared.iterdir())
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("bw2calc")
+
+from dopo.database_comparison import (
+    ActivityMatchIndex, _relative_changes_df, database_panel_comparison
+)
+
+METHODS = {
+    "gwp100": {"method name": ("IPCC", "GWP100"), "short name": "gwp100", "unit": "kg CO2-Eq"},
+    "gwp20": {"method name": ("IPCC", "GWP20"), "short name": "gwp20", "unit": "kg CO2-Eq"},
+}
+
+
+class FakeActivity(dict):
+    def __init__(self, database, code, **data):
+        super().__init__(database=database, code=code, unit="kilogram", **data)
+        self.key = (database, code)
+
+
+def test_activity_match_index():
+    reference = [
+        FakeActivity("ei", "a", name="clinker production", **{"reference product": "clinker"},
+                     location="CH"),
+        FakeActivity("ei", "b", name="cement production, Portland",
+                     **{"reference product": "cement, Portland"}, location="RER"),
+        FakeActivity("ei", "c", name="heat production", **{"reference product": "heat"},
+                     location="GLO"),
+        FakeActivity("ei", "d", name="lime production", **{"reference product": "lime"},
+                     location="GLO"),
+    ]
+    other = [
+        FakeActivity("pr", "a", name="clinker production", **{"reference product": "clinker"},
+                     location="CH"),
+        FakeActivity("pr", "x", name="cement production, Portland",
+                     **{"reference product": "cement, Portland"}, location="RER"),
+        FakeActivity("pr", "y", name="Production of heat", **{"reference product": "Heat"},
+                     location="WEU"),
+        FakeActivity("pr", "z", name="steel production", **{"reference product": "steel"},
+                     location="GLO"),
+    ]
+
+    index = ActivityMatchIndex(reference, other)
+
+    assert index.match_type(("pr", "a")) == "code"
+    assert index.match_type(("pr", "x")) == "exact"
+    assert index.match_type(("pr", "y")) == "fuzzy"
+    assert index.match_type(("pr", "z")) == "unmatched"
+    assert index.reference_code(("pr", "y")) == "c"
+    assert index.reference_code(("pr", "z")) == "z"
+
+
+def test_relative_changes_without_counterpart_in_sector_are_unmatched(bw_project):
+    activities = sorted(bw_project.Database("db"), key=lambda act: act["code"])
+    # Every premise activity has a code match, but not all of them in the cement sector
+    ecoinvent = {"cement": {"activities": activities[:2]}, "other": {"activities": activities[2:]}}
+    premise = {"cement": {"activities": activities}}
+
+    df = _relative_changes_df(ecoinvent, premise, METHODS)["cement"]["gwp100"]
+
+    matched = df["total_ei"].notna()
+    assert set(df.loc[matched, "match_type"]) == {"code"}
+    assert set(df.loc[~matched, "match_type"]) == {"unmatched"}
+    assert (~matched).sum() == len(activities) - 2
+
+
+def test_database_panel_comparison(bw_project):
+    activities = sorted(bw_project.Database("db"), key=lambda act: act["code"])
+    baseline = {"cement": {"activities": activities}}
+    scenario = {"cement": {"activities": activities[:2]}}
+
+    panels = database_panel_comparison(
+        {"baseline": baseline, "2030": scenario, "2050": baseline}, METHODS,
+        positions=[2020, 2030, 2050],
+    )
+    panel = panels["cement"]
+
+    assert panel.scores.shape == (len(activities), 3, 2)
+    assert np.isnan(panel.scores[2:, 1, :]).all()
+    assert np.allclose(panel.relative_changes[:, 2, :], 0)
+    assert np.allclose(panel.trends, 0)
+    assert len(panel.to_dataframe()) == len(activities) * 3 * 2
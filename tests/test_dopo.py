@@ -0,0 +1,120 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("bw2calc")
+
+from dopo import Dopo
+
+METHODS = [("IPCC", "GWP100"), ("IPCC", "GWP20")]
+
+
+def _dopo(methods):
+    dopo = Dopo()
+    dopo.databases = ["db"]
+    dopo.methods.methods = list(methods)
+    dopo.find_activities_from_classification("cpc", ["Cement", "Clinker"])
+    return dopo
+
+
+def test_analyze_computes_only_missing_units(bw_project, tmp_path):
+    dopo = _dopo(METHODS[:1])
+    dopo.analyze()
+
+    steps = []
+    dopo.methods.methods = list(METHODS)
+    dopo.analyze(progress=lambda done, total, message: steps.append(total))
+    assert set(steps) == {2}  # one new method, for two sectors
+
+    full = _dopo(METHODS)
+    full.analyze(excel_file=tmp_path / "lca_scores.xlsx")
+    assert (tmp_path / "lca_scores.xlsx").exists()
+    assert set(dopo.results) == set(full.results)
+    for sector, scores in full.results.items():
+        pd.testing.assert_frame_equal(dopo.results[sector], scores)
+    pd.testing.assert_frame_equal(dopo.outliers, full.outliers)
+    assert set(dopo.outliers["sector"]) == set(full.results)
+
+
+def test_analyze_reports_views_as_they_complete(bw_project):
+    dopo = _dopo(METHODS[:1])
+    dopo.analyze()
+
+    views = []
+    dopo.methods.methods = list(METHODS)
+    dopo.analyze(on_view=lambda sector, method, scores: views.append((sector, method, scores)))
+
+    # Known views first, then each new (sector, method) once computed
+    assert [method for _, method, _ in views] == [METHODS[0]] * 2 + [METHODS[1]] * 2
+    for sector, method, scores in views:
+        expected = dopo.results[sector]
+        expected = expected[expected["method"] == "-".join(method)].reset_index(drop=True)
+        pd.testing.assert_frame_equal(scores, expected)
+
+
+def test_analyze_breaks_scores_down_into_flows(bw_project):
+    dopo = _dopo(METHODS)
+    dopo.analyze()
+    inputs = {sector: scores.copy() for sector, scores in dopo.results.items()}
+
+    dopo.analyze(breakdown="flows")
+    assert set(dopo.results) == set(inputs)
+    for sector, scores in dopo.results.items():
+        assert scores["input"].str.contains(r"\(air\)").all()
+        columns = ["activity", "location", "method"]
+        totals = scores.groupby(columns)["score"].sum()
+        expected = inputs[sector].groupby(columns)["score"].sum()
+        pd.testing.assert_series_equal(totals, expected, rtol=1e-6)
+
+
+def test_analyze_refines_contributions_until_deadline(bw_project):
+    full = _dopo(METHODS)
+    full.analyze()
+
+    dopo = _dopo(METHODS)
+    dopo.analyze(deadline=0)
+
+    # Totals only, exact
+    assert (dopo.completeness["refined share"] == 0).all()
+    columns = ["activity", "location", "method"]
+    for sector, scores in dopo.results.items():
+        assert (scores["input"] == "Not refined").all()
+        pd.testing.assert_series_equal(
+            scores.groupby(columns)["score"].sum(),
+            full.results[sector].groupby(columns)["score"].sum(),
+        )
+
+    # Refinement continues where it stopped
+    dopo.analyze(deadline=60)
+    assert (dopo.completeness["refined share"] == 1).all()
+    for sector, scores in full.results.items():
+        pd.testing.assert_frame_equal(dopo.results[sector], scores)
+
+
+def test_analyze_recomputes_units_after_data_changes(bw_project):
+    dopo = _dopo(METHODS)
+    dopo.analyze()
+
+    def totals():
+        steps = []
+        dopo.analyze(progress=lambda done, total, message: steps.append(total))
+        return set(steps)
+
+    assert totals() == {0}
+
+    # A database the activities depend on
+    bw_project.databases.set_modified("bio")
+    assert totals() == {4}
+
+    def score():
+        scores = dopo.results["Cement"]
+        return scores.loc[scores["method"] == "-".join(METHODS[0]), "score"].sum()
+
+    # Characterization factors written again under the same method name
+    method = bw_project.Method(METHODS[0])
+    factors, before = method.load(), score()
+    try:
+        method.write([(flow, 2 * cf) for flow, cf in factors])
+        assert totals() == {2}
+        assert score() == pytest.approx(2 * before)
+    finally:
+        method.write(factors)
@@ -0,0 +1,33 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+from dopo.excel_report import ExcelReport, export_results_to_excel
+
+
+def test_export_splits_sheets_over_row_limit(tmp_path):
+    filename = tmp_path / "results.xlsx"
+    df = pd.DataFrame({"activity": [f"act {i}" for i in range(25)], "score": range(25)})
+
+    stats = export_results_to_excel({"cement": df}, filename, max_rows=11, chunk_size=4)
+
+    workbook = load_workbook(filename, read_only=True)
+    assert workbook.sheetnames == ["cement", "cement (2)", "cement (3)"]
+    rows = [list(ws.values) for ws in workbook.worksheets]
+    assert [len(r) for r in rows] == [11, 11, 6]
+    assert all(r[0] == ("activity", "score") for r in rows)
+    assert rows[1][1] == ("act 10", 10)
+    assert stats["rows"] == 25
+
+
+def test_appending_replaces_existing_data_sheets(tmp_path):
+    filename = tmp_path / "results.xlsx"
+    export_results_to_excel({"cement": pd.DataFrame({"score": range(6)}), "steel": pd.DataFrame()}, filename)
+
+    report = ExcelReport(filename, append=True)
+    report.add_sheet("cement", pd.DataFrame({"score": range(3)}))
+    assert report.dimensions("cement") == (4, 1)
+    report.save()
+
+    workbook = load_workbook(filename, read_only=True)
+    assert workbook.sheetnames == ["cement", "steel"]
+    assert list(workbook["cement"].values) == [("score",), (0,), (1,), (2,)]
@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dopo.dash.calculations.jobs import JobManager, DONE, CANCELLED
+
+
+def _analysis(value, release=None, progress=None):
+    progress(0, 2, "start")
+    if release is not None:
+        release.wait(5)
+    progress(1, 2, "first step")
+    progress(2, 2, "second step")
+    return value * 2
+
+
+def test_finished_jobs_are_reused():
+    manager = JobManager(max_workers=1)
+    job = manager.submit(("a",), {"value": 21}, _analysis)
+    manager._executor.shutdown(wait=True)
+
+    assert job.status == DONE
+    assert job.result == 42
+    assert job.percent == 100
+    assert manager.submit(("a",), {"value": 21}, _analysis) is job
+
+
+def test_expired_jobs_run_again():
+    manager = JobManager(max_workers=1, ttl=0)
+    job = manager.submit(("a",), {"value": 21}, _analysis)
+    manager._executor.shutdown(wait=True)
+
+    assert job.status == DONE
+    manager._executor = ThreadPoolExecutor(max_workers=1)
+    again = manager.submit(("a",), {"value": 21}, _analysis)
+    manager._executor.shutdown(wait=True)
+    assert again is not job
+    assert again.result == 42
+
+
+def test_running_jobs_can_be_cancelled():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    job = manager.submit(("b",), {"value": 1, "release": release}, _analysis)
+
+    manager.cancel(job.id)
+    release.set()
+    manager._executor.shutdown(wait=True)
+
+    assert job.status == CANCELLED
+    assert job.result is None
+
+
+def _partial_analysis(seen, progress=None):
+    progress(1, 2, "first step", partial="first")
+    seen.append(progress.__self__.partial)
+    progress(2, 2, "second step", partial="second")
+    seen.append(progress.__self__.partial)
+    return "result"
+
+
+def test_partial_results_stay_on_the_job():
+    manager = JobManager(max_workers=1)
+    seen = []
+    job = manager.submit(("c",), {"seen": seen}, _partial_analysis)
+    manager._executor.shutdown(wait=True)
+
+    assert seen == ["first", "second"]
+    assert job.revision == 2
+    assert job.result == "result"
+    assert job.partial is None
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("bw2calc")
+
+from dopo.batched_lca import BatchedLCA
+from dopo.lca import find_leaves
+
+METHOD = ("IPCC", "GWP100")
+
+
+def test_find_leaves_adds_up_to_total_score(bw_project):
+    cement = bw_project.get_activity(("db", "cement"))
+    engine = BatchedLCA([cement], [METHOD])
+
+    leaves = find_leaves(cement, METHOD, engine=engine, max_level=5, cutoff=0)
+    total = engine.scores([cement])[0, 0]
+
+    assert np.isclose(sum(leaf[0] for leaf in leaves), total)
+    assert [leaf[0] for leaf in leaves] == sorted((leaf[0] for leaf in leaves), reverse=True)
+    for _, _, activity, path in leaves:
+        assert path[0] == cement and path[-1] == activity
+    assert max(len(path) for *_, path in leaves) == 3  # cement -> clinker -> heat
+
+    # Only the root is expanded: its inputs are the leaves
+    leaves = find_leaves(cement, METHOD, engine=engine, max_level=5, cutoff=0, max_nodes=1)
+    assert {leaf[2]["code"] for leaf in leaves} == {"clinker", "heat"}
+    assert np.isclose(sum(leaf[0] for leaf in leaves), total)
+
+
+def test_find_leaves_expands_shared_inputs_once(bw_project):
+    cement = bw_project.get_activity(("db", "cement"))
+    engine = BatchedLCA([cement], [METHOD])
+
+    # Heat is an input of both cement and clinker: it is expanded through clinker, the larger
+    # path, and ends the path from cement with its whole score
+    leaves = find_leaves(cement, METHOD, engine=engine, max_level=5, cutoff=0, max_nodes=3)
+    assert sorted(len(path) for *_, activity, path in leaves if activity["code"] == "heat") == [2, 3]
+    assert np.isclose(sum(leaf[0] for leaf in leaves), engine.scores([cement])[0, 0])
+
+
+def test_find_leaves_stops_at_loops(bw_project):
+    bw_project.Database("loop").write({
+        ("loop", "a"): {
+            "name": "a", "unit": "kilogram", "location": "GLO",
+            "exchanges": [
+                {"input": ("loop", "a"), "amount": 1, "type": "production"},
+                {"input": ("loop", "b"), "amount": 0.5, "type": "technosphere"},
+                {"input": ("bio", "co2"), "amount": 1, "type": "biosphere"},
+            ],
+        },
+        ("loop", "b"): {
+            "name": "b", "unit": "kilogram", "location": "GLO",
+            "exchanges": [
+                {"input": ("loop", "b"), "amount": 1, "type": "production"},
+                {"input": ("loop", "a"), "amount": 0.4, "type": "technosphere"},
+                {"input": ("bio", "co2"), "amount": 1, "type": "biosphere"},
+            ],
+        },
+    })
+    try:
+        a = bw_project.get_activity(("loop", "a"))
+        leaves = find_leaves(a, METHOD, max_level=100, cutoff=0)
+
+        # Direct emissions of b, then the loop back to a, which is not expanded again
+        assert [(leaf[2]["code"], len(leaf[3])) for leaf in leaves] == [("b", 2), ("a", 3)]
+        assert np.isclose(1 + sum(leaf[0] for leaf in leaves), 1.5 / 0.8)
+    finally:
+        del bw_project.databases["loop"]
@@ -1,6 +1,9 @@
 import pytest
+from contextvars import copy_context
 from unittest.mock import patch, MagicMock
-from dash import Dash
+from dash import Dash, no_update
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
 from dopo.dash.app import populate_projects_on_load, update_databases, update_filtered_dataset_options, update_impact_assessment_list
 
 # Mock project class
@@ -16,27 +19,57 @@ def test_populate_projects_on_load(mock_get_projects):
     assert options[0]["label"] == "Project A"
     assert value == "Project A"
 
-@patch("dopo.dash.app.activate_project")
 @patch("dopo.dash.app.get_databases")
-def test_update_databases(mock_get_databases, mock_activate_project):
+def test_update_databases(mock_get_databases):
     mock_get_databases.return_value = ["DB1", "DB2"]
     result = update_databases("MockProject")
+    mock_get_databases.assert_called_once_with("MockProject")
     assert result == [{"label": "DB1", "value": "DB1"}, {"label": "DB2", "value": "DB2"}]
 
-@patch("dopo.dash.app.get_classifications_from_database")
-def test_update_filtered_dataset_options(mock_get_classifications):
-    mock_get_classifications.side_effect = lambda db, key: ["item1", "item2", "market item"]
-    sectors, cpc, isic, datasets = update_filtered_dataset_options(
-        ["cpc", "isic", ], ["MockDB"], "market"
+def _triggered_by(prop_id, callback, *args):
+    """Calls a callback as Dash does when `prop_id` changed."""
+    def run():
+        context_value.set(AttributeDict(triggered_inputs=[{"prop_id": prop_id, "value": None}]))
+        return callback(*args)
+    return copy_context().run(run)
+
+def _search(items):
+    return lambda db, key, query, offset, limit, project=None: (
+        [item for item in items if query in item][offset:offset + limit], len([item for item in items if query in item])
+    )
+
+@patch("dopo.dash.app.search_classifications")
+def test_update_filtered_dataset_options(mock_search_classifications):
+    mock_search_classifications.side_effect = _search(["item1", "item2", "market item"])
+    sectors, cpc, isic, datasets, *_, limits = _triggered_by(
+        "dataset-search.value", update_filtered_dataset_options, ["cpc", "isic", ], ["MockDB"], "market"
     )
     assert sectors == []
     assert datasets == []
     assert all("market" in opt["label"] for opt in cpc)
     assert all("market" in opt["label"] for opt in isic)
 
-@patch("dopo.dash.app.activate_project")
+@patch("dopo.dash.app.PAGE_SIZE", 2)
+@patch("dopo.dash.app.search_classifications")
+def test_load_more_pages_its_own_picker(mock_search_classifications):
+    mock_search_classifications.side_effect = _search([f"item{i}" for i in range(5)])
+    outputs = _triggered_by(
+        "cpc-load-more.n_clicks", update_filtered_dataset_options,
+        ["cpc", "isic"], ["MockDB"], "", 0, 1, 0, 0, "MockProject", {"cpc": 2, "isic": 2},
+    )
+    sectors, cpc, isic, datasets = outputs[:4]
+    # Only the new page is fetched, and appended to the options already listed
+    mock_search_classifications.assert_called_once_with("MockDB", "cpc", "", 2, 2, project="MockProject")
+    assert cpc.to_plotly_json()["operations"] == [{
+        "operation": "Extend", "location": [],
+        "params": {"value": [{"label": "item2", "value": "item2"}, {"label": "item3", "value": "item3"}]},
+    }]
+    assert isic is no_update
+    assert outputs[5] == "4 of 5"
+    assert outputs[-1] == {"cpc": 4, "isic": 2}
+
 @patch("dopo.dash.app.get_methods")
-def test_update_impact_assessment_list(mock_get_methods, mock_activate_project):
+def test_update_impact_assessment_list(mock_get_methods):
     mock_get_methods.return_value = [("Method A",), ("Other",)]
     result = update_impact_assessment_list("method", "MockProject", triggered_id="impact-search")
     assert any("Method A" in opt["label"] for opt in result)
@@ -0,0 +1,32 @@
+from dopo.dash.calculations.metadata import MetadataCache
+from dopo.dash.calculations.search import SearchIndex
+
+
+def test_metadata_cache_invalidated_on_modification(bw_project):
+    cache = MetadataCache()
+
+    metadata = cache.database("db")
+    assert metadata.names == [
+        "cement production, Portland", "clinker production", "heat production, natural gas",
+    ]
+    assert metadata.classification_labels("cpc") == [" Cement", " Clinker", " Heat"]
+    assert cache.database("db") is metadata
+    assert ("IPCC", "GWP100") in cache.methods()
+
+    bw_project.databases["db"]["modified"] = "later"
+    assert cache.database("db") is not metadata
+
+
+def test_search_index_pages_prefix_matches():
+    index = SearchIndex([
+        "market for electricity, high voltage",
+        "market for electricity, low voltage",
+        "electricity production, hydro",
+        "heat production, natural gas",
+    ])
+
+    assert index.search("elec low") == (["market for electricity, low voltage"], 1)
+    assert index.search("ELEC", offset=1, limit=1) == (["market for electricity, low voltage"], 3)
+    assert index.search("voltage market", limit=1) == (["market for electricity, high voltage"], 2)
+    assert index.search("lectricity") == ([], 0)
+    assert index.search("", limit=2)[1] == 4
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dopo.outliers import outlier_statistics, flagged_activities, multivariate_outliers, rank_correlations
+
+
+def _results():
+    rng = np.random.default_rng(42)
+    rows = []
+    for database in ["db1", "db2"]:
+        for method in ["GWP", "acid"]:
+            scores = rng.normal(10, 1, 30)
+            scores[0] = 40  # one extreme activity per group
+            for i, score in enumerate(scores):
+                for input_name, share in [("heat", 0.25), ("electricity", 0.75)]:
+                    rows.append({
+                        "activity": f"act {i}", "product": "p", "location": "CH",
+                        "database": database, "method": method, "method unit": "kg",
+                        "input": input_name, "score": score * share,
+                    })
+    frame = pd.DataFrame(rows)
+    return {"cement": frame, "steel": frame.iloc[:8]}
+
+
+def test_outlier_statistics_match_grouped_pandas():
+    outliers = outlier_statistics(_results())
+
+    for (database, sector, method), group in outliers.groupby(["database", "sector", "method"]):
+        x = group["score"]
+        z = (x - x.mean()) / x.std()
+        mad = (x - x.median()).abs().median()
+        q1, q3 = x.quantile(0.25), x.quantile(0.75)
+
+        assert np.allclose(group["z"], z)
+        assert np.allclose(group["robust z"], 0.6745 * (x - x.median()) / mad)
+        assert np.allclose(group["upper fence"], q3 + 1.5 * (q3 - q1))
+
+    flagged = flagged_activities(outliers, sector="cement")
+    assert sorted(set(flagged["activity"])) == ["act 0"]
+    assert len(flagged) == 4  # one per database and method
+    assert len(flagged_activities(outliers, "z outlier", method="GWP", sector="cement")) == 2
+
+    with pytest.raises(ValueError):
+        flagged_activities(outliers, sector="cement", unit="kg")
+
+
+def test_multivariate_outliers_flag_joint_extremes():
+    rng = np.random.default_rng(0)
+    activities, methods = 200, 4
+    scores = rng.normal(10, 1, (activities, methods))
+    scores[:, 1] = scores[:, 0] + rng.normal(0, 0.1, activities)  # correlated methods
+    scores[0, :2] = [12.0, 9.0]  # ordinary for each method, not for both together
+
+    frame = pd.DataFrame({
+        "activity": np.repeat([f"act {i}" for i in range(activities)], methods),
+        "product": "p", "location": "CH", "database": "db",
+        "method": np.tile([f"m{j}" for j in range(methods)], activities),
+        "method unit": "kg", "input": "heat", "score": scores.ravel(),
+    })
+    results = {"cement": frame}
+
+    assert not outlier_statistics(results).query("activity == 'act 0'")["outlier"].any()
+
+    multivariate = multivariate_outliers(results)
+    assert len(multivariate) == activities
+    assert multivariate.set_index("activity").loc["act 0", "outlier"]
+    assert multivariate["outlier"].mean() < 0.1
+
+    correlations = rank_correlations(results)["cement"]
+    assert correlations.loc["m0", "m1"] > 0.9
+    assert abs(correlations.loc["m0", "m2"]) < 0.3
+    assert np.allclose(correlations, frame.pivot(index="activity", columns="method", values="score").corr("spearman"))
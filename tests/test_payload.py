@@ -0,0 +1,23 @@
+from dopo.dash.utils.payload import decode_array, view_payload
+from dopo.dash.utils.result_frame import ResultFrame
+
+from .test_result_frame import _results
+
+
+def test_view_payload_round_trip():
+    frame = ResultFrame(_results())
+    payload = view_payload(frame, ["('IPCC', 'GWP')"], handle="abc")
+
+    assert payload["handle"] == "abc"
+    assert set(payload["views"]) == {"cement", "steel"}
+
+    view = payload["views"]["steel"]["('IPCC', 'GWP')"]
+    strings = payload["strings"]
+    scores = frame.scores("steel", "('IPCC', 'GWP')")
+    assert [strings[c] for c in decode_array(view["scores"]["name"], "int32")] == list(scores["name"])
+    assert list(decode_array(view["scores"]["score"], "float32")) == list(scores["score"])
+    assert view["statistics"]["mean"] == frame.statistics("steel", "('IPCC', 'GWP')")["mean"]
+
+    contributions = view["contributions"]
+    assert [strings[c] for c in contributions["inputs"]] == ["b", "a"]
+    assert len(decode_array(contributions["score"], "float32")) == 6
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from dopo.dash.plot.plot import contribution_plot, downsample, scores_plot
+from dopo.dash.utils.result_frame import ResultFrame
+
+from .test_result_frame import _results
+
+
+def test_plots_render_from_result_frame():
+    frame = ResultFrame(_results())
+
+    fig = scores_plot(
+        frame.scores("cement", ("IPCC", "GWP")), "cement", "IPCC-GWP",
+        statistics=frame.statistics("cement", ("IPCC", "GWP")),
+    )
+    assert list(fig.data[0].y) == [4, 6]
+    assert fig.layout.yaxis.title.text == "kg CO2-Eq"
+
+    fig = contribution_plot(
+        frame.contributions("cement", ("IPCC", "GWP")), "cement", "IPCC-GWP",
+        legend_title="Elementary flow",
+    )
+    assert [trace.name for trace in fig.data] == ["b", "a"]
+    assert fig.layout.legend.title.text == "Elementary flow"
+
+
+def test_downsample_spreads_over_the_whole_middle():
+    df = pd.DataFrame({"score": range(100)})
+
+    kept = downsample(df, "score", 20)
+    assert len(kept) == 20
+    assert list(kept["score"][:5]) == [0, 1, 2, 3, 4]
+    assert list(kept["score"][-5:]) == [95, 96, 97, 98, 99]
+    middle = list(kept["score"][5:-5])
+    assert middle[0] == 5 and middle[-1] == 94
@@ -0,0 +1,24 @@
+from dopo.dash.calculations.projects import ProjectCatalog
+
+
+def test_project_catalog_reads_databases_without_switching(bw_project):
+    current = bw_project.projects.current
+    catalog = ProjectCatalog()
+
+    projects = {project.name: project.databases for project in catalog.projects()}
+
+    assert sorted(projects["dopo-tests"]) == ["bio", "db"]
+    assert sorted(catalog.databases("dopo-tests")) == ["bio", "db"]
+    assert catalog.databases("missing") == []
+    assert bw_project.projects.current == current
+
+
+def test_project_state_follows_database_changes(bw_project):
+    catalog = ProjectCatalog()
+    state = catalog.state("dopo-tests", ["db"])
+
+    # "db" depends on "bio", whose changes are included
+    assert [name for name, _ in state[0]] == ["bio", "db"]
+    bw_project.databases.set_modified("bio")
+    assert catalog.state("dopo-tests", ["db"]) != state
+    assert catalog.state("missing", ["db"]) == ()
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from dopo.dash.plot.plot import prepare_dataframe
+from dopo.dash.utils.result_frame import ResultFrame
+
+
+def _results():
+    def sector(activities, method):
+        return pd.DataFrame({
+            "activity": activities * 2,
+            "product": "p",
+            "database": "db",
+            "location": "CH",
+            "unit": "kg",
+            "method": method,
+            "method unit": "kg CO2-Eq",
+            "input": ["a"] * len(activities) + ["b"] * len(activities),
+            "score": range(1, 2 * len(activities) + 1),
+        })
+
+    return {
+        "cement": pd.concat([sector(["c1", "c2"], "IPCC-GWP"), sector(["c1", "c2"], "EF-acid")]),
+        "steel": sector(["s1", "s2", "s3"], "IPCC-GWP"),
+    }
+
+
+def test_result_frame_slices_match_filtered_results():
+    results = _results()
+    frame = ResultFrame(results)
+
+    for sector in results:
+        expected = prepare_dataframe(results, sector, "('IPCC', 'GWP')")
+        contributions = frame.contributions(sector, "('IPCC', 'GWP')")
+        assert list(contributions["name"]) == list(expected["name"])
+        assert list(contributions["score"]) == list(expected["score"])
+
+        totals = expected.groupby("name")["score"].sum()
+        scores = frame.scores(sector, ("IPCC", "GWP"))
+        assert dict(zip(scores["name"], scores["score"])) == totals.to_dict()
+        assert frame.statistics(sector, ("IPCC", "GWP"))["mean"] == totals.mean()
+
+    assert list(frame.scores("steel", "('EF', 'acid')")["name"]) == []
+    assert frame.statistics("steel", "('EF', 'acid')") is None
+    assert "cement" in frame and "glass" not in frame
@@ -0,0 +1,57 @@
+import pytest
+from openpyxl import load_workbook
+
+pytest.importorskip("bw2calc")
+
+from dopo.database_comparison import database_comparison_plots
+from dopo.sector_lca_scores import sector_lca_scores_plots
+
+METHODS = [(("IPCC", "climate change", "GWP100"), 29.7), (("IPCC", "climate change", "GWP20"), 82.5)]
+
+
+@pytest.fixture
+def method_dict(bw_project):
+    methods = {}
+    for name, ch4 in METHODS:
+        method = bw_project.Method(name)
+        method.register(unit="kg CO2-Eq")
+        method.write([(("bio", "co2"), 1.0), (("bio", "ch4"), ch4)])
+        methods[name[2].lower()] = {
+            "object": method, "method name": name, "short name": name[2].lower(), "unit": "kg CO2-Eq"
+        }
+    yield methods
+    for name, _ in METHODS:
+        bw_project.Method(name).deregister()
+
+
+def test_report_sheets_and_chart_placement(bw_project, method_dict, tmp_path):
+    filename = str(tmp_path / "report.xlsx")
+    sectors = {"Cement": {"activities": sorted(bw_project.Database("db"), key=lambda act: act["code"])}}
+
+    current_row = sector_lca_scores_plots(sectors, method_dict, filename)
+    database_comparison_plots(sectors, sectors, method_dict, filename, current_row)
+
+    workbook = load_workbook(filename)
+    assert workbook.sheetnames == [
+        "Cement_charts", "Cement", "Cement_gwp100", "Cement_gwp20",
+        "Cement_comparison_gwp100", "Cement_comparison_gwp20",
+    ]
+    charts = [
+        (type(chart).__name__, chart.anchor._from.row + 1, chart.anchor._from.col + 1)
+        for chart in workbook["Cement_charts"]._charts
+    ]
+    # Dot plots, stacked bars below them, then the comparison bars, three charts per row
+    assert current_row == 62
+    assert charts == [
+        ("ScatterChart", 1, 1), ("ScatterChart", 1, 14),
+        ("BarChart", 31, 1), ("BarChart", 31, 14),
+        ("BarChart", 92, 1), ("BarChart", 92, 14),
+    ]
+    assert workbook["Cement_gwp100"].max_row == 5
+    assert workbook["Cement_comparison_gwp20"].max_row == 5
+
+    # Writing the comparison again replaces its sheets
+    database_comparison_plots(sectors, sectors, method_dict, filename, current_row)
+    workbook = load_workbook(filename)
+    assert len(workbook.sheetnames) == 6
+    assert workbook["Cement_comparison_gwp20"].max_row == 5
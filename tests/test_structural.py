@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("bw2calc")
+
+from dopo.batched_lca import BatchedLCA
+from dopo.structural import structural_outliers
+
+
+def test_structural_outliers_align_normalized_exchanges(bw_project):
+    db = bw_project.Database("db")
+    sectors = {"clinker": [db.get("clinker"), db.get("clinker-de")], "cement": [db.get("cement")]}
+    engine = BatchedLCA([act for acts in sectors.values() for act in acts], [("IPCC", "GWP100")])
+
+    result = structural_outliers(engine, sectors, min_activities=2).set_index(
+        ["sector", "location", "input"]
+    )
+
+    heat = result.loc[("clinker", "DE", "97300: Heat")]
+    assert heat["exchange"] == "technosphere"
+    assert heat["amount"] == pytest.approx(4.0)
+    assert heat["sector median"] == pytest.approx(np.sqrt(3.5 * 4.0))
+    assert heat["robust z"] == pytest.approx(0.6745)
+    assert result.loc[("clinker", "CH", "carbon dioxide (air)"), "amount"] == pytest.approx(0.5)
+
+    # Too few activities to compare
+    assert np.isnan(result.loc[("cement", "CH", "37440: Clinker"), "robust z"])
+    assert not result["outlier"].any()